@@ -19,39 +19,40 @@
 #    kesintileri) proaktif olarak tespit etmesi ve raporlaması sağlandı.
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from dataclasses import dataclass
-from typing import Dict, List, Tuple
-import json
-import traceback
+from typing import TYPE_CHECKING, Dict, Iterator, List, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+from tariffeq.ai import GEMINI_MODEL, assessment_cache_key, fetch_ai_parameters, split_report_sections, stream_assessment
+from tariffeq.ai_cache import DiskCache
+from tariffeq.core import ScenarioInputs
+from tariffeq.metrics import DEV_MODU, begin_run, cache_rows, end_run, instrument_cache, span
+from tariffeq.pipeline import AnalysisPipeline, Node, build_analysis_pipeline
+
+if TYPE_CHECKING:
+    from tariffeq.near_duplicate import NearDuplicateIndex
 
 # --- AI İÇİN KORUMALI IMPORT VE GÜVENLİ KONFİGÜRASYON ---
-_GEMINI_AVAILABLE = False
-try:
-    import google.generativeai as genai
-    if "GEMINI_API_KEY" in st.secrets:
+# google.generativeai ağır bir pakettir: her rerun'da değil, AI ilk kez gerçekten
+# çağrıldığında süreç başına bir kez içe aktarılıp yapılandırılır.
+@st.cache_resource(show_spinner=False)
+def get_gemini_client():
+    try:
+        import google.generativeai as genai
         genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-        _GEMINI_AVAILABLE = True
-    else:
-        st.sidebar.warning("Gemini API anahtarı bulunamadı. AI özellikleri devre dışı.", icon="🔑")
-        _GEMINI_AVAILABLE = False
-except (ImportError, Exception):
-    st.sidebar.error("Google AI kütüphanesi yüklenemedi. AI özellikleri devre dışı.", icon="🤖")
-    _GEMINI_AVAILABLE = False
-
-# --- TARİFE, ÇARPAN VERİLERİ VE SABİTLER ---
-TARIFE_RATES = {"Betonarme": [3.13, 2.63, 2.38, 1.94, 1.38, 1.06, 0.75], "Diğer": [6.13, 5.56, 3.75, 2.00, 1.56, 1.24, 1.06]}
-KOAS_FACTORS = {"80/20": 1.0, "75/25": 0.9375, "70/30": 0.875, "65/35": 0.8125, "60/40": 0.75, "55/45": 0.6875, "50/50": 0.625, "45/55": 0.5625, "40/60": 0.5, "90/10": 1.125, "100/0": 1.25}
-MUAFIYET_FACTORS = {2.0: 1.0, 3.0: 0.94, 4.0: 0.87, 5.0: 0.81, 10.0: 0.65, 1.5: 1.03, 1.0: 1.06, 0.5: 1.09, 0.1: 1.12}
-_DEPREM_ORAN = {1: 0.20, 2: 0.17, 3: 0.13, 4: 0.09, 5: 0.06, 6: 0.06, 7: 0.06}
-# YENİ (v3.2): Dinamik PD modellemesi için sektörel bina/içerik oranları
-BINA_ICERIK_ORANLARI = {
-    "Üretim Tesisi": (0.40, 0.60),
-    "Lojistik Depo": (0.50, 0.50),
-    "AVM / Otel / Ofis": (0.60, 0.40),
-    "Diğer / Varsayılan": (0.50, 0.50)
-}
+        return genai
+    except (ImportError, Exception):
+        return None
+
+def gemini_key_configured() -> bool:
+    try:
+        return "GEMINI_API_KEY" in st.secrets
+    except Exception:
+        return False
+
+if not gemini_key_configured():
+    st.sidebar.warning("Gemini API anahtarı bulunamadı. AI özellikleri devre dışı.", icon="🔑")
 
 # --- ÇEVİRİ SÖZLÜĞÜ ---
 T = {
@@ -78,6 +79,10 @@ T = {
     "results_header": {"TR": "📝 3. Sayısal Hasar Analizi", "EN": "📝 3. Numerical Damage Analysis"},
     "analysis_header": {"TR": "🔍 4. Poliçe Alternatifleri Analizi", "EN": "🔍 4. Policy Alternatives Analysis"},
     "btn_run": {"TR": "Analizi Çalıştır", "EN": "Run Analysis"},
+    "mc_toggle": {"TR": "🎲 Olasılıksal Hasar Dağılımı (Monte Carlo)", "EN": "🎲 Probabilistic Loss Distribution (Monte Carlo)"},
+    "mc_draws": {"TR": "Simülasyon Sayısı", "EN": "Number of Simulations"},
+    "sens_toggle": {"TR": "🌪️ Duyarlılık Analizi (Tornado)", "EN": "🌪️ Sensitivity Analysis (Tornado)"},
+    "sens_two_way": {"TR": "İki Yönlü Duyarlılık Izgarası", "EN": "Two-Way Sensitivity Grid"},
 }
 
 # --- YARDIMCI FONKSİYONLAR ---
@@ -88,208 +93,130 @@ def tr(key: str) -> str:
 def money(x: float) -> str:
     return f"{x:,.0f} ₺".replace(",", ".")
 
-# --- GİRDİ VE HESAPLAMA MODELLERİ ---
-@dataclass
-class ScenarioInputs:
-    si_pd: int = 250_000_000
-    yillik_brut_kar: int = 100_000_000
-    rg: int = 1
-    faaliyet_tanimi: str = "Lüks bir AVM. Alt katlarda otopark, orta katlarda çeşitli (giyim, mücevherat, ev tekstili, elektronik) mağazalar, en üst katta ise yemek alanları (restoranlar) ve çok salonlu bir sinema kompleksi bulunuyor. Geniş cam cephelere sahip."
-    yapi_turu: str = "Betonarme"
-    yonetmelik_donemi: str = "1998-2018 arası (Varsayılan)"
-    kat_sayisi: str = "4-7 kat"
-    zemin_sinifi: str = "ZE"
-    yakin_cevre: str = "Ana Karada / Düz Ova"
-    yumusak_kat_riski: str = "Evet"
-    azami_tazminat_suresi: int = 365
-    isp_varligi: str = "Var (Test Edilmiş)"
-    alternatif_tesis: str = "Yok"
-    bitmis_urun_stogu: int = 0
-    bi_gun_muafiyeti: int = 30
-    # YENİ (v3.2): Bu parametreler artık AI tarafından atanacak
-    icerik_hassasiyeti: str = "Orta"
-    ffe_riski: str = "Orta"
-    kritik_makine_bagimliligi: str = "Orta"
-    bina_icerik_profili: str = "Diğer / Varsayılan"
-
-# --- TEKNİK HESAPLAMA ÇEKİRDEĞİ (REVİZE EDİLDİ v3.2) ---
-def calculate_pd_damage(s: ScenarioInputs) -> Dict[str, float]:
-    FACTORS = {
-        "yonetmelik": {"1998 öncesi": 1.25, "1998-2018": 1.00, "2018 sonrası": 0.80},
-        "kat_sayisi": {"1-3": 0.95, "4-7": 1.00, "8+": 1.10},
-        "zemin": {"ZC": 1.00, "ZA/ZB": 0.85, "ZD": 1.20, "ZE": 1.50},
-        "yumusak_kat": {"Hayır": 1.00, "Evet": 1.40},
-    }
-    base_bina_oran = _DEPREM_ORAN.get(s.rg, 0.13)
-    bina_factor = 1.0
-    bina_factor *= FACTORS["yonetmelik"].get(s.yonetmelik_donemi.split(' ')[0], 1.0)
-    bina_factor *= FACTORS["kat_sayisi"].get(s.kat_sayisi.split(' ')[0], 1.0)
-    bina_factor *= FACTORS["zemin"].get(s.zemin_sinifi, 1.0)
-    bina_factor *= FACTORS["yumusak_kat"].get(s.yumusak_kat_riski, 1.0)
-    
-    if s.yapi_turu == "Betonarme" and "1998 öncesi" in s.yonetmelik_donemi: bina_factor *= 1.20
-    if s.yapi_turu == "Çelik" and "1998 öncesi" in s.yonetmelik_donemi: bina_factor *= 1.15
-    if s.zemin_sinifi in ["ZD", "ZE"] and s.yakin_cevre != "Ana Karada / Düz Ova": bina_factor *= 1.40
-
-    bina_pd_ratio = min(0.60, max(0.01, base_bina_oran * bina_factor))
-    
-    # REVİZE EDİLDİ (v3.2): Bina/İçerik oranı artık AI tarafından belirlenen profile göre dinamik.
-    bina_oran, icerik_oran = BINA_ICERIK_ORANLARI.get(s.bina_icerik_profili, BINA_ICERIK_ORANLARI["Diğer / Varsayılan"])
-    si_bina_varsayim = s.si_pd * bina_oran
-    si_icerik_varsayim = s.si_pd * icerik_oran
-    
-    icerik_hassasiyet_carpan = {"Düşük": 0.6, "Orta": 0.8, "Yüksek": 1.0}.get(s.icerik_hassasiyeti, 0.8)
-    icerik_pd_ratio = bina_pd_ratio * icerik_hassasiyet_carpan
-
-    bina_hasar = si_bina_varsayim * bina_pd_ratio
-    icerik_hasar = si_icerik_varsayim * icerik_pd_ratio
-    toplam_pd_hasar = bina_hasar + icerik_hasar
-    ortalama_pd_ratio = toplam_pd_hasar / s.si_pd if s.si_pd > 0 else 0
-    
-    return {"damage_amount": toplam_pd_hasar, "pml_ratio": ortalama_pd_ratio}
-
-def calculate_bi_downtime(pd_ratio: float, s: ScenarioInputs) -> Tuple[int, int]:
-    FACTORS = {
-        "isp": {"Yok": 1.00, "Var (Test Edilmemiş)": 0.85, "Var (Test Edilmiş)": 0.70},
-        "makine_bagimliligi": {"Düşük": 1.00, "Orta": 1.25, "Yüksek": 1.70},
-        "alternatif_tesis": {"Yok": 1.0, "Var (kısmi kapasite)": 0.6, "Var (tam kapasite)": 0.2}
-    }
-    base_repair_days = 30 + (pd_ratio * 300)
-    operational_factor = 1.0
-    operational_factor *= FACTORS["isp"].get(s.isp_varligi, 1.0)
-    operational_factor *= FACTORS["makine_bagimliligi"].get(s.kritik_makine_bagimliligi, 1.0)
-    operational_factor *= FACTORS["alternatif_tesis"].get(s.alternatif_tesis, 1.0)
-    gross_downtime = int(base_repair_days * operational_factor)
-    
-    # Yüksek riskli bölgelerde altyapı gecikmesi eklenir
-    if s.rg in [1, 2]: gross_downtime += 30
-
-    net_downtime_before_indemnity = gross_downtime - s.bitmis_urun_stogu
-    final_downtime = min(s.azami_tazminat_suresi, net_downtime_before_indemnity)
-    return max(0, gross_downtime), max(0, int(final_downtime))
-
-# ... (Diğer yardımcı fonksiyonlar aynı kalır)
-def get_allowed_options(si_pd: int) -> Tuple[List[str], List[float]]:
-    koas_opts = list(KOAS_FACTORS.keys())[:9]; muaf_opts = list(MUAFIYET_FACTORS.keys())[:5]
-    if si_pd > 3_500_000_000: koas_opts.extend(list(KOAS_FACTORS.keys())[9:]); muaf_opts.extend(list(MUAFIYET_FACTORS.keys())[5:])
-    return koas_opts, muaf_opts
-def calculate_premium(si: float, yapi_turu: str, rg: int, koas: str, muaf: float, is_bi: bool = False) -> float:
-    base_rate = TARIFE_RATES.get(yapi_turu, TARIFE_RATES["Diğer"])[rg - 1]; prim_bedeli = min(si, 3_500_000_000) if not is_bi else si
-    if is_bi: return (prim_bedeli * base_rate * 0.75) / 1000.0
-    factor = KOAS_FACTORS.get(koas, 1.0) * MUAFIYET_FACTORS.get(muaf, 1.0)
-    return (prim_bedeli * base_rate * factor) / 1000.0
-def calculate_net_claim(si_pd: int, hasar_tutari: float, koas: str, muaf_pct: float) -> Dict[str, float]:
-    muafiyet_tutari = si_pd * (muaf_pct / 100.0); muafiyet_sonrasi_hasar = max(0.0, hasar_tutari - muafiyet_tutari)
-    sirket_pay_orani = float(koas.split('/')[0]) / 100.0; net_tazminat = muafiyet_sonrasi_hasar * sirket_pay_orani
-    sigortalida_kalan = hasar_tutari - net_tazminat
-    return {"net_tazminat": net_tazminat, "sigortalida_kalan": sigortalida_kalan}
-
 # --- AI FONKSİYONLARI (REVİZE EDİLDİ v3.2) ---
-@st.cache_data(show_spinner=False)
+@st.cache_resource(show_spinner=False)
+def get_ai_cache() -> DiskCache:
+    # Süreç başına tek bağlantı havuzu; veriler diskte kalıcıdır ve replikalar arasında paylaşılabilir
+    return DiskCache()
+
+@st.cache_resource(show_spinner=False)
+def get_near_duplicate_index() -> "NearDuplicateIndex":
+    # Benzer faaliyet tanımlarının önceki AI yanıtlarını bulmak için MinHash/LSH dizini (önbellekle aynı dosya);
+    # numpy'a bağlı olduğundan ilk kullanımda içe aktarılır
+    from tariffeq.near_duplicate import NearDuplicateIndex
+    return NearDuplicateIndex(get_ai_cache().path)
+
+@st.cache_resource(show_spinner=False)
+def get_ai_executor() -> ThreadPoolExecutor:
+    # Rapor isteği arka planda yürürken sayısal sonuçlar ana iş parçacığında hesaplanıp gösterilir
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="tariffeq-ai")
+
+def get_gemini_model():
+    genai = get_gemini_client() if gemini_key_configured() else None
+    return genai.GenerativeModel(GEMINI_MODEL) if genai is not None else None
+
+@instrument_cache(st.cache_data(show_spinner=False))
 def get_ai_driven_parameters(faaliyet_tanimi: str) -> Dict[str, str]:
-    default_params = {
-        "icerik_hassasiyeti": "Orta",
-        "ffe_riski": "Orta",
-        "kritik_makine_bagimliligi": "Orta",
-        "bina_icerik_profili": "Diğer / Varsayılan"
-    }
-    if not _GEMINI_AVAILABLE: return default_params
-    
-    prompt = f"""
-    Rolün: Kıdemli bir risk mühendisi ve underwriter.
-    Görevin: Tesis tanımını analiz edip, 4 adet risk parametresini en uygun şekilde skorlamak.
-    Kısıtlar: Yanıtın SADECE JSON formatında olmalı. Başka hiçbir metin ekleme.
-
-    Tesis Tanımı: "{faaliyet_tanimi}"
-
-    PARAMETRE TANIMLARI VE SEÇİM KRİTERLERİ:
-
-    1.  "icerik_hassasiyeti": Tesis içindeki mal ve ekipmanların sarsıntıya karşı ne kadar hassas olduğu.
-        - "Yüksek": İlaç, kimya, yarı iletken, laboratuvar. AVM içindeki mücevherat, elektronik, cam/porselen ürünler. Yüksek ve devrilmeye müsait raf sistemleri.
-        - "Orta": Genel imalat, tekstil, metal işleme, mobilya. AVM içindeki giyim mağazaları.
-        - "Düşük": Kaba inşaat malzemeleri, hurda metal, blok mermer.
-
-    2.  "ffe_riski": Deprem Sonrası Yangın (Fire Following Earthquake) riski.
-        - "Yüksek": Yoğun solvent, yanıcı kimyasallar, gaz hatları, plastik hammaddeler, toz patlaması riski olan (un, şeker) tesisler. AVM'deki restoran mutfakları, gaz hatları.
-        - "Orta": Ahşap işleme, kağıt/karton depolama, genel elektrik ve makine parkı.
-        - "Düşük": Yanıcı malzeme içermeyen depolar (örn: metal, taş).
-
-    3.  "kritik_makine_bagimliligi": Üretimin/faaliyetin, hasarlanması durumunda yerine konması zor, özel ekipmanlara bağımlılığı.
-        - "Yüksek": Özel sipariş üretim hattı (otomotiv), büyük presler, fırınlar, reaktörler. AVM'deki sinema projeksiyon/ses sistemleri, yürüyen merdivenler, merkezi iklimlendirme.
-        - "Orta": Standart CNC makineleri, tekstil makineleri, paketleme hatları.
-        - "Düşük": Jenerik ekipmanların kullanıldığı, makineye az bağımlı montaj veya depolama faaliyetleri.
-
-    4.  "bina_icerik_profili": Toplam sigorta bedelinin bina ve içerik arasında nasıl dağıldığına dair sektörel profil.
-        - "AVM / Otel / Ofis": Bina değeri genellikle içerikten yüksektir. (örn: 60/40)
-        - "Üretim Tesisi": Makine/ekipman değeri genellikle bina değerinden yüksektir. (örn: 40/60)
-        - "Lojistik Depo": Bina ve içindeki stok değeri genellikle yakındır. (örn: 50/50)
-        - "Diğer / Varsayılan": Tanım belirsiz ise kullanılır.
-
-    SADECE ŞU JSON FORMATINDA ÇIKTI ÜRET:
-    {{"icerik_hassasiyeti": "...", "ffe_riski": "...", "kritik_makine_bagimliligi": "...", "bina_icerik_profili": "..."}}
-    """
-    try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        generation_config = {"temperature": 0.1, "top_p": 0.8, "response_mime_type": "application/json"}
-        response = model.generate_content(prompt, generation_config=generation_config)
-        params = json.loads(response.text)
-        # Gelen veriyi doğrula ve varsayılan değerleri ata
-        for key, valid_options in {
-            "icerik_hassasiyeti": ['Düşük', 'Orta', 'Yüksek'],
-            "ffe_riski": ['Düşük', 'Orta', 'Yüksek'],
-            "kritik_makine_bagimliligi": ['Düşük', 'Orta', 'Yüksek'],
-            "bina_icerik_profili": list(BINA_ICERIK_ORANLARI.keys())
-        }.items():
-            if params.get(key) not in valid_options:
-                params[key] = default_params[key]
-        return params
-    except Exception as e:
-        st.session_state.errors.append(f"AI Parametre Hatası: {str(e)}\n{traceback.format_exc()}")
-        return default_params
-
-@st.cache_data(show_spinner=False)
-def generate_comprehensive_assessment(s: ScenarioInputs, triggered_rules: List[str]) -> str: # YENİ FONKSİYON (v3.2)
-    if not _GEMINI_AVAILABLE: return "AI servisi aktif değil."
-    
-    prompt = f"""
-    Rolün: Dünya standartlarında bir deprem risk mühendisi ve kıdemli hasar eksperi. TariffEQ platformu için teknik bir rapor hazırlıyorsun.
-    Görevin: Sana verilen kullanıcı girdileri ve sistem tarafından tetiklenen risk faktörlerini kullanarak, iki ana bölümden oluşan detaylı bir risk değerlendirmesi yazmak.
-    
-    Kesin Kurallar:
-    1. Çıktın SADECE Markdown formatında olacak.
-    2. Raporun iki ana başlığı olacak: "### 🏛️ 1. Yapısal ve Çevresel Risk Değerlendirmesi" ve "### 🏭 2. Faaliyete Özgü Sektörel Risk Değerlendirmesi".
-    3. Her başlık altında, en önemli 2-3 risk faktörünü emoji kullanarak vurgula.
-    4. Her faktörü "Tespit:" ve "Etki:" alt başlıklarıyla, kısa ve net cümlelerle açıkla.
-    5. "Tespit:" bölümünde, bu riski hangi kullanıcı girdisinden çıkardığını belirt. (örn: Zemin Sınıfı: 'ZE', Faaliyet Tanımı: 'AVM' vb.)
-    6. "Etki:" bölümünde, bu riskin hasarı nasıl artıracağını ve potansiyel sonuçlarını (fiziksel, operasyonel) belirt. Varsa bilinen bir deprem referansı (Kocaeli 1999 vb.) ekle.
-    7. **Sektörel Değerlendirme Bölümünde (En Önemli Kısım):** Faaliyet tanımının içine dal.
-        - "AVM/Otel" görürsen: Geniş cam cephelerin kırılması, yürüyen merdivenlerin hasarı, lüks/kırılabilir stokların (mücevher, elektronik) devrilmesi, otoparktaki araçların üzerine düşebilecek tesisat (sprinkler boruları), sinema ekipmanlarının (projeksiyon, ses sistemi) hassasiyeti ve restoranlardaki gaz hatlarından kaynaklı FFE riskine odaklan.
-        - "Üretim" görürsen: Kritik makinelerin (pres, CNC) hassasiyetine, devrilebilecek yüksek raf sistemlerindeki stoklara, kimyasal sızıntı ve FFE riskine odaklan.
-        - "Lojistik" görürsen: Yüksek raf sistemlerinin devrilmesi (Pancaking etkisi), sprinkler patlaması sonucu stokların ıslanması ve yangın yüküne odaklan.
-    8. Raporun sonunda "###  sonuçsal Beklenti" başlığı altında genel bir değerlendirme ve PML (Potansiyel Maksimum Hasar) beklentisi hakkında kalitatif bir yorum yap (ASLA sayısal oran verme).
-
-    KULLANICI GİRDİLERİ:
-    - Faaliyet Tanımı: {s.faaliyet_tanimi}
-    - Yapı Türü: {s.yapi_turu}, Yönetmelik: {s.yonetmelik_donemi}, Kat Sayısı: {s.kat_sayisi}
-    - Zemin Sınıfı: {s.zemin_sinifi}, Yakın Çevre: {s.yakin_cevre}
-    - Yumuşak Kat Riski: {s.yumusak_kat_riski}
-
-    SİSTEM TARAFINDAN TESPİT EDİLEN AKTİF RİSK FAKTÖRLERİ: {triggered_rules}
-
-    Lütfen bu bilgilerle İki Aşamalı Teknik Risk Değerlendirmesini oluştur.
-    """
-    try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(prompt, generation_config={"temperature": 0.25})
-        return response.text
-    except Exception as e:
-        st.session_state.errors.append(f"AI Rapor Hatası: {str(e)}\n{traceback.format_exc()}")
-        return "AI Teknik Değerlendirme raporu oluşturulamadı."
+    return fetch_ai_parameters(faaliyet_tanimi, get_gemini_model(), get_ai_cache(), st.session_state.errors, index=get_near_duplicate_index())
+
+class ReportStream:
+    # Arka planda süren tek bir rapor akışı. Parçalar birikir; widget değişikliğiyle kesilen bir
+    # rerun'dan sonra gelen rerun aynı akışa yeniden bağlanır ve metni baştan okur.
+    def __init__(self):
+        self.parts: List[str] = []
+        self.errors: List[str] = []
+        self.done = False
+        self._cond = threading.Condition()
+
+    def append(self, piece: str) -> None:
+        with self._cond:
+            self.parts.append(piece)
+            self._cond.notify_all()
+
+    def finish(self) -> None:
+        with self._cond:
+            self.done = True
+            self._cond.notify_all()
+
+    def follow(self) -> Iterator[str]:
+        # Biriken parçalar ve ardından yenileri, akış bitene kadar
+        i = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self.parts) > i or self.done)
+                new, finished = self.parts[i:], self.done
+            i += len(new)
+            yield from new
+            if finished and not new:
+                return
+
+@st.cache_resource(show_spinner=False)
+def get_report_streams() -> Tuple[threading.Lock, Dict[str, ReportStream]]:
+    # Süreç genelinde yürüyen rapor akışları (assessment_cache_key → akış); aynı girdiyle ikinci istek gönderilmez
+    return threading.Lock(), {}
+
+def start_comprehensive_assessment(s: ScenarioInputs, triggered_rules: List[str]) -> ReportStream: # YENİ FONKSİYON (v3.2)
+    # Rapor, arka plan iş parçacığında akış (stream) olarak alınır ve parçalar ReportStream'e yazılır.
+    # Aynı girdilerle yürüyen bir akış varsa ona bağlanılır. Senaryonun kopyası gönderilir, böylece
+    # sonraki rerun'larda arayüzün değiştirdiği nesne iş parçacığını etkilemez.
+    key = assessment_cache_key(s, triggered_rules)
+    lock, streams = get_report_streams()
+    with lock:
+        if key in streams:
+            return streams[key]
+        stream = streams[key] = ReportStream()
+    s_copy, rules, model, cache, index = replace(s), list(triggered_rules), get_gemini_model(), get_ai_cache(), get_near_duplicate_index()
+    def _produce():
+        try:
+            with span("home.report_stream"):
+                for piece in stream_assessment(s_copy, rules, model, cache, stream.errors, index=index):
+                    stream.append(piece)
+        finally:
+            # Biten akış kayıttan düşer; sonraki istekler disk önbelleğinden karşılanır
+            with lock:
+                streams.pop(key, None)
+            stream.finish()
+    get_ai_executor().submit(_produce)
+    return stream
+
+def show_report_sections(report_text: str, slots: List) -> None:
+    sections = split_report_sections(report_text)
+    sections = sections[:len(slots) - 1] + ["".join(sections[len(slots) - 1:])]
+    for slot, section in zip(slots, sections):
+        slot.markdown(section, unsafe_allow_html=True)
+
+def render_assessment_stream(stream: ReportStream, slots: List) -> str:
+    # Gelen her parçada rapor bölümlere ayrılır ve her bölüm kendi alanında güncellenir
+    report_text = ""
+    for piece in stream.follow():
+        report_text += piece
+        show_report_sections(report_text, slots)
+    return report_text
+
+# --- ARTIMLI ANALİZ HATTI ---
+def build_pareto_figure(s: ScenarioInputs, pareto: Dict):
+    import plotly.express as px
+    from tariffeq.pareto import PRIM_SUTUNU
+    result, candidates = pareto["result"], pareto["candidates"]
+    hover = ["Koasürans", "Muafiyet (%)", "BI Bekleme (gün)", "Azami Tazminat (gün)"]
+    fig = px.scatter(candidates, x=PRIM_SUTUNU, y="Sigortalıda Kalan Risk", color="Azami Tazminat (gün)", color_continuous_scale=px.colors.sequential.Viridis, hover_data=hover, opacity=0.35, render_mode="webgl", title="Gösterge Pareto Sınırı (tarife dışı yapılar)")
+    frontier_fig = px.line(result.frontier, x=PRIM_SUTUNU, y="Sigortalıda Kalan Risk", hover_data=hover, markers=True, render_mode="webgl")
+    frontier_fig.update_traces(name="Pareto Sınırı", showlegend=True, line_color="#E74C3C", marker_size=4)
+    fig.add_traces(frontier_fig.data)
+    fig.update_layout(xaxis_title=PRIM_SUTUNU, yaxis_title="Hasarda Şirketinizde Kalacak Risk (PD + BI)", coloraxis_colorbar_title_text="Azami Süre")
+    return fig
+
+def get_pipeline() -> AnalysisPipeline:
+    # Oturum başına tek hat: her rerun'da yalnızca girdisi değişen aşamalar yeniden hesaplanır
+    if "pipeline" not in st.session_state:
+        st.session_state.pipeline = build_analysis_pipeline(get_ai_driven_parameters, [Node("pareto_fig", deps=("pareto",), fn=build_pareto_figure)])
+    return st.session_state.pipeline
 
 
 # --- STREAMLIT UYGULAMASI ---
 def main():
     st.set_page_config(page_title=tr("title"), layout="wide", page_icon="🏗️")
+    trace = begin_run("home")
     if 'run_clicked' not in st.session_state: st.session_state.run_clicked = False
     if 'errors' not in st.session_state: st.session_state.errors = []
     st.title(f"🏗️ {tr('title')}")
@@ -331,69 +258,144 @@ def main():
         st.session_state.errors = []
 
     if st.session_state.run_clicked:
+        # Analiz bölümüne özgü ağır kütüphaneler yalnızca bu yol çalıştığında yüklenir
+        import pandas as pd
+        import plotly.express as px
+        from tariffeq.sensitivity import FAKTOR_ETIKETLERI, two_way_grid
+
         s_inputs = st.session_state.s_inputs
+        pipeline = get_pipeline()
+        pipeline.begin_rerun()
+        if gemini_key_configured() and get_gemini_client() is None:
+            st.sidebar.error("Google AI kütüphanesi yüklenemedi. AI özellikleri devre dışı.", icon="🤖")
         
-        with st.spinner("AI, tesisinizi analiz ediyor ve risk parametrelerini atıyor..."):
-            ai_params = get_ai_driven_parameters(s_inputs.faaliyet_tanimi)
+        with st.spinner("AI, tesisinizi analiz ediyor ve risk parametrelerini atıyor..."), span("home.ai_params"):
+            ai_params = pipeline.get("ai_params", s_inputs)
             s_inputs.icerik_hassasiyeti = ai_params["icerik_hassasiyeti"]
             s_inputs.ffe_riski = ai_params["ffe_riski"]
             s_inputs.kritik_makine_bagimliligi = ai_params["kritik_makine_bagimliligi"]
             s_inputs.bina_icerik_profili = ai_params["bina_icerik_profili"]
         
-        triggered_rules = []
-        if s_inputs.yapi_turu == "Betonarme" and "1998 öncesi" in s_inputs.yonetmelik_donemi: triggered_rules.append("ESKI_YONETMELIK_BETONARME")
-        if s_inputs.yapi_turu == "Çelik" and "1998 öncesi" in s_inputs.yonetmelik_donemi: triggered_rules.append("ESKI_YONETMELIK_CELIK")
-        if s_inputs.zemin_sinifi in ["ZD", "ZE"] and s_inputs.yakin_cevre != "Ana Karada / Düz Ova": triggered_rules.append("SIVILASMA_RISKI")
-        if s_inputs.yumusak_kat_riski == "Evet": triggered_rules.append("YUMUSAK_KAT_RISKI")
-        if s_inputs.icerik_hassasiyeti == 'Yüksek' or s_inputs.kritik_makine_bagimliligi == 'Yüksek': triggered_rules.append("SEKTOREL_HASSASIYET")
-        if s_inputs.rg in [1, 2]: triggered_rules.append("ALTYAPI_KESINTI_RISKI")
+        with span("home.report_submit"):
+            triggered_rules = pipeline.get("rules", s_inputs)
+            # Raporun girdileri değişmediyse önceki rerun'daki metin yeniden kullanılır, AI'a gidilmez;
+            # akış henüz sürüyorsa (ör. rapor beklenirken bir widget değişti) yeni istek yerine ona bağlanılır
+            report_text = pipeline.peek("report", s_inputs)
+            report_stream = start_comprehensive_assessment(s_inputs, triggered_rules) if report_text is None else None
 
         st.header(tr("ai_pre_analysis_header"))
-        with st.spinner("AI Teknik Underwriter'ı iki aşamalı senaryo değerlendirmesi yapıyor..."):
-            assessment_report = generate_comprehensive_assessment(s_inputs, triggered_rules)
-            st.markdown(assessment_report, unsafe_allow_html=True)
+        # İki ana bölüm + sonuç bölümü için ayrı alanlar
+        report_slots = [st.empty() for _ in range(3)]
+        if report_stream is not None:
+            report_slots[0].info("AI Teknik Underwriter'ı iki aşamalı senaryo değerlendirmesi yapıyor... Sayısal sonuçlar aşağıda hazır.")
+        else:
+            show_report_sections(report_text, report_slots)
             
-        pd_results = calculate_pd_damage(s_inputs)
-        pd_damage_amount = pd_results["damage_amount"]
-        pd_ratio = pd_results["pml_ratio"]
-        gross_bi_days, net_bi_days_raw = calculate_bi_downtime(pd_ratio, s_inputs)
-        net_bi_days_final = max(0, net_bi_days_raw - s_inputs.bi_gun_muafiyeti)
-        bi_damage_amount = (s_inputs.yillik_brut_kar / 365.0) * net_bi_days_final if s_inputs.yillik_brut_kar > 0 else 0
+        with span("home.pd_bi"):
+            pd_results = pipeline.get("pd", s_inputs)
+            pd_damage_amount = pd_results["damage_amount"]
+            pd_ratio = pd_results["pml_ratio"]
+            gross_bi_days, net_bi_days_final, bi_damage_amount = pipeline.get("bi", s_inputs)
         
         st.header(tr("results_header"))
         m1, m2, m3 = st.columns(3)
         m1.metric("Beklenen PD Hasar Tutarı", money(pd_damage_amount), f"PML: {pd_ratio:.2%}")
         m2.metric("Brüt / Net İş Kesintisi", f"{gross_bi_days} / {net_bi_days_final} gün", "Onarım / Tazmin edilebilir")
         m3.metric("Beklenen BI Hasar Tutarı", money(bi_damage_amount))
+
+        if st.toggle(tr("mc_toggle")):
+            with span("home.monte_carlo"):
+                n_draws = st.select_slider(tr("mc_draws"), options=[100_000, 250_000, 500_000, 1_000_000], value=250_000)
+                dist = pipeline.get("monte_carlo", s_inputs, n_draws=n_draws)
+                mc1, mc2, mc3 = st.columns(3)
+                mc1.metric("Ortalama Toplam Hasar", money(dist.mean["toplam"]))
+                mc2.metric("%99 TVaR", money(dist.tvar[99.0]))
+                mc3.metric("%99.5 Yüzdelik", money(dist.percentiles[99.5]))
+                # event_rate verilmediğinden eksen yıl değil, senaryo depremi gerçekleştiğinde aşılma olasılığının tersidir (1/p)
+                oep_df = pd.DataFrame({"Koşullu Dönüş Periyodu (1/p, deprem olduğunda)": list(dist.oep.keys()), "Hasar Tutarı": list(dist.oep.values())})
+                fig_oep = px.line(oep_df, x="Koşullu Dönüş Periyodu (1/p, deprem olduğunda)", y="Hasar Tutarı", markers=True, log_x=True, title="Koşullu Aşılma Eğrisi (senaryo depremi gerçekleştiğinde)")
+                st.plotly_chart(fig_oep, use_container_width=True)
+
+        if st.toggle(tr("sens_toggle")):
+            with span("home.sensitivity"):
+                # Tüm faktör seviyeleri tek vektörel geçişte; AI çağrısı yapılmaz
+                sens_out = pipeline.get("sensitivity", s_inputs)
+                sens, tornado = sens_out["table"], sens_out["tornado"]
+                bars = pd.concat([
+                    pd.DataFrame({"Faktör": tornado["Faktör"], "Seviye": tornado["En Düşük Seviye"], "Δ Toplam Hasar": tornado["Δ Toplam (Düşük)"], "Yön": "En Düşük"}),
+                    pd.DataFrame({"Faktör": tornado["Faktör"], "Seviye": tornado["En Yüksek Seviye"], "Δ Toplam Hasar": tornado["Δ Toplam (Yüksek)"], "Yön": "En Yüksek"}),
+                ])
+                fig_tornado = px.bar(bars, x="Δ Toplam Hasar", y="Faktör", color="Yön", orientation="h", barmode="overlay", hover_data=["Seviye"], color_discrete_map={"En Düşük": "#27AE60", "En Yüksek": "#E74C3C"}, title="PD + BI Hasarına Etki (mevcut senaryoya göre)")
+                fig_tornado.update_yaxes(categoryorder="array", categoryarray=tornado["Faktör"].tolist()[::-1])
+                st.plotly_chart(fig_tornado, use_container_width=True)
+                with st.expander("Seviye Bazında Sonuçlar"):
+                    st.dataframe(sens.drop(columns=["pml_orani", "brut_kesinti_gun"]).style.format({"pd_hasar": money, "bi_hasar": money, "Δ PD Hasar": money, "Δ BI Hasar": money, "net_kesinti_gun": "{:.0f}"}), use_container_width=True)
+
+                st.subheader(tr("sens_two_way"))
+                factor_names = list(FAKTOR_ETIKETLERI)
+                tw1, tw2, tw3 = st.columns(3)
+                row_factor = tw1.selectbox("Satır Faktörü", factor_names, index=factor_names.index("zemin_sinifi"), format_func=FAKTOR_ETIKETLERI.get)
+                col_factor = tw2.selectbox("Sütun Faktörü", factor_names, index=factor_names.index("yakin_cevre"), format_func=FAKTOR_ETIKETLERI.get)
+                metric = tw3.selectbox("Gösterge", ["pd_hasar", "bi_hasar", "net_kesinti_gun"], format_func={"pd_hasar": "PD Hasar", "bi_hasar": "BI Hasar", "net_kesinti_gun": "Net Kesinti (gün)"}.get)
+                if row_factor == col_factor:
+                    st.info("Lütfen iki farklı faktör seçin.")
+                else:
+                    st.plotly_chart(px.imshow(two_way_grid(s_inputs, row_factor, col_factor, metric), text_auto=".3s", aspect="auto", color_continuous_scale="Reds"), use_container_width=True)
         
         st.markdown("---")
         st.header(tr("analysis_header"))
-        koas_opts, muaf_opts = get_allowed_options(s_inputs.si_pd)
-        results = []
-        for koas in koas_opts:
-            for muaf in muaf_opts:
-                prim_pd = calculate_premium(s_inputs.si_pd, s_inputs.yapi_turu, s_inputs.rg, koas, muaf)
-                prim_bi = calculate_premium(s_inputs.yillik_brut_kar, s_inputs.yapi_turu, s_inputs.rg, koas, muaf, is_bi=True)
-                toplam_prim = prim_pd + prim_bi
-                pd_claim = calculate_net_claim(s_inputs.si_pd, pd_damage_amount, koas, muaf)
-                total_payout = pd_claim["net_tazminat"] + bi_damage_amount
-                retained_risk = (pd_damage_amount + bi_damage_amount) - total_payout
-                verimlilik_skoru = (total_payout / toplam_prim if toplam_prim > 0 else 0) - (retained_risk / s_inputs.si_pd if s_inputs.si_pd > 0 else 0)
-                results.append({"Poliçe Yapısı": f"{koas} / {muaf}%", "Yıllık Toplam Prim": toplam_prim, "Toplam Net Tazminat": total_payout, "Sigortalıda Kalan Risk": retained_risk, "Verimlilik Skoru": verimlilik_skoru})
-        df = pd.DataFrame(results).sort_values("Verimlilik Skoru", ascending=False).reset_index(drop=True)
+        with span("home.policy_grid"):
+            df = pipeline.get("grid", s_inputs)["frame"]
         
-        tab1, tab2 = st.tabs(["📈 Tablo Analizi", "📊 Görsel Analiz"])
-        with tab1:
+        tab1, tab2, tab3 = st.tabs(["📈 Tablo Analizi", "📊 Görsel Analiz", "🧭 Gösterge Pareto (tarife dışı)"])
+        with tab1, span("home.table"):
             st.dataframe(df.style.format({"Yıllık Toplam Prim": money, "Toplam Net Tazminat": money, "Sigortalıda Kalan Risk": money, "Verimlilik Skoru": "{:.2f}"}), use_container_width=True)
-        with tab2:
+        with tab2, span("home.plotly"):
+            import plotly.express as px
             fig = px.scatter(df, x="Yıllık Toplam Prim", y="Sigortalıda Kalan Risk", color="Verimlilik Skoru", color_continuous_scale=px.colors.sequential.Viridis, hover_data=["Poliçe Yapısı", "Toplam Net Tazminat", "Verimlilik Skoru"], title="Poliçe Alternatifleri Maliyet-Risk Analizi")
             fig.update_layout(xaxis_title="Yıllık Toplam Prim", yaxis_title="Hasarda Şirketinizde Kalacak Risk", coloraxis_colorbar_title_text = 'Verimlilik')
             st.plotly_chart(fig, use_container_width=True)
+        with tab3:
+            # Genişletilmiş yapı uzayı (koasürans × ince muafiyet × BI bekleme × azami süre) ve Pareto sınırı.
+            # Tarife dışı katsayılarla fiyatlanır; tarife primi yerine kullanılmamalıdır.
+            st.warning("Bu görünüm göstergedir, tarife primi değildir: BI bekleme/azami süre katsayıları ve tarifede olmayan ara koasürans/muafiyet değerleri varsayımsal olarak enterpole edilir. Tarife primleri için Tablo Analizi ve Görsel Analiz sekmelerini kullanın.")
+            with span("home.pareto"):
+                from tariffeq.pareto import PRIM_SUTUNU
+                pareto_out = pipeline.get("pareto", s_inputs)
+                pareto, candidates = pareto_out["result"], pareto_out["candidates"]
+            with span("home.pareto_plotly"):
+                st.plotly_chart(pipeline.get("pareto_fig", s_inputs), use_container_width=True)
+            n_aday, n_ornek = f"{pareto.n_candidates:,}".replace(",", "."), f"{len(candidates):,}".replace(",", ".")
+            st.caption(f"{n_aday} aday yapı değerlendirildi, {len(pareto.frontier)} yapı gösterge Pareto sınırında. Grafikte {n_ornek} adaylık örnek gösterilir.")
+            with st.expander("Gösterge Pareto Sınırındaki Yapılar (tarife dışı)"):
+                st.dataframe(pareto.frontier.style.format({PRIM_SUTUNU: money, "Sigortalıda Kalan Risk": money, "Muafiyet (%)": "{:.1f}"}), use_container_width=True)
+
+        if report_stream is not None:
+            with span("home.report_wait"):
+                report_text = render_assessment_stream(report_stream, report_slots)
+            # Hatalı/yedek rapor saklanmaz; bir sonraki rerun'da yeniden denenir
+            if not report_stream.errors:
+                pipeline.put("report", s_inputs, report_text)
+            st.session_state.errors.extend(report_stream.errors)
             
     if st.session_state.errors:
         with st.sidebar.expander("⚠️ Geliştirici Hata Logları", expanded=False):
             for error in st.session_state.errors:
                 st.code(error)
 
+    # Aşama süreleri her rerun'da kaydedilir; panel yalnızca geliştirici modunda (TARIFFEQ_DEV=1 veya ?dev=1) görünür
+    record = end_run(trace)
+    if DEV_MODU or st.query_params.get("dev") == "1":
+        with st.sidebar.expander("⏱️ Geliştirici: Aşama Süreleri", expanded=False):
+            st.caption(f"Son çalıştırma: {record['total_ms']:.0f} ms")
+            st.dataframe(trace.rows(), hide_index=True, use_container_width=True)
+            st.dataframe(cache_rows(), hide_index=True, use_container_width=True)
+            if "pipeline" in st.session_state:
+                st.caption("Yeniden hesaplanan aşamalar: " + (", ".join(st.session_state.pipeline.last_computed) or "yok"))
+            reuse = get_near_duplicate_index().audit_rows(20)
+            if reuse:
+                st.caption("Benzer tanım eşleşmesiyle yeniden kullanılan AI yanıtları")
+                st.dataframe(reuse, hide_index=True, use_container_width=True)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,101 @@
+"""Cold-start / rerun import-time report for the Streamlit pages.
+
+For every page the script starts a fresh interpreter, renders the page once with
+streamlit's AppTest (cold start) and once more (rerun), and records which heavy
+libraries ended up in sys.modules. Each heavy library's own import cost is
+measured separately with ``python -X importtime`` so the report can show how much
+start-up time the lazy imports avoid.
+
+Usage:
+    python benchmarks/import_time.py [--json report.json]
+"""
+import argparse
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["Home.py", os.path.join("pages", "Hesaplama.py")]
+HEAVY_MODULES = ["pandas", "plotly.express", "numpy", "google.generativeai", "requests"]
+
+_PAGE_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+t0 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+t1 = time.perf_counter()
+at.run()
+t2 = time.perf_counter()
+print(json.dumps({
+    "first_render_ms": (t1 - t0) * 1000,
+    "rerun_ms": (t2 - t1) * 1000,
+    "exceptions": [str(e.value) for e in at.exception],
+    "loaded": [m for m in sys.argv[2:] if m in sys.modules],
+}))
+"""
+
+
+def library_import_ms(module: str) -> float:
+    # Cumulative import time of `module` on top of an already imported streamlit
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import streamlit; import {module}"],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    if proc.returncode != 0:
+        return float("nan")
+    pattern = re.compile(rf"import time:\s+\d+ \|\s+(\d+) \|\s+{re.escape(module)}$")
+    for line in proc.stderr.splitlines():
+        m = pattern.search(line)
+        if m:
+            return int(m.group(1)) / 1000.0
+    return 0.0
+
+
+def page_timings(page: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", _PAGE_PROBE, os.path.join(ROOT, page), *HEAVY_MODULES],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def build_report() -> dict:
+    libraries = {m: library_import_ms(m) for m in HEAVY_MODULES}
+    pages = {}
+    for page in PAGES:
+        timings = page_timings(page)
+        deferred = [m for m in HEAVY_MODULES if m not in timings["loaded"] and not math.isnan(libraries[m])]
+        timings["deferred"] = deferred
+        timings["deferred_import_ms"] = sum(libraries[m] for m in deferred)
+        pages[page] = timings
+    return {"python": sys.version.split()[0], "libraries_ms": libraries, "pages": pages}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = build_report()
+    print("Library import cost (on top of streamlit):")
+    for module, ms in report["libraries_ms"].items():
+        print(f"  {module:<22} {ms:8.1f} ms")
+    print()
+    print(f"{'page':<22} {'first render':>13} {'rerun':>9} {'deferred imports':>17}  loaded at start")
+    for page, t in report["pages"].items():
+        print(f"{page:<22} {t['first_render_ms']:10.1f} ms {t['rerun_ms']:6.1f} ms {t['deferred_import_ms']:14.1f} ms  {', '.join(t['loaded']) or '-'}")
+        if t["exceptions"]:
+            print(f"  exceptions: {t['exceptions']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
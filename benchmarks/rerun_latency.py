@@ -0,0 +1,84 @@
+"""Rerun latency of the Hesaplama fire page with many locations.
+
+The page is rendered with streamlit's AppTest, the location count is set to the
+maximum and every location gets non-zero sums. One sum is then edited repeatedly
+and each edit is timed as a full script rerun. AppTest always reruns the whole
+script, so the cost of a fragment-scoped rerun (what the browser triggers when a
+widget inside a location editor changes) is read from the page's own stage
+timings: the ``hesaplama.location_editor`` span wraps one editor fragment body.
+
+Usage:
+    python benchmarks/rerun_latency.py [--locations 10] [--edits 20] [--json report.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE = os.path.join(ROOT, "pages", "Hesaplama.py")
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TARIFFEQ_METRICS_JSONL", "")
+os.environ.setdefault("TARIFFEQ_METRICS_PROM", "")
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from tariffeq.metrics import REGISTRY  # noqa: E402
+
+SUM_KEYS = ["building", "fixture", "decoration", "commodity", "safe", "bi", "ec_fixed", "mk_fixed"]
+
+
+def measure(locations: int, edits: int) -> dict:
+    at = AppTest.from_file(PAGE, default_timeout=120)
+    at.run()
+    at.number_input[0].set_value(locations).run()
+    for i in range(locations):
+        for key in SUM_KEYS:
+            at.number_input(key=f"{key}_{i}").set_value(1_000_000.0 * (i + 1))
+    at.run()
+    stages_before = REGISTRY.snapshot()["stages"]
+    full = []
+    for n in range(edits):
+        at.number_input(key=f"building_{locations - 1}").set_value(2_000_000.0 + n)
+        t0 = time.perf_counter()
+        at.run()
+        full.append((time.perf_counter() - t0) * 1000)
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    stages = REGISTRY.snapshot()["stages"]
+    editor = stages.get("hesaplama.location_editor")
+    editor_runs = editor["count"] - stages_before.get("hesaplama.location_editor", {"count": 0})["count"] if editor else 0
+    return {
+        "locations": locations,
+        "edits": edits,
+        "number_inputs": len(at.number_input),
+        "full_rerun_ms_p50": statistics.median(full),
+        "full_rerun_ms_max": max(full),
+        "location_editor_runs": editor_runs,
+        "location_editor_ms_p50": editor["p50_s"] * 1000 if editor else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=10)
+    parser.add_argument("--edits", type=int, default=20)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = measure(args.locations, args.edits)
+    print(f"locations: {report['locations']} ({report['number_inputs']} number inputs)")
+    print(f"full rerun per edit:        p50 {report['full_rerun_ms_p50']:.1f} ms, max {report['full_rerun_ms_max']:.1f} ms")
+    if report["location_editor_ms_p50"] is None:
+        print("location editor fragment:   not present (every edit reruns the whole page)")
+    else:
+        print(f"location editor fragment:   p50 {report['location_editor_ms_p50']:.1f} ms (rerun scope of one edit in the browser)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+"""Reproducible benchmark suite for the tariff and damage calculation cores.
+
+Two families of cases are measured on deterministic synthetic workloads:
+
+* ``ui.*``   – the single-quote path behind the Streamlit pages (one call of each
+  core function, plus the full Home quote with a local stand-in for Gemini), and
+* ``bulk.*`` – the same functions applied to 1 … 1M scenarios / locations, both
+  as plain Python loops and through the vectorised engines.
+
+For every case the median wall time over adaptive repeats (fast cases are
+looped timeit-style) is recorded, and peak memory is measured in a separate
+tracemalloc pass so it does not distort the timing. Each run is appended to a JSON history file; ``--baseline`` compares the
+run against a saved record and exits with status 1 when any case is slower (or
+uses more memory) than the threshold allows. No network access is needed.
+
+Usage:
+    python benchmarks/run.py                                  # default sizes
+    python benchmarks/run.py --sizes 1 1000 1000000 --filter bulk.pd
+    python benchmarks/run.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json --threshold 0.15
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tariffeq.ai import (  # noqa: E402
+    AI_PARAM_OPTIONS,
+    REPORT_SECTION_PREFIX,
+    compute_triggered_rules,
+    fetch_ai_parameters,
+    fetch_assessment,
+)
+from tariffeq.batch import process_chunk  # noqa: E402
+from tariffeq.core import (  # noqa: E402
+    ScenarioInputs,
+    calculate_bi_loss,
+    calculate_net_claim,
+    calculate_pd_damage,
+    calculate_premium,
+    get_allowed_options,
+)
+from tariffeq.car_grid import evaluate_car_grid  # noqa: E402
+from tariffeq.encoding import encode_columns, evaluate_encoded  # noqa: E402
+from tariffeq.fire_engine import fire_group_frame, price_fire_groups  # noqa: E402
+from tariffeq.policy_grid import evaluate_policy_grid  # noqa: E402
+from tariffeq.premium import (  # noqa: E402
+    LOCATION_FIELDS,
+    calculate_car_ear_premium,
+    calculate_fire_premium,
+    determine_group_params,
+)
+from tariffeq.sensitivity import FAKTOR_SECENEKLERI  # noqa: E402
+
+DEFAULT_HISTORY = os.path.join(ROOT, "benchmarks", "history.json")
+DEFAULT_SIZES = [1, 1_000, 100_000]
+SEED = 20240601
+MIN_SAMPLE_SECONDS = 1e-3  # one timing sample loops the case at least this long
+MIN_CASE_SECONDS = 0.2     # repeat samples until this much time is spent ...
+MAX_REPEATS = 50           # ... but no more than this many samples
+NOISE_FLOOR_S = 0.5e-6     # absolute slow-downs below this are ignored
+MEMORY_FLOOR_KIB = 64      # absolute memory growth below this is ignored
+
+
+# --- OFFLINE GEMINI STAND-IN ---
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGemini:
+    # Mimics GenerativeModel.generate_content for the two prompts used by tariffeq.ai,
+    # returning deterministic answers after an optional artificial latency.
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.calls = 0
+
+    def generate_content(self, prompt: str, generation_config=None, stream: bool = False):
+        self.calls += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if (generation_config or {}).get("response_mime_type") == "application/json":
+            return _FakeResponse(json.dumps({name: options[0] for name, options in AI_PARAM_OPTIONS.items()}))
+        text = "".join(f"{REPORT_SECTION_PREFIX}Bölüm {i}\n" + "Değerlendirme metni. " * 40 + "\n" for i in range(1, 5))
+        if stream:
+            return iter(_FakeResponse(text[i:i + 200]) for i in range(0, len(text), 200))
+        return _FakeResponse(text)
+
+
+# --- SYNTHETIC WORKLOADS ---
+def synthetic_columns(n: int, seed: int = SEED) -> Dict[str, list]:
+    # ScenarioInputs fields as columns (the layout of a portfolio file)
+    rng = np.random.default_rng(seed)
+    cols = {
+        "si_pd": rng.choice([50e6, 250e6, 1e9, 3e9, 5e9], n).tolist(),
+        "yillik_brut_kar": rng.choice([0, 25e6, 100e6, 400e6], n).tolist(),
+        "rg": rng.integers(1, 8, n).tolist(),
+        "yapi_turu": rng.choice(["Betonarme", "Çelik", "Yığma"], n).tolist(),
+        "azami_tazminat_suresi": rng.choice([180, 365, 540, 730], n).tolist(),
+        "bitmis_urun_stogu": rng.choice([0, 15, 30], n).tolist(),
+        "bi_gun_muafiyeti": rng.choice([14, 21, 30, 45], n).tolist(),
+        "icerik_hassasiyeti": rng.choice(AI_PARAM_OPTIONS["icerik_hassasiyeti"], n).tolist(),
+        "ffe_riski": rng.choice(AI_PARAM_OPTIONS["ffe_riski"], n).tolist(),
+        "bina_icerik_profili": rng.choice(AI_PARAM_OPTIONS["bina_icerik_profili"], n).tolist(),
+    }
+    for name, levels in FAKTOR_SECENEKLERI.items():
+        cols[name] = rng.choice(levels, n).tolist()
+    cols["faaliyet_tanimi"] = rng.choice(["Tekstil fabrikası", "Soğuk hava deposu", "Veri merkezi", "Otel"], n).tolist()
+    return cols
+
+
+def synthetic_scenarios(n: int, seed: int = SEED) -> List[ScenarioInputs]:
+    cols = synthetic_columns(n, seed)
+    return [ScenarioInputs(**dict(zip(cols, vals))) for vals in zip(*cols.values())]
+
+
+def synthetic_locations(n: int, seed: int = SEED) -> List[dict]:
+    rng = np.random.default_rng(seed)
+    groups = np.array(list("ABCDEFGHIJ"))[rng.integers(0, 10, n)]
+    types = rng.choice(["Betonarme", "Diğer"], n)
+    risk = rng.integers(1, 8, n)
+    sums = rng.choice([0.0, 1e6, 25e6, 150e6], (n, len(LOCATION_FIELDS)))
+    return [
+        {"group": str(groups[i]), "building_type": str(types[i]), "risk_group": int(risk[i]),
+         **dict(zip(LOCATION_FIELDS, sums[i].tolist()))}
+        for i in range(n)
+    ]
+
+
+def synthetic_fire_groups(n: int, seed: int = SEED) -> pd.DataFrame:
+    # An aggregated schedule with n distinct location groups (the bulk import result)
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(rng.choice([0.0, 1e6, 25e6, 150e6, 2e9], (n, len(LOCATION_FIELDS))), columns=list(LOCATION_FIELDS),
+                         index=[f"G{i}" for i in range(n)])
+    frame.insert(0, "building_type", rng.choice(["Betonarme", "Diğer"], n))
+    frame.insert(1, "risk_group", rng.integers(1, 8, n))
+    return frame
+
+
+def synthetic_car_quotes(n: int, seed: int = SEED) -> List[dict]:
+    rng = np.random.default_rng(seed)
+    start = datetime.date(2025, 1, 1)
+    days = rng.integers(180, 1800, n)
+    return [
+        {"risk_group_type": str(t), "risk_class": int(c), "start_date": start,
+         "end_date": start + datetime.timedelta(days=int(d)), "project": float(p), "cpm": float(m), "cpe": float(e),
+         "currency": "TRY", "koas": "80/20", "deduct": 2, "fx_rate": 1.0, "inflation_rate": 0.0}
+        for t, c, d, p, m, e in zip(rng.choice(["RiskGrubuA", "RiskGrubuB"], n), rng.integers(1, 8, n), days,
+                                    rng.choice([50e6, 400e6, 1.2e9], n), rng.choice([0.0, 5e6], n), rng.choice([0.0, 20e6], n))
+    ]
+
+
+# --- CASES ---
+@dataclass
+class Case:
+    name: str
+    n: int
+    setup: Callable[[], object]   # builds the workload (not timed)
+    run: Callable[[object], object]
+
+
+def fire_quote(locations: List[dict]):
+    # The Hesaplama fire path: group aggregation followed by one vectorized pricing call for all groups
+    return price_fire_groups(fire_group_frame(determine_group_params(locations)), "80/20", 2)
+
+
+def fire_groups_loop(groups: pd.DataFrame):
+    # The scalar engine, one call per group (reference for bulk.fire_groups.vectorized)
+    return [calculate_fire_premium(t, r, "TRY", *sums, "70/30", 5, 1.0, 0.0)
+            for t, r, *sums in groups[["building_type", "risk_group", *LOCATION_FIELDS]].itertuples(index=False, name=None)]
+
+
+def home_quote(s: ScenarioInputs, model: FakeGemini):
+    # The Home "calculate" button: AI parameters, PD/BI damage, premium and net claim per allowed structure, report
+    s = replace(s, **fetch_ai_parameters(s.faaliyet_tanimi, model, confidence_threshold=None))
+    pd_results = calculate_pd_damage(s)
+    calculate_bi_loss(pd_results["pml_ratio"], s)
+    koas_opts, muaf_opts = get_allowed_options(s.si_pd)
+    for koas in koas_opts:
+        for muaf in muaf_opts:
+            calculate_premium(s.si_pd, s.yapi_turu, s.rg, koas, muaf)
+            calculate_net_claim(s.si_pd, pd_results["damage_amount"], koas, muaf)
+    calculate_premium(s.yillik_brut_kar, s.yapi_turu, s.rg, "80/20", 2.0, is_bi=True)
+    return fetch_assessment(s, compute_triggered_rules(s), model)
+
+
+def ui_cases() -> List[Case]:
+    s = ScenarioInputs()
+    car = synthetic_car_quotes(1)[0]
+    return [
+        Case("ui.calculate_premium", 1, lambda: s, lambda s: calculate_premium(s.si_pd, s.yapi_turu, s.rg, "80/20", 2.0)),
+        Case("ui.calculate_net_claim", 1, lambda: s, lambda s: calculate_net_claim(s.si_pd, 1e8, "80/20", 2.0)),
+        Case("ui.calculate_pd_damage", 1, lambda: s, calculate_pd_damage),
+        Case("ui.calculate_fire_premium", 1, lambda: None, lambda _: calculate_fire_premium(
+            "Betonarme", 3, "TRY", 1e8, 2e7, 5e6, 3e7, 0.0, 5e7, 1e6, 0.0, 2e6, 0.0, "80/20", 2, 1.0, 0.0)),
+        Case("ui.determine_group_params", 10, lambda: synthetic_locations(10), determine_group_params),
+        Case("ui.calculate_car_ear_premium", 1, lambda: car, lambda q: calculate_car_ear_premium(**q)),
+        Case("ui.evaluate_car_grid", 2 * 7 * 55 * 9 * 5, lambda: car, lambda q: evaluate_car_grid(q["project"], q["cpm"], q["cpe"])),
+        Case("ui.fire_quote", 10, lambda: synthetic_locations(10), fire_quote),
+        Case("ui.home_quote", 1, lambda: (s, FakeGemini()), lambda a: home_quote(*a)),
+    ]
+
+
+def bulk_cases(n: int) -> List[Case]:
+    return [
+        Case("bulk.calculate_premium.loop", n, lambda: synthetic_scenarios(n),
+             lambda ss: [calculate_premium(s.si_pd, s.yapi_turu, s.rg, "80/20", 2.0) for s in ss]),
+        Case("bulk.calculate_net_claim.loop", n, lambda: synthetic_scenarios(n),
+             lambda ss: [calculate_net_claim(s.si_pd, 1e8, "80/20", 2.0) for s in ss]),
+        Case("bulk.pd_bi.loop", n, lambda: synthetic_scenarios(n),
+             lambda ss: [calculate_bi_loss(calculate_pd_damage(s)["pml_ratio"], s) for s in ss]),
+        Case("bulk.pd_bi.encoded", n, lambda: synthetic_columns(n), lambda cols: evaluate_encoded(encode_columns(cols))),
+        Case("bulk.policy_grid", n, lambda: encode_columns(synthetic_columns(n)),
+             lambda enc: evaluate_policy_grid(enc, *get_allowed_options(0))),
+        Case("bulk.batch_chunk", n, lambda: pd.DataFrame(synthetic_columns(n)), process_chunk),
+        Case("bulk.determine_group_params", n, lambda: synthetic_locations(n), determine_group_params),
+        Case("bulk.fire_quote", n, lambda: synthetic_locations(n), fire_quote),
+        Case("bulk.fire_groups.loop", n, lambda: synthetic_fire_groups(n), fire_groups_loop),
+        Case("bulk.fire_groups.vectorized", n, lambda: synthetic_fire_groups(n),
+             lambda groups: price_fire_groups(groups, "70/30", 5)),
+        Case("bulk.calculate_car_ear_premium.loop", n, lambda: synthetic_car_quotes(n),
+             lambda qs: [calculate_car_ear_premium(**q) for q in qs]),
+    ]
+
+
+# --- MEASUREMENT ---
+def measure(case: Case) -> dict:
+    data = case.setup()
+    # Like timeit.autorange: fast cases are looped so one sample lasts at least MIN_SAMPLE_SECONDS
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            case.run(data)
+        elapsed = time.perf_counter() - t0
+        if elapsed >= MIN_SAMPLE_SECONDS:
+            break
+        number *= 10
+    times = [elapsed / number]
+    gc.collect()
+    while len(times) < MAX_REPEATS and (sum(times) * number < MIN_CASE_SECONDS or len(times) < 3):
+        if times[0] > MIN_CASE_SECONDS:
+            break  # large workloads: a single timed run is enough
+        t0 = time.perf_counter()
+        for _ in range(number):
+            case.run(data)
+        times.append((time.perf_counter() - t0) / number)
+    gc.collect()
+    tracemalloc.start()
+    case.run(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    median = statistics.median(times)
+    return {
+        "n": case.n, "repeats": len(times), "loops": number,
+        "median_s": median, "min_s": min(times),
+        "per_item_us": median / max(case.n, 1) * 1e6,
+        "peak_kib": peak / 1024,
+    }
+
+
+def run_suite(sizes: List[int], pattern: Optional[str] = None, progress: bool = True,
+              only: Optional[List[str]] = None) -> Dict[str, dict]:
+    cases = ui_cases() + [c for n in sizes for c in bulk_cases(n)]
+    results = {}
+    for case in cases:
+        key = f"{case.name}[{case.n}]"
+        if (pattern and pattern not in key) or (only is not None and key not in only):
+            continue
+        if progress:
+            print(f"  {key} ...", end="", file=sys.stderr, flush=True)
+        results[key] = measure(case)
+        if progress:
+            print(f" {results[key]['median_s'] * 1000:.3f} ms", file=sys.stderr)
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=ROOT, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return proc.stdout.strip() or None
+
+
+def make_record(results: Dict[str, dict], label: Optional[str]) -> dict:
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "label": label,
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpu)",
+        "results": results,
+    }
+
+
+# --- HISTORY / BASELINE ---
+def load_records(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+def append_history(path: str, record: dict) -> None:
+    records = load_records(path) if os.path.exists(path) else []
+    records.append(record)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=1, ensure_ascii=False)
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float, memory_threshold: float) -> List[dict]:
+    rows = []
+    for key, cur in current.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        # Best-of-samples is the least noisy estimate of the achievable time (as recommended for timeit)
+        time_ratio = cur["min_s"] / base["min_s"] if base["min_s"] > 0 else 1.0
+        mem_ratio = cur["peak_kib"] / base["peak_kib"] if base["peak_kib"] > 0 else 1.0
+        slower = time_ratio > 1 + threshold and cur["min_s"] - base["min_s"] > NOISE_FLOOR_S
+        fatter = mem_ratio > 1 + memory_threshold and cur["peak_kib"] - base["peak_kib"] > MEMORY_FLOOR_KIB
+        rows.append({"case": key, "time_ratio": time_ratio, "mem_ratio": mem_ratio, "regression": slower or fatter})
+    return rows
+
+
+def print_results(results: Dict[str, dict]) -> None:
+    print(f"{'case':<44} {'n':>9} {'median':>12} {'per item':>12} {'peak mem':>12} {'runs':>5}")
+    for key, r in results.items():
+        print(f"{key.split('[')[0]:<44} {r['n']:>9,} {r['median_s'] * 1000:>9.3f} ms {r['per_item_us']:>9.3f} µs "
+              f"{r['peak_kib']:>8.1f} KiB {r['repeats']:>5}")
+
+
+def print_comparison(rows: List[dict], threshold: float) -> None:
+    print()
+    print(f"Comparison against baseline (threshold +{threshold:.0%}):")
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"  {row['case']:<54} time x{row['time_ratio']:6.2f}  mem x{row['mem_ratio']:6.2f}  {flag}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="bulk workload sizes (e.g. 1 1000 1000000)")
+    parser.add_argument("--filter", help="only run cases whose name contains this text")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON history file the run is appended to")
+    parser.add_argument("--no-history", action="store_true", help="do not append this run to the history file")
+    parser.add_argument("--label", help="free-form label stored with the run")
+    parser.add_argument("--baseline", help="record (or history file: last entry) to compare against")
+    parser.add_argument("--save-baseline", help="write this run as a baseline record to the given path")
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed relative slow-down before failing")
+    parser.add_argument("--memory-threshold", type=float, default=0.25, help="allowed relative peak-memory growth")
+    parser.add_argument("--confirm", type=int, default=2, help="re-measure flagged cases this many times before failing")
+    parser.add_argument("--json", action="store_true", help="print the run record as JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.filter, progress=not args.json)
+    rows = []
+    if args.baseline:
+        baseline = load_records(args.baseline)[-1]["results"]
+        rows = compare(results, baseline, args.threshold, args.memory_threshold)
+        # Timing noise on shared machines is common: flagged cases are measured again and the best run is kept
+        for _ in range(args.confirm):
+            flagged = [row["case"] for row in rows if row["regression"]]
+            if not flagged:
+                break
+            for key, again in run_suite(args.sizes, args.filter, progress=not args.json, only=flagged).items():
+                if again["min_s"] < results[key]["min_s"]:
+                    results[key] = again
+            rows = compare(results, baseline, args.threshold, args.memory_threshold)
+
+    record = make_record(results, args.label)
+    if args.json:
+        print(json.dumps(record, indent=1, ensure_ascii=False))
+    else:
+        print_results(results)
+        if rows:
+            print_comparison(rows, args.threshold)
+    if not args.no_history:
+        append_history(args.history, record)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=1, ensure_ascii=False)
+    return 1 if any(row["regression"] for row in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
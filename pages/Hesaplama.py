@@ -1,12 +1,24 @@
+import os
 import streamlit as st
-import requests
-import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
 
+from tariffeq.fx import ZAMAN_ASIMI, FxPrefetcher
+from tariffeq.fx_history import FxHistory
+from tariffeq.metrics import DEV_MODU, begin_run, cache_rows, end_run, span
+from tariffeq.premium import (
+    LOCATION_FIELDS,
+    calculate_car_ear_premium,
+    calculate_months_difference,
+    determine_group_params,
+)
+from tariffeq.quote_ledger import QuoteLedger, StoredQuote, quote_hash
+from tariffeq.tariff import current_tariff, tariff_for
+
 # ------------------------------------------------------------
 # STREAMLIT CONFIG (must be first)
 # ------------------------------------------------------------
 st.set_page_config(page_title="TariffEQ", layout="centered")
+trace = begin_run("hesaplama")
 
 # Custom CSS for styling
 st.markdown("""
@@ -29,6 +41,17 @@ st.markdown("""
         text-align: center;
         margin-bottom: 1em;
     }
+    .logo {
+        text-align: center;
+        margin: 0 0 1em 0;
+    }
+    .logo img {
+        max-width: 100%;
+    }
+    .logo figcaption {
+        font-size: 0.875em;
+        color: #808495;
+    }
     .section-header {
         font-size: 1.5em;
         color: #1A5276;
@@ -79,6 +102,12 @@ T = {
     "calc_car": {"TR": "İnşaat & Montaj (CAR & EAR)", "EN": "Construction & Erection (CAR & EAR)"},
     "num_locations": {"TR": "Lokasyon Sayısı", "EN": "Number of Locations"},
     "num_locations_help": {"TR": "Hesaplama yapılacak lokasyon sayısını girin (1-10).", "EN": "Enter the number of locations to calculate (1-10)."},
+    "bulk_import": {"TR": "Lokasyon listesini dosyadan yükle (CSV/Excel)", "EN": "Import the location schedule from a file (CSV/Excel)"},
+    "bulk_import_help": {"TR": "Gerekli sütunlar: grup, yapı tarzı (Betonarme/Diğer), risk grubu (1-7). Bedel sütunları: bina, demirbaş, dekorasyon, emtia, kasa, kar kaybı, ec sabit/seyyar, mk sabit/seyyar (eksikse 0).", "EN": "Required columns: group, building_type (Betonarme/Diğer), risk_group (1-7). Sum columns: building, fixture, decoration, commodity, safe, bi, ec_fixed/ec_mobile, mk_fixed/mk_mobile (0 if missing)."},
+    "bulk_file": {"TR": "Lokasyon Listesi", "EN": "Location Schedule"},
+    "bulk_summary": {"TR": "{locations} lokasyon {groups} grupta toplandı.", "EN": "{locations} locations aggregated into {groups} groups."},
+    "quote_reused": {"TR": "📒 Aynı girdilerle {when} tarihinde verilmiş teklif defterden getirildi (kur: {source}).", "EN": "📒 Identical quote issued on {when} was loaded from the ledger (FX: {source})."},
+    "bulk_file_missing": {"TR": "Lütfen önce bir lokasyon listesi yükleyin.", "EN": "Please upload a location schedule first."},
     "location_group": {"TR": "Riziko Adresi Grubu", "EN": "Risk Address Group"},
     "location_group_help": {"TR": "Aynı riziko adresindeki lokasyonları aynı gruba atayın.", "EN": "Assign locations at the same risk address to the same group."},
     "building_type": {"TR": "Yapı Tarzı", "EN": "Construction Type"},
@@ -87,6 +116,8 @@ T = {
     "risk_group_help": {"TR": "Deprem risk grupları, Doğal Afet Sigortaları Kurumu tarafından belirlenir. 1. Grup en yüksek risktir.", "EN": "Earthquake risk zones are determined by the Natural Disaster Insurance Institution. Zone 1 is the highest risk."},
     "currency": {"TR": "Para Birimi", "EN": "Currency"},
     "manual_fx": {"TR": "Kuru manuel güncelleyebilirsiniz", "EN": "You can manually update the exchange rate"},
+    "fx_as_of_missing": {"TR": "{date} için yerel kur arşivinde kayıt yok; güncel TCMB kuru kullanılıyor.", "EN": "No local archive rate for {date}; using the current TCMB rate."},
+    "fx_stale": {"TR": "TCMB kurları şu anda güncellenemiyor; {date} tarihli son geçerli kur gösteriliyor.", "EN": "TCMB rates cannot be refreshed right now; showing the last valid rates dated {date}."},
     "building_sum": {"TR": "Bina Bedeli", "EN": "Building Sum Insured"},
     "building_sum_help": {"TR": "Bina için sigorta bedeli. Betonarme binalar için birim metrekare fiyatı min. 18,600 TL, diğerleri için 12,600 TL.", "EN": "Sum insured for the building. Min. unit square meter price for concrete buildings: 18,600 TL; others: 12,600 TL."},
     "fixture_sum": {"TR": "Demirbaş Bedeli", "EN": "Fixture Sum Insured"},
@@ -122,6 +153,8 @@ T = {
     "end": {"TR": "Poliçe Bitişi", "EN": "Policy End"},
     "duration": {"TR": "Süre", "EN": "Duration"},
     "months": {"TR": "ay", "EN": "months"},
+    "duration_curve": {"TR": "📈 Süreye Göre Prim (6-60 ay, tüm risk sınıfları)", "EN": "📈 Premium by Duration (6-60 months, all risk classes)"},
+    "duration_curve_caption": {"TR": "Seçili risk grubu tipi, koasürans ve muafiyet için; mevcut teklif {months} ay, risk sınıfı {risk_class}.", "EN": "For the selected risk group type, coinsurance and deductible; current quote is {months} months, risk class {risk_class}."},
     "duration_help": {"TR": "Sigorta süresi. 36 aydan uzun projelerde her ay için %3 eklenir.", "EN": "Policy duration. For projects over 36 months, 3% is added per month."},
     "coins": {"TR": "Koasürans", "EN": "Coinsurance"},
     "coins_help": {"TR": "Sigortalının hasara iştirak oranı. Min. %20 sigortalı üzerinde kalır. %60’a kadar artırılabilir (max. %50 indirim).", "EN": "Insured's share in the loss. Min. 20% remains with the insured. Can be increased to 60% (max. 50% discount)."},
@@ -163,45 +196,49 @@ def tr(key: str) -> str:
 # ------------------------------------------------------------
 # 1) TCMB FX MODULE
 # ------------------------------------------------------------
-@st.cache_data(ttl=3600)
+@st.cache_resource(show_spinner=False)
+def get_fx_prefetcher() -> FxPrefetcher:
+    # One refresher thread per process keeps the TCMB table warm for every session
+    return FxPrefetcher().start()
+
+get_fx_prefetcher()  # start warming on page load, before any currency is selected
+
 def get_tcmb_rate(ccy: str):
-    try:
-        r = requests.get("https://www.tcmb.gov.tr/kurlar/today.xml", timeout=4)
-        r.raise_for_status()
-        root = ET.fromstring(r.content)
-        for cur in root.findall("Currency"):
-            if cur.attrib.get("CurrencyCode") == ccy:
-                txt = cur.findtext("BanknoteSelling") or cur.findtext("ForexSelling")
-                return float(txt.replace(",", ".")), datetime.strptime(root.attrib["Date"], "%d.%m.%Y").strftime("%Y-%m-%d")
-    except Exception:
-        pass
-    today = datetime.today()
-    for i in range(1, 8):
-        d = today - timedelta(days=i)
-        url = f"https://www.tcmb.gov.tr/kurlar/{d:%Y%m}/{d:%d%m%Y}.xml"
-        try:
-            r = requests.get(url, timeout=4)
-            if not r.ok:
-                continue
-            root = ET.fromstring(r.content)
-            for cur in root.findall("Currency"):
-                if cur.attrib.get("CurrencyCode") == ccy:
-                    txt = cur.findtext("BanknoteSelling") or cur.findtext("ForexSelling")
-                    return float(txt.replace(",", ".")), d.strftime("%Y-%m-%d")
-        except Exception:
-            continue
-    return None, None
+    # In-memory lookup; only the very first request after process start waits for the initial fetch
+    fx = get_fx_prefetcher().wait_ready(timeout=ZAMAN_ASIMI)
+    rate = fx.table.rate(ccy) if fx.table is not None else None
+    return (rate, fx.table.date) if rate is not None else (None, None)
 
-def fx_input(ccy: str, key_prefix: str) -> float:
+@st.cache_resource(show_spinner=False)
+def get_fx_history() -> FxHistory:
+    # Local TCMB archive filled with `python -m tariffeq.fx_history import|download`; empty until then
+    return FxHistory()
+
+def get_tcmb_rate_as_of(ccy: str, as_of):
+    # Rate published on as_of or the last business day before it, from the local archive.
+    # Returns None when the archive has no rate for that date (the caller falls back to the live table).
+    hit = get_fx_history().rate_on(ccy, as_of)
+    return (hit[0], hit[1].strftime("%Y-%m-%d")) if hit is not None else None
+
+def fx_input(ccy: str, key_prefix: str, as_of=None) -> float:
+    source_key = f"{key_prefix}_fx_source"  # read back by the quote ledger
     if ccy == "TRY":
+        st.session_state[source_key] = "TRY"
         return 1.0, ""
+    historical = as_of is not None and as_of < datetime.today().date()
+    if historical:
+        key_prefix = f"{key_prefix}_{as_of:%Y%m%d}"
     r_key = f"{key_prefix}_{ccy}_rate"
     s_key = f"{key_prefix}_{ccy}_src"
     tcmb_rate_key = f"{key_prefix}_{ccy}_tcmb_rate"
     tcmb_date_key = f"{key_prefix}_{ccy}_tcmb_date"
+    as_of_missing_key = f"{key_prefix}_{ccy}_as_of_missing"
     
     if tcmb_rate_key not in st.session_state:
-        tcmb_rate, tcmb_date = get_tcmb_rate(ccy)
+        with span("hesaplama.fx"):
+            archived = get_tcmb_rate_as_of(ccy, as_of) if historical else None
+            st.session_state[as_of_missing_key] = historical and archived is None
+            tcmb_rate, tcmb_date = archived or get_tcmb_rate(ccy)
         if tcmb_rate is None:
             st.session_state.update({
                 tcmb_rate_key: 0.0,
@@ -226,254 +263,146 @@ def fx_input(ccy: str, key_prefix: str) -> float:
         st.session_state[s_key] = "TCMB"
     
     st.session_state[r_key] = new_rate
+    st.session_state[source_key] = "MANUEL" if st.session_state[s_key] == "MANUEL" else f"TCMB {st.session_state[tcmb_date_key]}"
     
     info_message = (
         f"💱 TCMB Kuru: 1 {ccy} = {st.session_state[tcmb_rate_key]:,.4f} TL (TCMB, {st.session_state[tcmb_date_key]}) | "
         f"Kullanılan Kur: 1 {ccy} = {st.session_state[r_key]:,.4f} TL ({st.session_state[s_key]})"
     )
     st.info(info_message)
+    if st.session_state[as_of_missing_key]:
+        st.caption(tr("fx_as_of_missing").format(date=as_of))
+    fx = get_fx_prefetcher().snapshot()
+    if fx.table is not None and fx.stale:
+        st.warning(tr("fx_stale").format(date=fx.table.date))
     return st.session_state[r_key], info_message
 
+# ------------------------------------------------------------
+# QUOTE LEDGER
+# ------------------------------------------------------------
+@st.cache_resource(show_spinner=False)
+def get_quote_ledger() -> QuoteLedger:
+    # Shared by all sessions; repeat quotes are served from the ledger instead of being recomputed
+    return QuoteLedger()
+
+def show_quote_reused(stored: StoredQuote) -> None:
+    st.caption(tr("quote_reused").format(when=datetime.fromtimestamp(stored.created).strftime("%d.%m.%Y %H:%M"), source=stored.fx_source))
+
 # Helper function to format numbers with thousand separators
 def format_number(value: float, currency: str) -> str:
     formatted_value = f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
     return f"{formatted_value} {currency}"
 
 # ------------------------------------------------------------
-# 2) CONSTANT TABLES
+# 2) TARIFF ENGINES (shared with the pricing service, see tariffeq/premium.py)
 # ------------------------------------------------------------
-tarife_oranlari = {
-    "Betonarme": [3.13, 2.63, 2.38, 1.94, 1.38, 1.06, 0.75],
-    "Diğer": [6.13, 5.56, 3.75, 2.00, 1.56, 1.24, 1.06],
-    "RiskGrubuA": [1.56, 1.31, 1.19, 0.98, 0.69, 0.54, 0.38],
-    "RiskGrubuB": [3.06, 2.79, 1.88, 1.00, 0.79, 0.63, 0.54]
-}
-koasurans_indirimi = {
-    "80/20": 0.0, "75/25": 0.0625, "70/30": 0.125, "65/35": 0.1875,
-    "60/40": 0.25, "55/45": 0.3125, "50/50": 0.375, "45/55": 0.4375,
-    "40/60": 0.50,
-    "30/70": 0.125, "25/75": 0.0625,
-    "90/10": -0.125, "100/0": -0.25
-}
-koasurans_indirimi_car = {
-    "80/20": 0.0, "75/25": 0.0625, "70/30": 0.125, "65/35": 0.1875,
-    "60/40": 0.25, "55/45": 0.3125, "50/50": 0.375, "45/55": 0.4375,
-    "40/60": 0.50
-}
-muafiyet_indirimi = {
-    2: 0.0, 3: 0.06, 4: 0.13, 5: 0.19, 10: 0.35,
-    0.1: -0.12, 0.5: -0.09, 1: -0.06, 1.5: -0.03
-}
-muafiyet_indirimi_car = {
-    2: 0.0, 3: 0.06, 4: 0.13, 5: 0.19, 10: 0.35
-}
-sure_carpani_tablosu = {
-    6: 0.70, 7: 0.75, 8: 0.80, 9: 0.85, 10: 0.90, 11: 0.95, 12: 1.00,
-    13: 1.05, 14: 1.10, 15: 1.15, 16: 1.20, 17: 1.25, 18: 1.30,
-    19: 1.35, 20: 1.40, 21: 1.45, 22: 1.50, 23: 1.55, 24: 1.60,
-    25: 1.65, 26: 1.70, 27: 1.74, 28: 1.78, 29: 1.82, 30: 1.86,
-    31: 1.90, 32: 1.94, 33: 1.98, 34: 2.02, 35: 2.06, 36: 2.10
-}
+def warn_limit(key: str) -> None:
+    st.warning(tr(key))
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_location_schedule(data: bytes, filename: str):
+    # Parsed once per uploaded file; reruns reuse the aggregated groups.
+    # tariffeq.locations needs pandas, so it is imported here and the page opens without it.
+    from tariffeq.locations import aggregate_location_groups, read_location_schedule
+    locations = read_location_schedule(data, filename)
+    return len(locations), aggregate_location_groups(locations)
 
 # ------------------------------------------------------------
-# 3) CALCULATION LOGIC
+# 3) STREAMLIT UI
 # ------------------------------------------------------------
-def calculate_duration_multiplier(months: int) -> float:
-    if months <= 36:
-        return sure_carpani_tablosu.get(months, 1.0)
-    base = sure_carpani_tablosu[36]
-    extra_months = months - 36
-    return base + (0.03 * extra_months)
-
-def calculate_months_difference(start_date, end_date):
-    months = (end_date.year - start_date.year) * 12 + (end_date.month - start_date.month)
-    total_days = (end_date - start_date).days
-    year_diff = end_date.year - start_date.year
-    month_diff = end_date.month - start_date.month
-    estimated_days = (year_diff * 365) + (month_diff * 30)
-    remaining_days = total_days - estimated_days
-    if remaining_days >= 15:
-        months += 1
-    return months
-
-def determine_group_params(locations_data):
-    groups = {}
-    for loc in locations_data:
-        group = loc["group"]
-        if group not in groups:
-            groups[group] = []
-        groups[group].append(loc)
-    
-    result = {}
-    for group, locs in groups.items():
-        building_types = [loc["building_type"] for loc in locs]
-        building_type = "Diğer" if "Diğer" in building_types else "Betonarme"
+@st.fragment
+def location_editor(i: int, groups: list, currency: str) -> None:
+    # Reruns on its own when one of its widgets changes; the page reads the values back from session_state
+    with span("hesaplama.location_editor"):
+        col1, col2 = st.columns(2)
+        with col1:
+            st.selectbox(tr("building_type"), ["Betonarme", "Diğer"], key=f"building_type_{i}", help=tr("building_type_help"))
+            st.selectbox(tr("risk_group"), [1, 2, 3, 4, 5, 6, 7], key=f"risk_group_{i}", help=tr("risk_group_help"))
+        with col2:
+            st.selectbox(tr("location_group"), groups, key=f"group_{i}", help=tr("location_group_help"))
         
-        risk_groups = [loc["risk_group"] for loc in locs]
-        risk_group = min(risk_groups)
+        st.markdown(f"#### {tr('insurance_sums')}")
         
-        building = sum(loc["building"] for loc in locs)
-        fixture = sum(loc["fixture"] for loc in locs)
-        decoration = sum(loc["decoration"] for loc in locs)
-        commodity = sum(loc["commodity"] for loc in locs)
-        safe = sum(loc["safe"] for loc in locs)
-        bi = sum(loc["bi"] for loc in locs)
-        ec_fixed = sum(loc["ec_fixed"] for loc in locs)
-        ec_mobile = sum(loc["ec_mobile"] for loc in locs)
-        mk_fixed = sum(loc["mk_fixed"] for loc in locs)
-        mk_mobile = sum(loc["mk_mobile"] for loc in locs)
-        
-        result[group] = {
-            "building_type": building_type,
-            "risk_group": risk_group,
-            "building": building,
-            "fixture": fixture,
-            "decoration": decoration,
-            "commodity": commodity,
-            "safe": safe,
-            "bi": bi,
-            "ec_fixed": ec_fixed,
-            "ec_mobile": ec_mobile,
-            "mk_fixed": mk_fixed,
-            "mk_mobile": mk_mobile
-        }
-    return result
+        col3, col4, col5 = st.columns(3)
+        with col3:
+            building = st.number_input(tr("building_sum"), min_value=0.0, value=0.0, step=1000.0, key=f"building_{i}", help=tr("building_sum_help"))
+            if building > 0:
+                st.write(f"{tr('entered_value')}: {format_number(building, currency)}")
+            fixture = st.number_input(tr("fixture_sum"), min_value=0.0, value=0.0, step=1000.0, key=f"fixture_{i}", help=tr("fixture_sum_help"))
+            if fixture > 0:
+                st.write(f"{tr('entered_value')}: {format_number(fixture, currency)}")
+            decoration = st.number_input(tr("decoration_sum"), min_value=0.0, value=0.0, step=1000.0, key=f"decoration_{i}", help=tr("decoration_sum_help"))
+            if decoration > 0:
+                st.write(f"{tr('entered_value')}: {format_number(decoration, currency)}")
+            bi = st.number_input(tr("bi"), min_value=0.0, value=0.0, step=1000.0, key=f"bi_{i}", help=tr("bi_help"))
+            if bi > 0:
+                st.write(f"{tr('entered_value')}: {format_number(bi, currency)}")
+        with col4:
+            commodity = st.number_input(tr("commodity_sum"), min_value=0.0, value=0.0, step=1000.0, key=f"commodity_{i}", help=tr("commodity_sum_help"))
+            if commodity > 0:
+                st.write(f"{tr('entered_value')}: {format_number(commodity, currency)}")
+            safe = st.number_input(tr("safe_sum"), min_value=0.0, value=0.0, step=1000.0, key=f"safe_{i}", help=tr("safe_sum_help"))
+            if safe > 0:
+                st.write(f"{tr('entered_value')}: {format_number(safe, currency)}")
+        with col5:
+            ec_fixed = st.number_input(tr("ec_fixed"), min_value=0.0, value=0.0, step=1000.0, key=f"ec_fixed_{i}", help=tr("ec_fixed_help"))
+            if ec_fixed > 0:
+                st.write(f"{tr('entered_value')}: {format_number(ec_fixed, currency)}")
+            ec_mobile = st.number_input(tr("ec_mobile"), min_value=0.0, value=0.0, step=1000.0, key=f"ec_mobile_{i}", help=tr("ec_mobile_help"))
+            if ec_mobile > 0:
+                st.write(f"{tr('entered_value')}: {format_number(ec_mobile, currency)}")
+            mk_fixed = st.number_input(tr("mk_fixed"), min_value=0.0, value=0.0, step=1000.0, key=f"mk_fixed_{i}", help=tr("mk_fixed_help"))
+            if mk_fixed > 0:
+                st.write(f"{tr('entered_value')}: {format_number(mk_fixed, currency)}")
+            mk_mobile = st.number_input(tr("mk_mobile"), min_value=0.0, value=0.0, step=1000.0, key=f"mk_mobile_{i}", help=tr("mk_mobile_help"))
+            if mk_mobile > 0:
+                st.write(f"{tr('entered_value')}: {format_number(mk_mobile, currency)}")
 
-def calculate_fire_premium(building_type, risk_group, currency, building, fixture, decoration, commodity, safe, bi, ec_fixed, ec_mobile, mk_fixed, mk_mobile, koas, deduct, fx_rate, inflation_rate):
-    # Calculate individual sums insured in TRY
-    building_sum_insured = building * fx_rate
-    fixture_sum_insured = fixture * fx_rate
-    decoration_sum_insured = decoration * fx_rate
-    commodity_sum_insured = commodity * fx_rate
-    safe_sum_insured = safe * fx_rate
-    bi_sum_insured = bi * fx_rate
-    ec_fixed_sum_insured = ec_fixed * fx_rate
-    ec_mobile_sum_insured = ec_mobile * fx_rate
-    mk_fixed_sum_insured = mk_fixed * fx_rate
-    mk_mobile_sum_insured = mk_mobile * fx_rate
-    
-    # Calculate total sum insured for PD (including EC and MK for limit check)
-    pd_sum_insured = (building_sum_insured + fixture_sum_insured + decoration_sum_insured + commodity_sum_insured + safe_sum_insured + ec_fixed_sum_insured + ec_mobile_sum_insured + mk_fixed_sum_insured + mk_mobile_sum_insured)
-    
-    # Base rate from tariff table
-    rate = tarife_oranlari[building_type][risk_group - 1]
-    
-    # Adjust rate for inflation (increase by half of the inflation rate)
-    inflation_multiplier = 1 + (inflation_rate / 100) / 2
-    rate *= inflation_multiplier
-    
-    LIMIT_FIRE = 3_500_000_000
-    LIMIT_EC_MK = 840_000_000
-    
-    # Check total sum insured against the 3.5 billion TRY limit
-    if pd_sum_insured > LIMIT_FIRE:
-        st.warning(tr("limit_warning_fire_pd"))
-    
-    # PD Premium (excluding EC and MK for actual premium calculation, but included in limit check)
-    pd_sum_for_premium = (building_sum_insured + fixture_sum_insured + decoration_sum_insured + commodity_sum_insured + safe_sum_insured)
-    koas_discount = koasurans_indirimi[koas]
-    deduct_discount = muafiyet_indirimi[deduct]
-    adjusted_rate_pd = rate * (1 - koas_discount) * (1 - deduct_discount)
-    if pd_sum_insured > LIMIT_FIRE:
-        adjusted_rate_pd = round(adjusted_rate_pd * (LIMIT_FIRE / pd_sum_insured), 6)
-    pd_premium = (pd_sum_for_premium * adjusted_rate_pd) / 1000
-    
-    # BI Premium (no koas/deduct discount as per tariff)
-    adjusted_rate_bi = rate
-    if bi_sum_insured > LIMIT_FIRE:
-        st.warning(tr("limit_warning_fire_bi"))
-        adjusted_rate_bi = round(adjusted_rate_bi * (LIMIT_FIRE / bi_sum_insured), 6)
-    bi_premium = (bi_sum_insured * adjusted_rate_bi) / 1000
-    
-    # EC Premium
-    ec_premium = 0.0
-    ec_fixed_premium = 0.0
-    ec_mobile_premium = 0.0
-    if ec_fixed > 0:
-        ec_fixed_rate = rate * (1 - koas_discount) * (1 - deduct_discount)
-        if ec_fixed_sum_insured > LIMIT_EC_MK:
-            st.warning(tr("limit_warning_ec"))
-            ec_fixed_rate = round(ec_fixed_rate * (LIMIT_EC_MK / ec_fixed_sum_insured), 6)
-        ec_fixed_premium = (ec_fixed_sum_insured * ec_fixed_rate) / 1000
-    if ec_mobile > 0:
-        ec_mobile_rate = 2.00 * inflation_multiplier  # Apply inflation to mobile rate as well
-        if ec_mobile_sum_insured > LIMIT_EC_MK:
-            st.warning(tr("limit_warning_ec"))
-            ec_mobile_rate = round(ec_mobile_rate * (LIMIT_EC_MK / ec_mobile_sum_insured), 6)
-        ec_mobile_premium = (ec_mobile_sum_insured * ec_mobile_rate) / 1000
-    ec_premium = ec_fixed_premium + ec_mobile_premium
-    
-    # MK Premium
-    mk_premium = 0.0
-    mk_fixed_premium = 0.0
-    mk_mobile_premium = 0.0
-    if mk_fixed > 0:
-        mk_fixed_rate = rate * (1 - koas_discount) * (1 - deduct_discount)
-        if mk_fixed_sum_insured > LIMIT_EC_MK:
-            st.warning(tr("limit_warning_mk"))
-            mk_fixed_rate = round(mk_fixed_rate * (LIMIT_EC_MK / mk_fixed_sum_insured), 6)
-        mk_fixed_premium = (mk_fixed_sum_insured * mk_fixed_rate) / 1000
-    if mk_mobile > 0:
-        mk_mobile_rate = 2.00 * inflation_multiplier  # Apply inflation to mobile rate as well
-        if mk_mobile_sum_insured > LIMIT_EC_MK:
-            st.warning(tr("limit_warning_mk"))
-            mk_mobile_rate = round(mk_mobile_rate * (LIMIT_EC_MK / mk_mobile_sum_insured), 6)
-        mk_mobile_premium = (mk_mobile_sum_insured * mk_mobile_rate) / 1000
-    mk_premium = mk_fixed_premium + mk_mobile_premium
-    
-    total_premium = pd_premium + bi_premium + ec_premium + mk_premium
-    
-    return pd_premium, bi_premium, ec_premium, mk_premium, total_premium, rate
+def location_values(i: int) -> dict:
+    state = st.session_state
+    return {
+        "group": state.get(f"group_{i}", "A"),
+        "building_type": state.get(f"building_type_{i}", "Betonarme"),
+        "risk_group": state.get(f"risk_group_{i}", 1),
+        **{field: state.get(f"{field}_{i}", 0.0) for field in LOCATION_FIELDS},
+    }
 
-def calculate_car_ear_premium(risk_group_type, risk_class, start_date, end_date, project, cpm, cpe, currency, koas, deduct, fx_rate, inflation_rate):
-    duration_months = calculate_months_difference(start_date, end_date)
-    
-    base_rate = tarife_oranlari[risk_group_type][risk_class - 1]
-    
-    # Adjust base rate for inflation (increase by half of the inflation rate)
-    inflation_multiplier = 1 + (inflation_rate / 100) / 2
-    base_rate *= inflation_multiplier
-    
-    duration_multiplier = calculate_duration_multiplier(duration_months)
-    koas_discount = koasurans_indirimi_car[koas]
-    deduct_discount = muafiyet_indirimi_car[deduct]
-    
-    LIMIT = 840_000_000
-    
-    project_sum_insured = project * fx_rate
-    car_rate = base_rate * duration_multiplier * (1 - koas_discount) * (1 - deduct_discount)
-    if project_sum_insured > LIMIT:
-        st.warning(tr("limit_warning_car"))
-        car_rate *= (LIMIT / project_sum_insured)
-    car_premium = (project_sum_insured * car_rate) / 1000
-    
-    cpm_sum_insured = cpm * fx_rate
-    cpm_rate = 1.25 * inflation_multiplier  # Apply inflation to CPM rate
-    if cpm_sum_insured > LIMIT:
-        st.warning(tr("limit_warning_car"))
-        cpm_rate *= (LIMIT / cpm_sum_insured)
-    cpm_premium = (cpm_sum_insured * cpm_rate / 1000) * duration_multiplier
-    
-    cpe_sum_insured = cpe * fx_rate
-    cpe_rate = base_rate * duration_multiplier
-    if cpe_sum_insured > LIMIT:
-        st.warning(tr("limit_warning_car"))
-        cpe_rate *= (LIMIT / cpe_sum_insured)
-    cpe_premium = (cpe_sum_insured * cpe_rate) / 1000
-    
-    total_premium = car_premium + cpm_premium + cpe_premium
-    
-    return car_premium, cpm_premium, cpe_premium, total_premium, car_rate
+LOGO_URL = "https://i.ibb.co/PzWSdnQb/Logo.png"
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGO_PATH = os.path.join(_ROOT_DIR, "assets", "logo.png")
+LOGO_CACHE_PATH = os.path.join(_ROOT_DIR, ".cache", "assets", "logo.png")
+
+def _data_uri(path: str) -> str:
+    import base64
+    with open(path, "rb") as f:
+        return "data:image/png;base64," + base64.b64encode(f.read()).decode("ascii")
+
+@st.cache_resource(show_spinner=False)
+def get_logo() -> str:
+    # Serve the logo from local disk. If it is not bundled under assets/, download it once
+    # per process into the local cache; the remote URL is only used if that fails.
+    # Returns an <img> source: local files are inlined as a data URI, because st.image
+    # imports numpy on every call and would put it on the page's start-up path.
+    for path in (LOGO_PATH, LOGO_CACHE_PATH):
+        if os.path.exists(path):
+            return _data_uri(path)
+    try:
+        import requests
+        r = requests.get(LOGO_URL, timeout=4)
+        r.raise_for_status()
+        os.makedirs(os.path.dirname(LOGO_CACHE_PATH), exist_ok=True)
+        with open(LOGO_CACHE_PATH, "wb") as f:
+            f.write(r.content)
+        return _data_uri(LOGO_CACHE_PATH)
+    except Exception:
+        return LOGO_URL
 
-# ------------------------------------------------------------
-# 4) STREAMLIT UI
-# ------------------------------------------------------------
 # Header with Image
 st.markdown(f'<h1 class="main-title">🏷️ {tr("title")}</h1>', unsafe_allow_html=True)
 st.markdown(f'<h3 class="subtitle">{tr("subtitle")}</h3>', unsafe_allow_html=True)
 st.markdown('<p class="founders">Founders: Ubeydullah Ayvaz & Furkan Kaymaz</p>', unsafe_allow_html=True)
 
-st.image("https://i.ibb.co/PzWSdnQb/Logo.png", caption=tr("title"))
+st.markdown(f'<figure class="logo"><img src="{get_logo()}" alt="TariffEQ"><figcaption>{tr("title")}</figcaption></figure>', unsafe_allow_html=True)
 
 # Main Content
 st.markdown('<h2 class="section-header">📌 ' + ("Hesaplama Yap" if lang == "TR" else "Perform Calculation") + '</h2>', unsafe_allow_html=True)
@@ -482,122 +411,97 @@ calc_type = st.selectbox(tr("select_calc"), [tr("calc_fire"), tr("calc_car")], h
 if calc_type == tr("calc_fire"):
     st.markdown(f'<h3 class="section-header">{tr("fire_header")}</h3>', unsafe_allow_html=True)
     
+    # Bulk schedules are aggregated in one columnar groupby; no per-location widgets are built for them
+    bulk = st.toggle(tr("bulk_import"), key="fire_bulk", help=tr("bulk_import_help"))
+    location_groups = None
+    currency = st.selectbox(tr("currency"), ["TRY", "USD", "EUR"], key="fire_currency")
+    fx_rate, fx_info = fx_input(currency, "fire")
+    if bulk:
+        uploaded = st.file_uploader(tr("bulk_file"), type=["csv", "txt", "xlsx", "xls"], key="fire_bulk_file")
+        if uploaded is not None:
+            try:
+                with span("hesaplama.fire_import"):
+                    n_locations, location_groups = load_location_schedule(uploaded.getvalue(), uploaded.name)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.caption(tr("bulk_summary").format(locations=f"{n_locations:,}".replace(",", "."), groups=len(location_groups)))
+                st.dataframe(location_groups, use_container_width=True)
+
     # Number of Locations
-    num_locations = st.number_input(tr("num_locations"), min_value=1, max_value=10, value=1, step=1, help=tr("num_locations_help"))
+    num_locations = 0 if bulk else st.number_input(tr("num_locations"), min_value=1, max_value=10, value=1, step=1, help=tr("num_locations_help"))
     
-    # Locations Input
-    locations_data = []
+    # Locations Input: each editor is a fragment, so editing one location reruns only that editor
     groups = [chr(65 + i) for i in range(num_locations)]  # A, B, C, ...
     for i in range(num_locations):
         with st.expander(f"Lokasyon {i + 1}" if lang == "TR" else f"Location {i + 1}", expanded=True if i == 0 else False):
-            col1, col2 = st.columns(2)
-            with col1:
-                building_type = st.selectbox(tr("building_type"), ["Betonarme", "Diğer"], key=f"building_type_{i}", help=tr("building_type_help"))
-                risk_group = st.selectbox(tr("risk_group"), [1, 2, 3, 4, 5, 6, 7], key=f"risk_group_{i}", help=tr("risk_group_help"))
-            with col2:
-                group = st.selectbox(tr("location_group"), groups, key=f"group_{i}", help=tr("location_group_help"))
-                if i == 0:
-                    currency = st.selectbox(tr("currency"), ["TRY", "USD", "EUR"], key="fire_currency")
-                    fx_rate, fx_info = fx_input(currency, "fire")
-            
-            st.markdown(f"#### {tr('insurance_sums')}")
-            if currency != "TRY":
-                st.info(fx_info)
-            
-            col3, col4, col5 = st.columns(3)
-            with col3:
-                building = st.number_input(tr("building_sum"), min_value=0.0, value=0.0, step=1000.0, key=f"building_{i}", help=tr("building_sum_help"))
-                if building > 0:
-                    st.write(f"{tr('entered_value')}: {format_number(building, currency)}")
-                fixture = st.number_input(tr("fixture_sum"), min_value=0.0, value=0.0, step=1000.0, key=f"fixture_{i}", help=tr("fixture_sum_help"))
-                if fixture > 0:
-                    st.write(f"{tr('entered_value')}: {format_number(fixture, currency)}")
-                decoration = st.number_input(tr("decoration_sum"), min_value=0.0, value=0.0, step=1000.0, key=f"decoration_{i}", help=tr("decoration_sum_help"))
-                if decoration > 0:
-                    st.write(f"{tr('entered_value')}: {format_number(decoration, currency)}")
-                bi = st.number_input(tr("bi"), min_value=0.0, value=0.0, step=1000.0, key=f"bi_{i}", help=tr("bi_help"))
-                if bi > 0:
-                    st.write(f"{tr('entered_value')}: {format_number(bi, currency)}")
-            with col4:
-                commodity = st.number_input(tr("commodity_sum"), min_value=0.0, value=0.0, step=1000.0, key=f"commodity_{i}", help=tr("commodity_sum_help"))
-                if commodity > 0:
-                    st.write(f"{tr('entered_value')}: {format_number(commodity, currency)}")
-                safe = st.number_input(tr("safe_sum"), min_value=0.0, value=0.0, step=1000.0, key=f"safe_{i}", help=tr("safe_sum_help"))
-                if safe > 0:
-                    st.write(f"{tr('entered_value')}: {format_number(safe, currency)}")
-            with col5:
-                ec_fixed = st.number_input(tr("ec_fixed"), min_value=0.0, value=0.0, step=1000.0, key=f"ec_fixed_{i}", help=tr("ec_fixed_help"))
-                if ec_fixed > 0:
-                    st.write(f"{tr('entered_value')}: {format_number(ec_fixed, currency)}")
-                ec_mobile = st.number_input(tr("ec_mobile"), min_value=0.0, value=0.0, step=1000.0, key=f"ec_mobile_{i}", help=tr("ec_mobile_help"))
-                if ec_mobile > 0:
-                    st.write(f"{tr('entered_value')}: {format_number(ec_mobile, currency)}")
-                mk_fixed = st.number_input(tr("mk_fixed"), min_value=0.0, value=0.0, step=1000.0, key=f"mk_fixed_{i}", help=tr("mk_fixed_help"))
-                if mk_fixed > 0:
-                    st.write(f"{tr('entered_value')}: {format_number(mk_fixed, currency)}")
-                mk_mobile = st.number_input(tr("mk_mobile"), min_value=0.0, value=0.0, step=1000.0, key=f"mk_mobile_{i}", help=tr("mk_mobile_help"))
-                if mk_mobile > 0:
-                    st.write(f"{tr('entered_value')}: {format_number(mk_mobile, currency)}")
-            
-            locations_data.append({
-                "group": group,
-                "building_type": building_type,
-                "risk_group": risk_group,
-                "building": building,
-                "fixture": fixture,
-                "decoration": decoration,
-                "commodity": commodity,
-                "safe": safe,
-                "bi": bi,
-                "ec_fixed": ec_fixed,
-                "ec_mobile": ec_mobile,
-                "mk_fixed": mk_fixed,
-                "mk_mobile": mk_mobile
+            location_editor(i, groups, currency)
+    locations_data = [location_values(i) for i in range(num_locations)]
+    
+    # Terms are batched in a form; premiums are computed only when it is submitted.
+    # Fire quotes are priced under the tariff in force today.
+    tariff = current_tariff()
+    with st.form("fire_terms", border=False):
+        st.markdown(f"#### {tr('coinsurance_deductible')}")
+        col5, col6, col7 = st.columns(3)
+        with col5:
+            koas = st.selectbox(tr("koas"), list(tariff.koasurans_indirimi.keys()), help=tr("koas_help"))
+        with col6:
+            deduct = st.selectbox(tr("deduct"), sorted(list(tariff.muafiyet_indirimi.keys()), reverse=True), index=4, help=tr("deduct_help"))
+        with col7:
+            inflation_rate = st.number_input(tr("inflation_rate"), min_value=0.0, value=0.0, step=0.1, help=tr("inflation_rate_help"))
+        submitted = st.form_submit_button(tr("btn_calc"), key="fire_calc")
+    
+    if submitted:
+        # pandas-based engines are imported on first use so the page opens without them
+        from tariffeq.fire_engine import fire_group_frame, price_fire_groups, warning_keys
+        if bulk and location_groups is None:
+            st.warning(tr("bulk_file_missing"))
+            st.stop()
+        with span("hesaplama.fire_groups"):
+            groups = location_groups if bulk else fire_group_frame(determine_group_params(locations_data))
+        # All groups are priced in one call; limit warnings are raised afterwards from the breach flags.
+        # Identical inputs (same groups, terms and FX rate under the same tariff) come back from the ledger.
+        ledger = get_quote_ledger()
+        quote_inputs = {"groups": groups.to_dict("split"), "currency": currency, "fx_rate": fx_rate,
+                        "koas": koas, "deduct": deduct, "inflation_rate": inflation_rate}
+        with span("hesaplama.quote_lookup"):
+            input_hash = quote_hash("fire", quote_inputs, tariff.ozet)
+            stored = ledger.lookup(input_hash)
+        if stored is not None:
+            import pandas as pd
+            results = pd.DataFrame(stored.result["data"], index=stored.result["index"], columns=stored.result["columns"])
+            show_quote_reused(stored)
+        else:
+            with span("hesaplama.fire_premium"):
+                results = price_fire_groups(groups, koas, deduct, fx_rate, inflation_rate, tariff)
+            with span("hesaplama.quote_record"):
+                ledger.record(input_hash, "fire", quote_inputs, results.to_dict("split"), tariff_version=tariff.ozet, currency=currency, fx_rate=fx_rate,
+                              fx_source=st.session_state.get("fire_fx_source", currency), total_premium=results["total_premium"].sum(),
+                              lines=zip(results.index, groups["building_type"], groups["risk_group"], results["total_premium"]))
+        for key in warning_keys(results):
+            warn_limit(key)
+        total_premium = float(results["total_premium"].sum())
+        display_rate = fx_rate if currency != "TRY" else 1.0
+        if bulk:
+            premium_columns = ["pd_premium", "bi_premium", "ec_premium", "mk_premium", "total_premium"]
+            table = (results[premium_columns] / display_rate).rename(columns={
+                "pd_premium": tr("pd_premium"), "bi_premium": tr("bi_premium"), "ec_premium": tr("ec_premium"),
+                "mk_premium": tr("mk_premium"), "total_premium": tr("group_premium"),
             })
-    
-    st.markdown(f"#### {tr('coinsurance_deductible')}")
-    col5, col6, col7 = st.columns(3)
-    with col5:
-        koas = st.selectbox(tr("koas"), list(koasurans_indirimi.keys()), help=tr("koas_help"))
-    with col6:
-        deduct = st.selectbox(tr("deduct"), sorted(list(muafiyet_indirimi.keys()), reverse=True), index=4, help=tr("deduct_help"))
-    with col7:
-        inflation_rate = st.number_input(tr("inflation_rate"), min_value=0.0, value=0.0, step=0.1, help=tr("inflation_rate_help"))
-    
-    if st.button(tr("btn_calc"), key="fire_calc"):
-        groups = determine_group_params(locations_data)
-        total_premium = 0.0
-        for group, data in groups.items():
-            pd_premium, bi_premium, ec_premium, mk_premium, group_premium, applied_rate = calculate_fire_premium(
-                data["building_type"], data["risk_group"], currency,
-                data["building"], data["fixture"], data["decoration"], data["commodity"], data["safe"],
-                data["bi"], data["ec_fixed"], data["ec_mobile"], data["mk_fixed"], data["mk_mobile"],
-                koas, deduct, fx_rate, inflation_rate
-            )
-            total_premium += group_premium
-            if currency != "TRY":
-                pd_premium_converted = pd_premium / fx_rate
-                bi_premium_converted = bi_premium / fx_rate
-                ec_premium_converted = ec_premium / fx_rate
-                mk_premium_converted = mk_premium / fx_rate
-                group_premium_converted = group_premium / fx_rate
-                st.markdown(f'<div class="info-box">✅ <b>{tr("group_premium")} ({group}):</b> {format_number(group_premium_converted, currency)}</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="info-box">✅ <b>{tr("pd_premium")} ({group}):</b> {format_number(pd_premium_converted, currency)}</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="info-box">✅ <b>{tr("bi_premium")} ({group}):</b> {format_number(bi_premium_converted, currency)}</div>', unsafe_allow_html=True)
-                if data["ec_fixed"] > 0 or data["ec_mobile"] > 0:
-                    st.markdown(f'<div class="info-box">✅ <b>{tr("ec_premium")} ({group}):</b> {format_number(ec_premium_converted, currency)}</div>', unsafe_allow_html=True)
-                if data["mk_fixed"] > 0 or data["mk_mobile"] > 0:
-                    st.markdown(f'<div class="info-box">✅ <b>{tr("mk_premium")} ({group}):</b> {format_number(mk_premium_converted, currency)}</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="info-box">📊 <b>{tr("applied_rate")} ({group}):</b> {applied_rate:.2f}‰</div>', unsafe_allow_html=True)
-            else:
-                st.markdown(f'<div class="info-box">✅ <b>{tr("group_premium")} ({group}):</b> {format_number(group_premium, "TRY")}</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="info-box">✅ <b>{tr("pd_premium")} ({group}):</b> {format_number(pd_premium, "TRY")}</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="info-box">✅ <b>{tr("bi_premium")} ({group}):</b> {format_number(bi_premium, "TRY")}</div>', unsafe_allow_html=True)
+            table[tr("applied_rate")] = results["rate"]
+            st.dataframe(table, use_container_width=True)
+        else:
+            for group, row in results.iterrows():
+                data = groups.loc[group]
+                st.markdown(f'<div class="info-box">✅ <b>{tr("group_premium")} ({group}):</b> {format_number(row["total_premium"] / display_rate, currency)}</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="info-box">✅ <b>{tr("pd_premium")} ({group}):</b> {format_number(row["pd_premium"] / display_rate, currency)}</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="info-box">✅ <b>{tr("bi_premium")} ({group}):</b> {format_number(row["bi_premium"] / display_rate, currency)}</div>', unsafe_allow_html=True)
                 if data["ec_fixed"] > 0 or data["ec_mobile"] > 0:
-                    st.markdown(f'<div class="info-box">✅ <b>{tr("ec_premium")} ({group}):</b> {format_number(ec_premium, "TRY")}</div>', unsafe_allow_html=True)
+                    st.markdown(f'<div class="info-box">✅ <b>{tr("ec_premium")} ({group}):</b> {format_number(row["ec_premium"] / display_rate, currency)}</div>', unsafe_allow_html=True)
                 if data["mk_fixed"] > 0 or data["mk_mobile"] > 0:
-                    st.markdown(f'<div class="info-box">✅ <b>{tr("mk_premium")} ({group}):</b> {format_number(mk_premium, "TRY")}</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="info-box">📊 <b>{tr("applied_rate")} ({group}):</b> {applied_rate:.2f}‰</div>', unsafe_allow_html=True)
+                    st.markdown(f'<div class="info-box">✅ <b>{tr("mk_premium")} ({group}):</b> {format_number(row["mk_premium"] / display_rate, currency)}</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="info-box">📊 <b>{tr("applied_rate")} ({group}):</b> {row["rate"]:.2f}‰</div>', unsafe_allow_html=True)
         
         if currency != "TRY":
             total_premium_converted = total_premium / fx_rate
@@ -615,9 +519,12 @@ else:
         end_date = st.date_input(tr("end"), value=datetime.today() + timedelta(days=365))
     with col2:
         duration_months = calculate_months_difference(start_date, end_date)
-        st.write(f"⏳ {tr('duration')}: {duration_months} {tr('months')}", help=tr("duration_help"))
+        st.markdown(f"⏳ {tr('duration')}: {duration_months} {tr('months')}", help=tr("duration_help"))
         currency = st.selectbox(tr("currency"), ["TRY", "USD", "EUR"])
-        fx_rate, fx_info = fx_input(currency, "car")
+        # Policies starting in the past are priced at the TCMB rate of their inception date (local archive)
+        fx_rate, fx_info = fx_input(currency, "car", as_of=start_date)
+        # Projects are priced under the tariff in force on their start date
+        tariff = tariff_for(start_date)
     
     st.markdown(f"### {tr('insurance_sums')}")
     if currency != "TRY":
@@ -640,16 +547,38 @@ else:
     st.markdown(f"### {tr('coinsurance_deductible')}")
     col6, col7, col8 = st.columns(3)
     with col6:
-        koas = st.selectbox(tr("coins"), list(koasurans_indirimi_car.keys()), help=tr("coins_help"))
+        koas = st.selectbox(tr("coins"), list(tariff.koasurans_indirimi_car.keys()), help=tr("coins_help"))
     with col7:
-        deduct = st.selectbox(tr("ded"), sorted(list(muafiyet_indirimi_car.keys()), reverse=True), help=tr("ded_help"))
+        deduct = st.selectbox(tr("ded"), sorted(list(tariff.muafiyet_indirimi_car.keys()), reverse=True), help=tr("ded_help"))
     with col8:
         inflation_rate = st.number_input(tr("inflation_rate"), min_value=0.0, value=0.0, step=0.1, help=tr("inflation_rate_help"))
     
     if st.button(tr("btn_calc"), key="car_calc"):
-        car_premium, cpm_premium, cpe_premium, total_premium, applied_rate = calculate_car_ear_premium(
-            risk_group_type, risk_class, start_date, end_date, project, cpm, cpe, currency, koas, deduct, fx_rate, inflation_rate
-        )
+        ledger = get_quote_ledger()
+        quote_inputs = {"risk_group_type": risk_group_type, "risk_class": risk_class, "start_date": start_date, "end_date": end_date,
+                        "project": project, "cpm": cpm, "cpe": cpe, "currency": currency, "fx_rate": fx_rate,
+                        "koas": koas, "deduct": deduct, "inflation_rate": inflation_rate}
+        with span("hesaplama.quote_lookup"):
+            input_hash = quote_hash("car", quote_inputs, tariff.ozet)
+            stored = ledger.lookup(input_hash)
+        if stored is not None:
+            quote = stored.result
+            show_quote_reused(stored)
+        else:
+            warnings = []
+            with span("hesaplama.car_premium"):
+                premiums = calculate_car_ear_premium(
+                    risk_group_type, risk_class, start_date, end_date, project, cpm, cpe, currency, koas, deduct, fx_rate, inflation_rate, warn=warnings.append, tariff=tariff
+                )
+            quote = dict(zip(["car_premium", "cpm_premium", "cpe_premium", "total_premium", "applied_rate"], premiums), warnings=warnings)
+            with span("hesaplama.quote_record"):
+                ledger.record(input_hash, "car", quote_inputs, quote, tariff_version=tariff.ozet, currency=currency, fx_rate=fx_rate,
+                              fx_source=st.session_state.get("car_fx_source", currency), total_premium=quote["total_premium"],
+                              lines=[("CAR", risk_group_type, risk_class, quote["total_premium"])])
+        for key in quote["warnings"]:
+            warn_limit(key)
+        car_premium, cpm_premium, cpe_premium = quote["car_premium"], quote["cpm_premium"], quote["cpe_premium"]
+        total_premium, applied_rate = quote["total_premium"], quote["applied_rate"]
         if currency != "TRY":
             car_premium_converted = car_premium / fx_rate
             cpm_premium_converted = cpm_premium / fx_rate
@@ -667,3 +596,29 @@ else:
         st.markdown(f'<div class="info-box">📊 <b>{tr("applied_rate")} (CAR):</b> {applied_rate:.2f}‰</div>', unsafe_allow_html=True)
         total_rate = (total_premium / (project + cpm + cpe)) * 1000 if (project + cpm + cpe) > 0 else 0
         st.markdown(f'<div class="info-box">📊 <b>{tr("applied_rate")} (Toplam):</b> {total_rate:.2f}‰</div>', unsafe_allow_html=True)
+
+    # Premium vs. duration for every risk class: the whole term-structure cube is one vectorized pass
+    if project + cpm + cpe > 0:
+        from tariffeq.car_grid import car_curve_frame, evaluate_car_grid
+        with st.expander(tr("duration_curve"), expanded=False):
+            with span("hesaplama.car_grid"):
+                grid = evaluate_car_grid(project, cpm, cpe, fx_rate, inflation_rate, tariff=tariff)
+            curve = car_curve_frame(grid, risk_group_type, koas, deduct) / (fx_rate if currency != "TRY" else 1.0)
+            st.line_chart(curve, x_label=tr("months"), y_label=f"{tr('total_premium')} ({currency})")
+            st.caption(tr("duration_curve_caption").format(months=duration_months, risk_class=risk_class))
+            st.dataframe(curve.style.format("{:,.0f}"), use_container_width=True)
+
+# ------------------------------------------------------------
+# 4) DEVELOPER METRICS (stage timings; panel shown with TARIFFEQ_DEV=1 or ?dev=1)
+# ------------------------------------------------------------
+record = end_run(trace)
+if DEV_MODU or st.query_params.get("dev") == "1":
+    with st.sidebar.expander("⏱️ Developer: stage timings", expanded=False):
+        st.caption(f"Last run: {record['total_ms']:.0f} ms")
+        st.dataframe(trace.rows(), hide_index=True, use_container_width=True)
+        st.dataframe(cache_rows(), hide_index=True, use_container_width=True)
+        ledger_stats = get_quote_ledger().stats()
+        st.caption(f"Quote ledger: {ledger_stats['quotes']} quotes, {ledger_stats['reused']} of {ledger_stats['events']} served from the ledger")
+        fx = get_fx_prefetcher().snapshot()
+        if fx.age_seconds is not None:
+            st.caption(f"TCMB table {fx.table.date}, refreshed {fx.age_seconds / 60:.0f} min ago" + (f" (last attempt failed: {fx.error})" if fx.error else ""))
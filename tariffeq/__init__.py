@@ -0,0 +1 @@
+# TariffEQ hesaplama çekirdeği (Streamlit bağımsız).
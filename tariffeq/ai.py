@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – AI Katmanı (Gemini)
+# =======================================================================
+# Prompt üretimi, yanıt doğrulama ve kalıcı önbellek kullanımı Streamlit'ten
+# bağımsızdır. Model nesnesi dışarıdan verilir (generate_content arayüzü); bu
+# sayede fonksiyonlar arka plan iş parçacıklarında çalıştırılabilir ve yerel bir
+# sahte modelle test edilebilir. Hatalar st.session_state yerine çağıranın
+# verdiği listeye eklenir.
+#
+# Önbellek anahtarları faaliyet tanımının kanonik biçimini kullanır (boşluk,
+# noktalama, harf büyüklüğü farkları aynı kayda düşer). Bir NearDuplicateIndex
+# verilirse birebir ıskalamada benzer bir tanımın önceki yanıtı yeniden
+# kullanılır ve eşleşme denetim için kaydedilir.
+
+import json
+import traceback
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+from .ai_cache import DiskCache, cache_key
+from .core import BINA_ICERIK_ORANLARI, ScenarioInputs
+from .risk_classifier import VARSAYILAN_GUVEN_ESIGI, classify_description
+
+if TYPE_CHECKING:
+    # near_duplicate numpy'ı yükler; yalnızca dizin gerçekten kullanıldığında içe aktarılır
+    from .near_duplicate import NearDuplicateIndex
+
+# Prompt metni değiştiğinde ilgili sürüm artırılmalıdır; kalıcı önbellek anahtarı bu sürümleri içerir.
+GEMINI_MODEL = "gemini-1.5-flash"
+AI_PARAM_PROMPT_VERSION = "v3.2"
+ASSESSMENT_PROMPT_VERSION = "v3.2"
+
+DEFAULT_AI_PARAMS = {
+    "icerik_hassasiyeti": "Orta",
+    "ffe_riski": "Orta",
+    "kritik_makine_bagimliligi": "Orta",
+    "bina_icerik_profili": "Diğer / Varsayılan"
+}
+AI_PARAM_OPTIONS = {
+    "icerik_hassasiyeti": ['Düşük', 'Orta', 'Yüksek'],
+    "ffe_riski": ['Düşük', 'Orta', 'Yüksek'],
+    "kritik_makine_bagimliligi": ['Düşük', 'Orta', 'Yüksek'],
+    "bina_icerik_profili": list(BINA_ICERIK_ORANLARI.keys())
+}
+AI_DISABLED_REPORT = "AI servisi aktif değil."
+AI_FAILED_REPORT = "AI Teknik Değerlendirme raporu oluşturulamadı."
+REPORT_SECTION_PREFIX = "### "
+
+
+def compute_triggered_rules(s: ScenarioInputs) -> List[str]:
+    triggered_rules = []
+    if s.yapi_turu == "Betonarme" and "1998 öncesi" in s.yonetmelik_donemi: triggered_rules.append("ESKI_YONETMELIK_BETONARME")
+    if s.yapi_turu == "Çelik" and "1998 öncesi" in s.yonetmelik_donemi: triggered_rules.append("ESKI_YONETMELIK_CELIK")
+    if s.zemin_sinifi in ["ZD", "ZE"] and s.yakin_cevre != "Ana Karada / Düz Ova": triggered_rules.append("SIVILASMA_RISKI")
+    if s.yumusak_kat_riski == "Evet": triggered_rules.append("YUMUSAK_KAT_RISKI")
+    if s.icerik_hassasiyeti == 'Yüksek' or s.kritik_makine_bagimliligi == 'Yüksek': triggered_rules.append("SEKTOREL_HASSASIYET")
+    if s.rg in [1, 2]: triggered_rules.append("ALTYAPI_KESINTI_RISKI")
+    return triggered_rules
+
+
+def build_parameter_prompt(faaliyet_tanimi: str) -> str:
+    prompt = f"""
+    Rolün: Kıdemli bir risk mühendisi ve underwriter.
+    Görevin: Tesis tanımını analiz edip, 4 adet risk parametresini en uygun şekilde skorlamak.
+    Kısıtlar: Yanıtın SADECE JSON formatında olmalı. Başka hiçbir metin ekleme.
+
+    Tesis Tanımı: "{faaliyet_tanimi}"
+
+    PARAMETRE TANIMLARI VE SEÇİM KRİTERLERİ:
+
+    1.  "icerik_hassasiyeti": Tesis içindeki mal ve ekipmanların sarsıntıya karşı ne kadar hassas olduğu.
+        - "Yüksek": İlaç, kimya, yarı iletken, laboratuvar. AVM içindeki mücevherat, elektronik, cam/porselen ürünler. Yüksek ve devrilmeye müsait raf sistemleri.
+        - "Orta": Genel imalat, tekstil, metal işleme, mobilya. AVM içindeki giyim mağazaları.
+        - "Düşük": Kaba inşaat malzemeleri, hurda metal, blok mermer.
+
+    2.  "ffe_riski": Deprem Sonrası Yangın (Fire Following Earthquake) riski.
+        - "Yüksek": Yoğun solvent, yanıcı kimyasallar, gaz hatları, plastik hammaddeler, toz patlaması riski olan (un, şeker) tesisler. AVM'deki restoran mutfakları, gaz hatları.
+        - "Orta": Ahşap işleme, kağıt/karton depolama, genel elektrik ve makine parkı.
+        - "Düşük": Yanıcı malzeme içermeyen depolar (örn: metal, taş).
+
+    3.  "kritik_makine_bagimliligi": Üretimin/faaliyetin, hasarlanması durumunda yerine konması zor, özel ekipmanlara bağımlılığı.
+        - "Yüksek": Özel sipariş üretim hattı (otomotiv), büyük presler, fırınlar, reaktörler. AVM'deki sinema projeksiyon/ses sistemleri, yürüyen merdivenler, merkezi iklimlendirme.
+        - "Orta": Standart CNC makineleri, tekstil makineleri, paketleme hatları.
+        - "Düşük": Jenerik ekipmanların kullanıldığı, makineye az bağımlı montaj veya depolama faaliyetleri.
+
+    4.  "bina_icerik_profili": Toplam sigorta bedelinin bina ve içerik arasında nasıl dağıldığına dair sektörel profil.
+        - "AVM / Otel / Ofis": Bina değeri genellikle içerikten yüksektir. (örn: 60/40)
+        - "Üretim Tesisi": Makine/ekipman değeri genellikle bina değerinden yüksektir. (örn: 40/60)
+        - "Lojistik Depo": Bina ve içindeki stok değeri genellikle yakındır. (örn: 50/50)
+        - "Diğer / Varsayılan": Tanım belirsiz ise kullanılır.
+
+    SADECE ŞU JSON FORMATINDA ÇIKTI ÜRET:
+    {{"icerik_hassasiyeti": "...", "ffe_riski": "...", "kritik_makine_bagimliligi": "...", "bina_icerik_profili": "..."}}
+    """
+    return prompt
+
+
+def build_assessment_prompt(s: ScenarioInputs, triggered_rules: List[str]) -> str:
+    prompt = f"""
+    Rolün: Dünya standartlarında bir deprem risk mühendisi ve kıdemli hasar eksperi. TariffEQ platformu için teknik bir rapor hazırlıyorsun.
+    Görevin: Sana verilen kullanıcı girdileri ve sistem tarafından tetiklenen risk faktörlerini kullanarak, iki ana bölümden oluşan detaylı bir risk değerlendirmesi yazmak.
+    
+    Kesin Kurallar:
+    1. Çıktın SADECE Markdown formatında olacak.
+    2. Raporun iki ana başlığı olacak: "### 🏛️ 1. Yapısal ve Çevresel Risk Değerlendirmesi" ve "### 🏭 2. Faaliyete Özgü Sektörel Risk Değerlendirmesi".
+    3. Her başlık altında, en önemli 2-3 risk faktörünü emoji kullanarak vurgula.
+    4. Her faktörü "Tespit:" ve "Etki:" alt başlıklarıyla, kısa ve net cümlelerle açıkla.
+    5. "Tespit:" bölümünde, bu riski hangi kullanıcı girdisinden çıkardığını belirt. (örn: Zemin Sınıfı: 'ZE', Faaliyet Tanımı: 'AVM' vb.)
+    6. "Etki:" bölümünde, bu riskin hasarı nasıl artıracağını ve potansiyel sonuçlarını (fiziksel, operasyonel) belirt. Varsa bilinen bir deprem referansı (Kocaeli 1999 vb.) ekle.
+    7. **Sektörel Değerlendirme Bölümünde (En Önemli Kısım):** Faaliyet tanımının içine dal.
+        - "AVM/Otel" görürsen: Geniş cam cephelerin kırılması, yürüyen merdivenlerin hasarı, lüks/kırılabilir stokların (mücevher, elektronik) devrilmesi, otoparktaki araçların üzerine düşebilecek tesisat (sprinkler boruları), sinema ekipmanlarının (projeksiyon, ses sistemi) hassasiyeti ve restoranlardaki gaz hatlarından kaynaklı FFE riskine odaklan.
+        - "Üretim" görürsen: Kritik makinelerin (pres, CNC) hassasiyetine, devrilebilecek yüksek raf sistemlerindeki stoklara, kimyasal sızıntı ve FFE riskine odaklan.
+        - "Lojistik" görürsen: Yüksek raf sistemlerinin devrilmesi (Pancaking etkisi), sprinkler patlaması sonucu stokların ıslanması ve yangın yüküne odaklan.
+    8. Raporun sonunda "###  sonuçsal Beklenti" başlığı altında genel bir değerlendirme ve PML (Potansiyel Maksimum Hasar) beklentisi hakkında kalitatif bir yorum yap (ASLA sayısal oran verme).
+
+    KULLANICI GİRDİLERİ:
+    - Faaliyet Tanımı: {s.faaliyet_tanimi}
+    - Yapı Türü: {s.yapi_turu}, Yönetmelik: {s.yonetmelik_donemi}, Kat Sayısı: {s.kat_sayisi}
+    - Zemin Sınıfı: {s.zemin_sinifi}, Yakın Çevre: {s.yakin_cevre}
+    - Yumuşak Kat Riski: {s.yumusak_kat_riski}
+
+    SİSTEM TARAFINDAN TESPİT EDİLEN AKTİF RİSK FAKTÖRLERİ: {triggered_rules}
+
+    Lütfen bu bilgilerle İki Aşamalı Teknik Risk Değerlendirmesini oluştur.
+    """
+    return prompt
+
+
+def parameter_cache_key(faaliyet_tanimi: str) -> str:
+    from .near_duplicate import canonicalize
+    return cache_key("ai_params", {"faaliyet_tanimi": canonicalize(faaliyet_tanimi)}, GEMINI_MODEL, AI_PARAM_PROMPT_VERSION)
+
+
+def _assessment_context(s: ScenarioInputs, triggered_rules: List[str]) -> Dict[str, Any]:
+    return {
+        "yapi_turu": s.yapi_turu, "yonetmelik_donemi": s.yonetmelik_donemi,
+        "kat_sayisi": s.kat_sayisi, "zemin_sinifi": s.zemin_sinifi, "yakin_cevre": s.yakin_cevre,
+        "yumusak_kat_riski": s.yumusak_kat_riski, "triggered_rules": list(triggered_rules),
+    }
+
+
+def assessment_cache_key(s: ScenarioInputs, triggered_rules: List[str]) -> str:
+    from .near_duplicate import canonicalize
+    return cache_key("assessment", {"faaliyet_tanimi": canonicalize(s.faaliyet_tanimi), **_assessment_context(s, triggered_rules)},
+                     GEMINI_MODEL, ASSESSMENT_PROMPT_VERSION)
+
+
+# Benzer tanım dizininde tanım dışındaki girdiler (model ve prompt sürümü dahil) bağlam olarak ayrılır
+def parameter_index_context() -> str:
+    return cache_key("ai_params", {}, GEMINI_MODEL, AI_PARAM_PROMPT_VERSION)
+
+
+def assessment_index_context(s: ScenarioInputs, triggered_rules: List[str]) -> str:
+    return cache_key("assessment", _assessment_context(s, triggered_rules), GEMINI_MODEL, ASSESSMENT_PROMPT_VERSION)
+
+
+def _cached_or_near_duplicate(cache: Optional[DiskCache], index: Optional["NearDuplicateIndex"], namespace: str,
+                              key: str, faaliyet_tanimi: str, context: str) -> Optional[Any]:
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None or cache is None or index is None:
+        return cached
+    match = index.lookup(namespace, faaliyet_tanimi, context)
+    if match is None or match.cache_key == key:
+        return None
+    # Eşleşen kayıt önbellekten temizlenmiş olabilir (TTL / boyut sınırı); o durumda normal ıskalama
+    cached = cache.get(match.cache_key)
+    if cached is not None:
+        index.record_reuse(namespace, faaliyet_tanimi, match)
+    return cached
+
+
+def fetch_ai_parameters(faaliyet_tanimi: str, model: Any, cache: Optional[DiskCache] = None, errors: Optional[List[str]] = None,
+                        confidence_threshold: Optional[float] = VARSAYILAN_GUVEN_ESIGI, index: Optional["NearDuplicateIndex"] = None) -> Dict[str, str]:
+    # Önce yerel kural tabanlı sınıflandırıcı çalışır; güveni eşiğin üzerindeyse ya da model yoksa
+    # Gemini'ye gidilmez. confidence_threshold=None her zaman Gemini'ye başvurur.
+    local = classify_description(faaliyet_tanimi)
+    if model is None or (confidence_threshold is not None and local.confidence >= confidence_threshold):
+        return dict(local.params)
+    key, context = parameter_cache_key(faaliyet_tanimi), parameter_index_context()
+    cached = _cached_or_near_duplicate(cache, index, "ai_params", key, faaliyet_tanimi, context)
+    if cached is not None: return cached
+    try:
+        generation_config = {"temperature": 0.1, "top_p": 0.8, "response_mime_type": "application/json"}
+        response = model.generate_content(build_parameter_prompt(faaliyet_tanimi), generation_config=generation_config)
+        params = json.loads(response.text)
+        # Gelen veriyi doğrula; geçersiz değerlerde yerel sınıflandırıcının sonucunu kullan
+        for param, valid_options in AI_PARAM_OPTIONS.items():
+            if params.get(param) not in valid_options:
+                params[param] = local.params[param]
+        if cache is not None: cache.set(key, params)
+        if cache is not None and index is not None: index.add("ai_params", faaliyet_tanimi, key, context)
+        return params
+    except Exception as e:
+        if errors is not None: errors.append(f"AI Parametre Hatası: {str(e)}\n{traceback.format_exc()}")
+        return dict(local.params)
+
+
+def fetch_assessment(s: ScenarioInputs, triggered_rules: List[str], model: Any, cache: Optional[DiskCache] = None, errors: Optional[List[str]] = None,
+                     index: Optional["NearDuplicateIndex"] = None) -> str:
+    if model is None: return AI_DISABLED_REPORT
+    key, context = assessment_cache_key(s, triggered_rules), assessment_index_context(s, triggered_rules)
+    cached = _cached_or_near_duplicate(cache, index, "assessment", key, s.faaliyet_tanimi, context)
+    if cached is not None: return cached
+    try:
+        response = model.generate_content(build_assessment_prompt(s, triggered_rules), generation_config={"temperature": 0.25})
+        if cache is not None: cache.set(key, response.text)
+        if cache is not None and index is not None: index.add("assessment", s.faaliyet_tanimi, key, context)
+        return response.text
+    except Exception as e:
+        if errors is not None: errors.append(f"AI Rapor Hatası: {str(e)}\n{traceback.format_exc()}")
+        return AI_FAILED_REPORT
+
+
+def stream_assessment(s: ScenarioInputs, triggered_rules: List[str], model: Any, cache: Optional[DiskCache] = None, errors: Optional[List[str]] = None,
+                      index: Optional["NearDuplicateIndex"] = None) -> Iterator[str]:
+    # Model yanıtını parça parça üretir; tamamlanan metin en sonda önbelleğe yazılır.
+    # Önbellekte varsa tüm rapor tek parça olarak döner.
+    if model is None:
+        yield AI_DISABLED_REPORT
+        return
+    key, context = assessment_cache_key(s, triggered_rules), assessment_index_context(s, triggered_rules)
+    cached = _cached_or_near_duplicate(cache, index, "assessment", key, s.faaliyet_tanimi, context)
+    if cached is not None:
+        yield cached
+        return
+    parts: List[str] = []
+    try:
+        response = model.generate_content(build_assessment_prompt(s, triggered_rules), generation_config={"temperature": 0.25}, stream=True)
+        for chunk in response:
+            text = getattr(chunk, "text", "")
+            if text:
+                parts.append(text)
+                yield text
+        if cache is not None and parts:
+            cache.set(key, "".join(parts))
+            if index is not None: index.add("assessment", s.faaliyet_tanimi, key, context)
+    except Exception as e:
+        if errors is not None: errors.append(f"AI Rapor Hatası: {str(e)}\n{traceback.format_exc()}")
+        if not parts: yield AI_FAILED_REPORT
+
+
+def split_report_sections(text: str) -> List[str]:
+    # Raporu "### " ile başlayan ana başlıklardan bölümlere ayırır (başlık öncesi metin ilk bölüme eklenir)
+    sections: List[str] = []
+    has_heading = False
+    for line in text.splitlines(keepends=True):
+        if line.startswith(REPORT_SECTION_PREFIX):
+            if has_heading:
+                sections.append(line)
+                continue
+            has_heading = True
+        if sections:
+            sections[-1] += line
+        else:
+            sections.append(line)
+    return sections
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Kalıcı AI Yanıt Önbelleği
+# =======================================================================
+# Gemini yanıtlarını SQLite (WAL modu) üzerinde saklar. Anahtar; prompt
+# girdilerinin kanonik JSON özeti + model adı + prompt sürümüdür, böylece
+# prompt metni değiştiğinde eski kayıtlar kendiliğinden geçersiz olur.
+# Önbellek yeniden başlatmalardan etkilenmez, aynı diski paylaşan birden fazla
+# süreç tarafından eşzamanlı kullanılabilir ve TTL + boyut sınırı ile LRU
+# mantığında temizlenir. Okumalar WAL yazma kilidi için yarışmasın diye
+# isabet/ıskalama sayaçları bellekte biriktirilip toplu yazılır ve son erişim
+# zamanı yalnızca belirli bir süreden eskiyse güncellenir.
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+VARSAYILAN_CACHE_YOLU = os.environ.get(
+    "TARIFFEQ_AI_CACHE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "ai_cache.sqlite3"),
+)
+VARSAYILAN_MAKS_BOYUT = 64 * 1024 * 1024  # byte
+VARSAYILAN_TTL = 30 * 24 * 3600  # saniye
+ISTATISTIK_PARTISI = 50  # bu kadar okumada bir (veya aşağıdaki süre dolunca) sayaçlar diske yazılır
+ISTATISTIK_ARALIGI = 30.0  # saniye
+ERISIM_GUNCELLEME_ARALIGI = 60.0  # saniye; LRU sıralaması için bu hassasiyet yeterlidir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed);
+CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0);
+"""
+
+
+def cache_key(namespace: str, payload: Any, model: str, prompt_version: str) -> str:
+    canonical = json.dumps(
+        {"ns": namespace, "payload": payload, "model": model, "prompt_version": prompt_version},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def connect(path: str) -> sqlite3.Connection:
+    # Otomatik commit kipinde, WAL ve meşgul bekleme ayarlı bağlantı (aynı dosyayı kullanan modüller için ortak)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+class DiskCache:
+    def __init__(self, path: str = VARSAYILAN_CACHE_YOLU, max_bytes: int = VARSAYILAN_MAKS_BOYUT, ttl_seconds: Optional[float] = VARSAYILAN_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = {"hits": 0, "misses": 0}  # henüz diske yazılmamış sayaçlar
+        self._flushed = time.monotonic()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+        atexit.register(self._flush_at_exit)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 bağlantıları iş parçacıkları arasında paylaşılamaz; her iş parçacığına ayrı bağlantı
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute("SELECT value, created, accessed FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            row = None
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        if now - row[2] > ERISIM_GUNCELLEME_ARALIGI:
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+            self._pending[name] += 1
+            due = sum(self._pending.values()) >= ISTATISTIK_PARTISI or time.monotonic() - self._flushed >= ISTATISTIK_ARALIGI
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self) -> None:
+        # Biriken sayaçlar tek işlemde kalıcı toplamlara eklenir
+        with self._lock:
+            pending, self._pending = self._pending, {"hits": 0, "misses": 0}
+            self._flushed = time.monotonic()
+        if not any(pending.values()):
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("UPDATE stats SET value = value + ? WHERE name = ?", [(v, k) for k, v in pending.items() if v])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            with self._lock:
+                for k, v in pending.items():
+                    self._pending[k] += v
+            raise
+
+    def _flush_at_exit(self) -> None:
+        try:
+            self.flush_stats()
+        except sqlite3.Error:
+            pass
+
+    def set(self, key: str, value: Any) -> None:
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data.encode("utf-8")), now, now),
+            )
+            self._evict(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds is not None:
+            conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # En uzun süredir okunmayan kayıtlardan başlayarak sınırın altına inilir
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._conn()
+        persisted = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+        with self._lock:
+            pending = dict(self._pending)
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": persisted.get("hits", 0) + pending["hits"],
+            "total_misses": persisted.get("misses", 0) + pending["misses"],
+            "entries": entries,
+            "bytes": size,
+        }
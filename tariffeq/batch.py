@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Portföy Toplu Analiz Hattı (Streamlit'siz)
+# =======================================================================
+# ScenarioInputs alanlarını sütun olarak içeren bir CSV/Parquet dosyasını
+# parçalar halinde okur, her parçada PD/BI hesaplamasını ve poliçe
+# alternatifleri ızgarasını çalıştırır ve sonuçları sırayla diske ekler.
+# Bellek kullanımı "parça boyu × eşzamanlı parça sayısı" ile sınırlıdır.
+#
+# Kullanım:
+#   python -m tariffeq.batch portfoy.csv sonuc.parquet --chunksize 5000 --workers 8
+#
+# Parquet okuma/yazma için pyarrow kurulu olmalıdır; CSV için ek bağımlılık gerekmez.
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .core import ScenarioInputs, get_allowed_options
+from .encoding import encode_columns, evaluate_encoded
+from .policy_grid import evaluate_policy_grid
+from .risk_classifier import classify_description
+
+# Dosyada verilmeyen AI parametreleri çevrimdışı sınıflandırıcı ile faaliyet tanımından atanır
+_AI_ALANLARI = ("icerik_hassasiyeti", "ffe_riski", "kritik_makine_bagimliligi", "bina_icerik_profili")
+
+_ALANLAR = {f.name: f for f in fields(ScenarioInputs)}
+_VARSAYILAN = ScenarioInputs()
+
+
+def read_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    if path.lower().endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def rows_to_columns(df: pd.DataFrame) -> Dict[str, list]:
+    # Eksik sütun/hücreler ScenarioInputs varsayılanlarıyla, AI parametreleri sınıflandırıcı ile doldurulur
+    cols = {}
+    for name, f in _ALANLAR.items():
+        default = getattr(_VARSAYILAN, name)
+        if name not in df.columns:
+            cols[name] = [None if name in _AI_ALANLARI else default] * len(df)
+            continue
+        col = df[name].where(df[name].notna(), None if name in _AI_ALANLARI else default)
+        cols[name] = [int(v) for v in col] if f.type is int else [None if v is None else str(v) for v in col]
+    classified = {}
+    for i, desc in enumerate(cols["faaliyet_tanimi"]):
+        missing = [name for name in _AI_ALANLARI if cols[name][i] is None]
+        if not missing:
+            continue
+        if desc not in classified:
+            classified[desc] = classify_description(desc).params
+        for name in missing:
+            cols[name][i] = classified[desc][name]
+    return cols
+
+
+def rows_to_scenarios(df: pd.DataFrame) -> List[ScenarioInputs]:
+    cols = rows_to_columns(df)
+    return [ScenarioInputs(**dict(zip(cols, vals))) for vals in zip(*cols.values())]
+
+
+def process_chunk(df: pd.DataFrame, full_grid: bool = False) -> pd.DataFrame:
+    # Senaryolar nesneye dönüştürülmeden doğrudan kodlanmış diziye çevrilir
+    enc = encode_columns(rows_to_columns(df))
+    passthrough = df[[c for c in df.columns if c not in _ALANLAR]].reset_index(drop=True)
+
+    out = evaluate_encoded(enc)
+    summary = passthrough.assign(
+        pd_hasar=out["pd_hasar"], pml_orani=out["pml_orani"], brut_kesinti_gun=out["brut_kesinti_gun"],
+        net_kesinti_gun=out["net_kesinti_gun"], bi_hasar=out["bi_hasar"],
+    )
+
+    # İzin verilen seçenekler bedele bağlı olduğundan senaryolar seçenek kümesine göre gruplanır
+    groups = {}
+    buyuk = enc["si_pd"] > 3_500_000_000
+    for flag in (False, True):
+        idx = np.flatnonzero(buyuk == flag)
+        if len(idx):
+            koas_opts, muaf_opts = get_allowed_options(int(enc["si_pd"][idx[0]]))
+            groups[(tuple(koas_opts), tuple(muaf_opts))] = idx
+
+    if full_grid:
+        parts = []
+        for (koas_opts, muaf_opts), idx in groups.items():
+            grid = evaluate_policy_grid(enc[idx], koas_opts, muaf_opts)
+            n_cells = len(koas_opts) * len(muaf_opts)
+            parts.append(pd.DataFrame({
+                "_satir": np.repeat(idx, n_cells),
+                "koas": np.tile(np.repeat(grid["koas"], len(muaf_opts)), len(idx)),
+                "muafiyet": np.tile(grid["muaf"], len(koas_opts) * len(idx)),
+                "toplam_prim": grid["toplam_prim"].ravel(),
+                "toplam_tazminat": grid["toplam_tazminat"].ravel(),
+                "kalan_risk": grid["kalan_risk"].ravel(),
+                "verimlilik": grid["verimlilik"].ravel(),
+            }))
+        long = pd.concat(parts).sort_values("_satir", kind="stable")
+        return summary.iloc[long["_satir"]].reset_index(drop=True).join(long.drop(columns="_satir").reset_index(drop=True))
+
+    best = {k: [None] * len(enc) for k in ("en_iyi_yapi", "toplam_prim", "toplam_tazminat", "kalan_risk", "verimlilik")}
+    for (koas_opts, muaf_opts), idx in groups.items():
+        grid = evaluate_policy_grid(enc[idx], koas_opts, muaf_opts)
+        flat = grid["verimlilik"].reshape(len(idx), -1)
+        arg = flat.argmax(axis=1)
+        for j, i in enumerate(idx):
+            k, m = divmod(int(arg[j]), len(muaf_opts))
+            best["en_iyi_yapi"][i] = f"{koas_opts[k]} / {muaf_opts[m]}%"
+            for key in ("toplam_prim", "toplam_tazminat", "kalan_risk", "verimlilik"):
+                best[key][i] = float(grid[key][j, k, m])
+    return summary.assign(**best)
+
+
+def _process_chunk_args(args):
+    return process_chunk(*args)
+
+
+class _Writer:
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.lower().endswith((".parquet", ".pq"))
+        self._pq_writer = None
+        self._first = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._pq_writer is None:
+                self._pq_writer = pq.ParquetWriter(self.path, table.schema)
+            self._pq_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self) -> None:
+        if self._pq_writer is not None:
+            self._pq_writer.close()
+
+
+def run_batch(input_path: str, output_path: str, chunksize: int = 5000, workers: Optional[int] = None,
+              full_grid: bool = False, progress: bool = True) -> int:
+    workers = workers or os.cpu_count() or 1
+    writer = _Writer(output_path)
+    done = 0
+
+    def _emit(result: pd.DataFrame, n_rows: int) -> None:
+        nonlocal done
+        writer.write(result)
+        done += n_rows
+        if progress:
+            print(f"\r{done:,} satır işlendi", end="", file=sys.stderr, flush=True)
+
+    try:
+        if workers == 1:
+            for chunk in read_chunks(input_path, chunksize):
+                _emit(process_chunk(chunk, full_grid), len(chunk))
+        else:
+            # Sıralı yazım için en fazla 2×workers parça aynı anda bellekte tutulur
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                pending = []
+                for chunk in read_chunks(input_path, chunksize):
+                    pending.append((ex.submit(_process_chunk_args, (chunk, full_grid)), len(chunk)))
+                    if len(pending) >= 2 * workers:
+                        fut, n_rows = pending.pop(0)
+                        _emit(fut.result(), n_rows)
+                for fut, n_rows in pending:
+                    _emit(fut.result(), n_rows)
+    finally:
+        writer.close()
+    if progress:
+        print(file=sys.stderr)
+    return done
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="TariffEQ PD/BI portföy toplu analizi")
+    parser.add_argument("input", help="ScenarioInputs sütunlarını içeren CSV veya Parquet dosyası")
+    parser.add_argument("output", help="Sonuç dosyası (.csv veya .parquet)")
+    parser.add_argument("--chunksize", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None, help="İşlem havuzu boyutu (varsayılan: CPU sayısı)")
+    parser.add_argument("--full-grid", action="store_true", help="En iyi yapı yerine tüm poliçe ızgarasını uzun formatta yaz")
+    args = parser.parse_args(argv)
+    run_batch(args.input, args.output, args.chunksize, args.workers, args.full_grid)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Vektörel İnşaat/Montaj (CAR & EAR) Süre Yapısı ve Senaryo Küpü
+# =======================================================================
+# premium.calculate_car_ear_premium'un dizi karşılığı. Oranlar ve süre
+# çarpanları (tablo ve sonrasında ay başına uzun_sure_adimi) tariffeq.tariff
+# sürümünde ay ile indekslenen dizilere bir kez derlenmiştir; ay farkı hesabı
+# (15 gün kuralı) datetime64 dizileri üzerinde yapılır. evaluate_car_grid tek geçişte
+# (risk grubu tipi, risk sınıfı, süre, koasürans, muafiyet) boyutunda tam prim
+# küpünü döndürür; arayüz süreye göre prim eğrilerini buradan çizer. İşlem sırası
+# skaler fonksiyonla aynıdır, bu nedenle küpteki her hücre skaler sonuçla
+# birebir aynıdır. Limit aşımı uyarı yerine limit_car bayrağı olarak döner.
+
+from typing import Dict, Iterable, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .tariff import TIP_KODLARI, TarifeSurumu, current_tariff
+
+RISK_GRUBU_TIPLERI = ("RiskGrubuA", "RiskGrubuB")
+RISK_GRUBU_KODLARI = np.array([TIP_KODLARI[t] for t in RISK_GRUBU_TIPLERI])  # tariff.oranlar satırları
+RISK_SINIFLARI = tuple(range(1, 8))
+VARSAYILAN_SURELER = tuple(range(6, 61))  # ay
+CPM_ORANI = 1.25  # ‰, süre çarpanı prime ayrıca uygulanır
+
+
+def duration_multiplier_array(months, tariff: Optional[TarifeSurumu] = None) -> np.ndarray:
+    # Tablodaki aylar tablo değerini, tabloda olmayan kısa süreler (ve negatif farklar) 1.0 alır
+    tariff = tariff or current_tariff()
+    carpanlar = tariff.sure_carpani_dizisi
+    son = len(carpanlar) - 1
+    months = np.asarray(months, dtype=np.int64)
+    table = carpanlar[np.clip(months, 0, son)]
+    extended = carpanlar[son] + (tariff.uzun_sure_adimi * (months - son))
+    return np.where(months <= son, table, extended)
+
+
+def months_difference_array(start_dates, end_dates) -> np.ndarray:
+    # calculate_months_difference: takvim ayı farkı; yaklaşık gün sayısından (yıl 365, ay 30) 15+ gün artarsa +1 ay
+    start = np.asarray(start_dates, dtype="datetime64[D]")
+    end = np.asarray(end_dates, dtype="datetime64[D]")
+    start_month = start.astype("datetime64[M]").astype(np.int64)
+    end_month = end.astype("datetime64[M]").astype(np.int64)
+    year_diff = end.astype("datetime64[Y]").astype(np.int64) - start.astype("datetime64[Y]").astype(np.int64)
+    month_diff = (end_month % 12) - (start_month % 12)
+    months = year_diff * 12 + month_diff
+    total_days = (end - start).astype(np.int64)
+    remaining_days = total_days - (year_diff * 365 + month_diff * 30)
+    return months + (remaining_days >= 15)
+
+
+def car_premium_arrays(type_code, risk_class, months, project, cpm, cpe, koas_discount, deduct_discount,
+                       fx_rate=1.0, inflation_rate=0.0, tariff: Optional[TarifeSurumu] = None) -> Dict[str, np.ndarray]:
+    # Tüm girdiler yayınlanabilir (broadcast) dizilerdir; type_code tariff.oranlar satırıdır (RISK_GRUBU_KODLARI)
+    tariff = tariff or current_tariff()
+    limit = tariff.limit_car
+    inflation_multiplier = 1 + (np.asarray(inflation_rate, dtype=np.float64) / 100) / 2
+    base_rate = tariff.oranlar[type_code, np.asarray(risk_class) - 1] * inflation_multiplier
+    duration_multiplier = duration_multiplier_array(months, tariff)
+
+    project_sum_insured = np.asarray(project, dtype=np.float64) * fx_rate
+    car_rate = base_rate * duration_multiplier * (1 - koas_discount) * (1 - deduct_discount)
+    limit_project = project_sum_insured > limit
+    car_rate = np.where(limit_project, car_rate * (limit / np.where(limit_project, project_sum_insured, limit)), car_rate)
+    car_premium = (project_sum_insured * car_rate) / 1000
+
+    cpm_sum_insured = np.asarray(cpm, dtype=np.float64) * fx_rate
+    cpm_rate = CPM_ORANI * inflation_multiplier
+    limit_cpm = cpm_sum_insured > limit
+    cpm_rate = np.where(limit_cpm, cpm_rate * (limit / np.where(limit_cpm, cpm_sum_insured, limit)), cpm_rate)
+    cpm_premium = (cpm_sum_insured * cpm_rate / 1000) * duration_multiplier
+
+    cpe_sum_insured = np.asarray(cpe, dtype=np.float64) * fx_rate
+    cpe_rate = base_rate * duration_multiplier
+    limit_cpe = cpe_sum_insured > limit
+    cpe_rate = np.where(limit_cpe, cpe_rate * (limit / np.where(limit_cpe, cpe_sum_insured, limit)), cpe_rate)
+    cpe_premium = (cpe_sum_insured * cpe_rate) / 1000
+
+    total_premium = car_premium + cpm_premium + cpe_premium
+    shape = total_premium.shape
+    return {
+        "car_premium": np.broadcast_to(car_premium, shape), "cpm_premium": np.broadcast_to(cpm_premium, shape),
+        "cpe_premium": np.broadcast_to(cpe_premium, shape), "total_premium": total_premium,
+        "car_rate": np.broadcast_to(car_rate, shape),
+        "limit_car": np.broadcast_to(limit_project | limit_cpm | limit_cpe, shape),
+    }
+
+
+def evaluate_car_grid(project: float, cpm: float, cpe: float, fx_rate: float = 1.0, inflation_rate: float = 0.0,
+                      months: Iterable[int] = VARSAYILAN_SURELER,
+                      koas: Optional[Sequence[str]] = None,
+                      deduct: Optional[Sequence[Union[int, float]]] = None,
+                      tariff: Optional[TarifeSurumu] = None) -> Dict[str, np.ndarray]:
+    # Sonuç dizileri (tip, sınıf, süre, koasürans, muafiyet) boyutundadır; eksenler aynı sözlükte döner.
+    # koas / deduct verilmezse sürümün CAR seçeneklerinin tamamı kullanılır.
+    tariff = tariff or current_tariff()
+    months_arr = np.asarray(list(months), dtype=np.int64)
+    koas = list(tariff.koasurans_indirimi_car if koas is None else koas)
+    deduct = list(tariff.muafiyet_indirimi_car if deduct is None else deduct)
+    grid = car_premium_arrays(
+        RISK_GRUBU_KODLARI[:, None, None, None, None],
+        np.asarray(RISK_SINIFLARI)[None, :, None, None, None],
+        months_arr[None, None, :, None, None],
+        project, cpm, cpe,
+        np.array([tariff.koasurans_indirimi_car[k] for k in koas])[None, None, None, :, None],
+        np.array([tariff.muafiyet_indirimi_car[d] for d in deduct])[None, None, None, None, :],
+        fx_rate, inflation_rate, tariff,
+    )
+    grid.update({"risk_group_type": np.array(RISK_GRUBU_TIPLERI), "risk_class": np.array(RISK_SINIFLARI),
+                 "months": months_arr, "koas": np.array(koas), "deduct": np.array(deduct)})
+    return grid
+
+
+def car_curve_frame(grid: Dict[str, np.ndarray], risk_group_type: str, koas: str, deduct, column: str = "total_premium") -> pd.DataFrame:
+    # Seçilen tip / koasürans / muafiyet için süre (satır) × risk sınıfı (sütun) prim tablosu
+    t = list(grid["risk_group_type"]).index(risk_group_type)
+    k = list(grid["koas"]).index(koas)
+    d = list(grid["deduct"]).index(deduct)
+    return pd.DataFrame(grid[column][t, :, :, k, d].T, index=pd.Index(grid["months"], name="months"),
+                        columns=[str(c) for c in grid["risk_class"]])
+
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – PD & BI Hesaplama Çekirdeği
+# =======================================================================
+# Home.py içindeki tarife tabloları, senaryo modeli ve hasar/prim hesaplama
+# fonksiyonları Streamlit'ten bağımsız olarak bu modülde tutulur. Böylece aynı
+# çekirdek hem arayüz hem de toplu (batch) işler tarafından kullanılabilir.
+
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from .tariff import current_tariff
+
+# --- TARİFE, ÇARPAN VERİLERİ VE SABİTLER ---
+# Tarife tabloları tariffeq.tariff'ten (süreç başında yürürlükteki sürüm); çarpan = 1 - indirim.
+_TARIFE = current_tariff()
+TARIFE_RATES = {t: _TARIFE.tarife_oranlari[t] for t in ("Betonarme", "Diğer")}
+KOAS_FACTORS = _TARIFE.koasurans_carpanlari
+MUAFIYET_FACTORS = _TARIFE.muafiyet_carpanlari
+_DEPREM_ORAN = {1: 0.20, 2: 0.17, 3: 0.13, 4: 0.09, 5: 0.06, 6: 0.06, 7: 0.06}
+# YENİ (v3.2): Dinamik PD modellemesi için sektörel bina/içerik oranları
+BINA_ICERIK_ORANLARI = {
+    "Üretim Tesisi": (0.40, 0.60),
+    "Lojistik Depo": (0.50, 0.50),
+    "AVM / Otel / Ofis": (0.60, 0.40),
+    "Diğer / Varsayılan": (0.50, 0.50)
+}
+ICERIK_HASSASIYET_CARPANLARI = {"Düşük": 0.6, "Orta": 0.8, "Yüksek": 1.0}
+BINA_FAKTORLERI = {
+    "yonetmelik": {"1998 öncesi": 1.25, "1998-2018": 1.00, "2018 sonrası": 0.80},
+    "kat_sayisi": {"1-3": 0.95, "4-7": 1.00, "8+": 1.10},
+    "zemin": {"ZC": 1.00, "ZA/ZB": 0.85, "ZD": 1.20, "ZE": 1.50},
+    "yumusak_kat": {"Hayır": 1.00, "Evet": 1.40},
+}
+OPERASYONEL_FAKTORLER = {
+    "isp": {"Yok": 1.00, "Var (Test Edilmemiş)": 0.85, "Var (Test Edilmiş)": 0.70},
+    "makine_bagimliligi": {"Düşük": 1.00, "Orta": 1.25, "Yüksek": 1.70},
+    "alternatif_tesis": {"Yok": 1.0, "Var (kısmi kapasite)": 0.6, "Var (tam kapasite)": 0.2}
+}
+
+# --- GİRDİ VE HESAPLAMA MODELLERİ ---
+@dataclass(slots=True)
+class ScenarioInputs:
+    si_pd: int = 250_000_000
+    yillik_brut_kar: int = 100_000_000
+    rg: int = 1
+    faaliyet_tanimi: str = "Lüks bir AVM. Alt katlarda otopark, orta katlarda çeşitli (giyim, mücevherat, ev tekstili, elektronik) mağazalar, en üst katta ise yemek alanları (restoranlar) ve çok salonlu bir sinema kompleksi bulunuyor. Geniş cam cephelere sahip."
+    yapi_turu: str = "Betonarme"
+    yonetmelik_donemi: str = "1998-2018 arası (Varsayılan)"
+    kat_sayisi: str = "4-7 kat"
+    zemin_sinifi: str = "ZE"
+    yakin_cevre: str = "Ana Karada / Düz Ova"
+    yumusak_kat_riski: str = "Evet"
+    azami_tazminat_suresi: int = 365
+    isp_varligi: str = "Var (Test Edilmiş)"
+    alternatif_tesis: str = "Yok"
+    bitmis_urun_stogu: int = 0
+    bi_gun_muafiyeti: int = 30
+    # YENİ (v3.2): Bu parametreler artık AI tarafından atanacak
+    icerik_hassasiyeti: str = "Orta"
+    ffe_riski: str = "Orta"
+    kritik_makine_bagimliligi: str = "Orta"
+    bina_icerik_profili: str = "Diğer / Varsayılan"
+
+# --- TEKNİK HESAPLAMA ÇEKİRDEĞİ (REVİZE EDİLDİ v3.2) ---
+def bina_factor_terms(s: ScenarioInputs) -> Dict[str, float]:
+    # Bina hasar oranı çarpanının bileşenleri; sıralı çarpımları calculate_bina_pd_ratio'daki faktördür
+    terms = {
+        "yonetmelik": BINA_FAKTORLERI["yonetmelik"].get(s.yonetmelik_donemi.split(' ')[0], 1.0),
+        "kat_sayisi": BINA_FAKTORLERI["kat_sayisi"].get(s.kat_sayisi.split(' ')[0], 1.0),
+        "zemin": BINA_FAKTORLERI["zemin"].get(s.zemin_sinifi, 1.0),
+        "yumusak_kat": BINA_FAKTORLERI["yumusak_kat"].get(s.yumusak_kat_riski, 1.0),
+        "yapi_yonetmelik": 1.0,
+        "sivilasma": 1.0,
+    }
+    if s.yapi_turu == "Betonarme" and "1998 öncesi" in s.yonetmelik_donemi: terms["yapi_yonetmelik"] = 1.20
+    if s.yapi_turu == "Çelik" and "1998 öncesi" in s.yonetmelik_donemi: terms["yapi_yonetmelik"] = 1.15
+    if s.zemin_sinifi in ["ZD", "ZE"] and s.yakin_cevre != "Ana Karada / Düz Ova": terms["sivilasma"] = 1.40
+    return terms
+
+def calculate_bina_pd_ratio(s: ScenarioInputs) -> float:
+    base_bina_oran = _DEPREM_ORAN.get(s.rg, 0.13)
+    bina_factor = 1.0
+    for term in bina_factor_terms(s).values():
+        bina_factor *= term
+
+    return min(0.60, max(0.01, base_bina_oran * bina_factor))
+
+def calculate_pd_damage(s: ScenarioInputs) -> Dict[str, float]:
+    bina_pd_ratio = calculate_bina_pd_ratio(s)
+    
+    # REVİZE EDİLDİ (v3.2): Bina/İçerik oranı artık AI tarafından belirlenen profile göre dinamik.
+    bina_oran, icerik_oran = BINA_ICERIK_ORANLARI.get(s.bina_icerik_profili, BINA_ICERIK_ORANLARI["Diğer / Varsayılan"])
+    si_bina_varsayim = s.si_pd * bina_oran
+    si_icerik_varsayim = s.si_pd * icerik_oran
+    
+    icerik_hassasiyet_carpan = ICERIK_HASSASIYET_CARPANLARI.get(s.icerik_hassasiyeti, 0.8)
+    icerik_pd_ratio = bina_pd_ratio * icerik_hassasiyet_carpan
+
+    bina_hasar = si_bina_varsayim * bina_pd_ratio
+    icerik_hasar = si_icerik_varsayim * icerik_pd_ratio
+    toplam_pd_hasar = bina_hasar + icerik_hasar
+    ortalama_pd_ratio = toplam_pd_hasar / s.si_pd if s.si_pd > 0 else 0
+    
+    return {"damage_amount": toplam_pd_hasar, "pml_ratio": ortalama_pd_ratio}
+
+def operational_factor_terms(s: ScenarioInputs) -> Dict[str, float]:
+    return {
+        "isp": OPERASYONEL_FAKTORLER["isp"].get(s.isp_varligi, 1.0),
+        "makine_bagimliligi": OPERASYONEL_FAKTORLER["makine_bagimliligi"].get(s.kritik_makine_bagimliligi, 1.0),
+        "alternatif_tesis": OPERASYONEL_FAKTORLER["alternatif_tesis"].get(s.alternatif_tesis, 1.0),
+    }
+
+def calculate_operational_factor(s: ScenarioInputs) -> float:
+    operational_factor = 1.0
+    for term in operational_factor_terms(s).values():
+        operational_factor *= term
+    return operational_factor
+
+def calculate_bi_downtime(pd_ratio: float, s: ScenarioInputs) -> Tuple[int, int]:
+    base_repair_days = 30 + (pd_ratio * 300)
+    operational_factor = calculate_operational_factor(s)
+    gross_downtime = int(base_repair_days * operational_factor)
+    
+    # Yüksek riskli bölgelerde altyapı gecikmesi eklenir
+    if s.rg in [1, 2]: gross_downtime += 30
+
+    net_downtime_before_indemnity = gross_downtime - s.bitmis_urun_stogu
+    final_downtime = min(s.azami_tazminat_suresi, net_downtime_before_indemnity)
+    return max(0, gross_downtime), max(0, int(final_downtime))
+
+# ... (Diğer yardımcı fonksiyonlar aynı kalır)
+def get_allowed_options(si_pd: int) -> Tuple[List[str], List[float]]:
+    koas_opts = list(_TARIFE.standart_koasurans); muaf_opts = list(_TARIFE.standart_muafiyet)
+    if si_pd > 3_500_000_000: koas_opts.extend(_TARIFE.yuksek_bedel_koasurans); muaf_opts.extend(_TARIFE.yuksek_bedel_muafiyet)
+    return koas_opts, muaf_opts
+def calculate_premium(si: float, yapi_turu: str, rg: int, koas: str, muaf: float, is_bi: bool = False) -> float:
+    base_rate = TARIFE_RATES.get(yapi_turu, TARIFE_RATES["Diğer"])[rg - 1]; prim_bedeli = min(si, 3_500_000_000) if not is_bi else si
+    if is_bi: return (prim_bedeli * base_rate * 0.75) / 1000.0
+    factor = KOAS_FACTORS.get(koas, 1.0) * MUAFIYET_FACTORS.get(muaf, 1.0)
+    return (prim_bedeli * base_rate * factor) / 1000.0
+def calculate_net_claim(si_pd: int, hasar_tutari: float, koas: str, muaf_pct: float) -> Dict[str, float]:
+    muafiyet_tutari = si_pd * (muaf_pct / 100.0); muafiyet_sonrasi_hasar = max(0.0, hasar_tutari - muafiyet_tutari)
+    sirket_pay_orani = float(koas.split('/')[0]) / 100.0; net_tazminat = muafiyet_sonrasi_hasar * sirket_pay_orani
+    sigortalida_kalan = hasar_tutari - net_tazminat
+    return {"net_tazminat": net_tazminat, "sigortalida_kalan": sigortalida_kalan}
+
+def calculate_bi_loss(pd_ratio: float, s: ScenarioInputs) -> Tuple[int, int, float]:
+    # Brüt kesinti günü, BI bekleme süresi düşülmüş net gün ve beklenen BI hasar tutarı
+    gross_bi_days, net_bi_days_raw = calculate_bi_downtime(pd_ratio, s)
+    net_bi_days_final = max(0, net_bi_days_raw - s.bi_gun_muafiyeti)
+    bi_damage_amount = (s.yillik_brut_kar / 365.0) * net_bi_days_final if s.yillik_brut_kar > 0 else 0
+    return gross_bi_days, net_bi_days_final, bi_damage_amount
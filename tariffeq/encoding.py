@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Kodlanmış Senaryo Dizileri ve Derlenmiş Faktör Tabloları
+# =======================================================================
+# Portföy, ızgara ve duyarlılık hesaplarında senaryolar ScenarioInputs
+# nesneleri yerine tek bir NumPy yapılandırılmış dizisinde (satır başına ~40
+# byte) tutulur. Kategorik etiketler bir kez küçük tamsayı kodlarına çevrilir:
+# etiketten faktör anahtarı core.py'deki kuralla (split(' ')[0], "1998 öncesi"
+# alt dizesi, "Ana Karada / Düz Ova" karşılaştırması) türetilir; tabloda
+# olmayan anahtarlar 0 koduna düşer ve core'daki .get(..., varsayılan) ile aynı
+# çarpanı alır. Faktör tabloları kod ile indekslenen dizilere derlenir. Böylece
+# çekirdek yalnızca indeksleme ve çarpmadan oluşur ve core fonksiyonlarıyla
+# aynı işlem sırasını izleyerek birebir aynı sonucu verir.
+
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Mapping, Sequence
+
+import numpy as np
+
+from .core import (
+    BINA_FAKTORLERI,
+    BINA_ICERIK_ORANLARI,
+    ICERIK_HASSASIYET_CARPANLARI,
+    OPERASYONEL_FAKTORLER,
+    TARIFE_RATES,
+    _DEPREM_ORAN,
+    ScenarioInputs,
+)
+
+SCENARIO_DTYPE = np.dtype([
+    ("si_pd", "f8"),
+    ("yillik_brut_kar", "f8"),
+    ("rg", "i2"),
+    ("yapi", "u1"),
+    ("yonetmelik", "u1"),
+    ("eski_yonetmelik", "?"),
+    ("kat", "u1"),
+    ("zemin", "u1"),
+    ("ana_kara", "?"),
+    ("yumusak_kat", "u1"),
+    ("isp", "u1"),
+    ("makine", "u1"),
+    ("alternatif", "u1"),
+    ("icerik", "u1"),
+    ("profil", "u1"),
+    ("azami_tazminat_suresi", "i4"),
+    ("bitmis_urun_stogu", "i4"),
+    ("bi_gun_muafiyeti", "i4"),
+])
+
+
+def _codes(keys: Iterable[str]) -> Dict[str, int]:
+    return {k: i + 1 for i, k in enumerate(keys)}
+
+
+def _table(mapping: Mapping[str, float], default: float) -> np.ndarray:
+    return np.array([default, *mapping.values()], dtype=float)
+
+
+# --- DERLENMİŞ TABLOLAR (kod 0 = tabloda olmayan etiket) ---
+_YONETMELIK_KOD = _codes(BINA_FAKTORLERI["yonetmelik"])
+_KAT_KOD = _codes(BINA_FAKTORLERI["kat_sayisi"])
+_ZEMIN_KOD = _codes(BINA_FAKTORLERI["zemin"])
+_YUMUSAK_KOD = _codes(BINA_FAKTORLERI["yumusak_kat"])
+_YAPI_KOD = {"Betonarme": 1, "Çelik": 2}
+_ISP_KOD = _codes(OPERASYONEL_FAKTORLER["isp"])
+_MAKINE_KOD = _codes(OPERASYONEL_FAKTORLER["makine_bagimliligi"])
+_ALTERNATIF_KOD = _codes(OPERASYONEL_FAKTORLER["alternatif_tesis"])
+_ICERIK_KOD = _codes(ICERIK_HASSASIYET_CARPANLARI)
+_PROFIL_KOD = _codes(BINA_ICERIK_ORANLARI)
+
+YONETMELIK_CARPANI = _table(BINA_FAKTORLERI["yonetmelik"], 1.0)
+KAT_CARPANI = _table(BINA_FAKTORLERI["kat_sayisi"], 1.0)
+ZEMIN_CARPANI = _table(BINA_FAKTORLERI["zemin"], 1.0)
+YUMUSAK_KAT_CARPANI = _table(BINA_FAKTORLERI["yumusak_kat"], 1.0)
+# [yapı kodu, eski yönetmelik] → Betonarme 1.20, Çelik 1.15 (yalnızca 1998 öncesi)
+YAPI_YONETMELIK_CARPANI = np.array([[1.0, 1.0], [1.0, 1.20], [1.0, 1.15]])
+# [zemin kodu, ana kara] → ZD/ZE zeminde ana kara dışında sıvılaşma 1.40
+SIVILASMA_CARPANI = np.ones((len(ZEMIN_CARPANI), 2))
+SIVILASMA_CARPANI[[_ZEMIN_KOD["ZD"], _ZEMIN_KOD["ZE"]], 0] = 1.40
+ISP_CARPANI = _table(OPERASYONEL_FAKTORLER["isp"], 1.0)
+MAKINE_CARPANI = _table(OPERASYONEL_FAKTORLER["makine_bagimliligi"], 1.0)
+ALTERNATIF_CARPANI = _table(OPERASYONEL_FAKTORLER["alternatif_tesis"], 1.0)
+ICERIK_CARPANI = _table(ICERIK_HASSASIYET_CARPANLARI, 0.8)
+_VARSAYILAN_PROFIL = BINA_ICERIK_ORANLARI["Diğer / Varsayılan"]
+BINA_ORANI = np.array([_VARSAYILAN_PROFIL[0], *(v[0] for v in BINA_ICERIK_ORANLARI.values())])
+ICERIK_ORANI = np.array([_VARSAYILAN_PROFIL[1], *(v[1] for v in BINA_ICERIK_ORANLARI.values())])
+# rg 1..7 → indeks rg; aralık dışı bölgeler indeks 0 (core: _DEPREM_ORAN.get(rg, 0.13))
+DEPREM_ORANI = np.array([0.13, *(_DEPREM_ORAN[rg] for rg in range(1, 8))])
+# [Betonarme mi, rg] → TARIFE_RATES[...][rg - 1]; rg=0 Python'daki gibi son kademeyi verir
+TARIFE_ORANI = np.array([
+    [TARIFE_RATES["Diğer"][rg - 1] for rg in range(8)],
+    [TARIFE_RATES["Betonarme"][rg - 1] for rg in range(8)],
+])
+
+
+def _encoder(derive: Callable[[str], object], codes: Mapping[object, int]) -> Callable[[str], int]:
+    @lru_cache(maxsize=1024)
+    def encode(label: str) -> int:
+        return codes.get(derive(label), 0)
+    return encode
+
+
+def _first_word(label: str) -> str:
+    return label.split(' ')[0]
+
+
+def _identity(label: str) -> str:
+    return label
+
+
+# Kategorik kolon → (ScenarioInputs alanı, etiket → kod). Kurallar core.bina_factor_terms ile aynıdır.
+_KATEGORIK: Dict[str, tuple] = {
+    "yapi": ("yapi_turu", _encoder(_identity, _YAPI_KOD)),
+    "yonetmelik": ("yonetmelik_donemi", _encoder(_first_word, _YONETMELIK_KOD)),
+    "eski_yonetmelik": ("yonetmelik_donemi", _encoder(lambda label: "1998 öncesi" in label, {True: 1})),
+    "kat": ("kat_sayisi", _encoder(_first_word, _KAT_KOD)),
+    "zemin": ("zemin_sinifi", _encoder(_identity, _ZEMIN_KOD)),
+    "ana_kara": ("yakin_cevre", _encoder(lambda label: label == "Ana Karada / Düz Ova", {True: 1})),
+    "yumusak_kat": ("yumusak_kat_riski", _encoder(_identity, _YUMUSAK_KOD)),
+    "isp": ("isp_varligi", _encoder(_identity, _ISP_KOD)),
+    "makine": ("kritik_makine_bagimliligi", _encoder(_identity, _MAKINE_KOD)),
+    "alternatif": ("alternatif_tesis", _encoder(_identity, _ALTERNATIF_KOD)),
+    "icerik": ("icerik_hassasiyeti", _encoder(_identity, _ICERIK_KOD)),
+    "profil": ("bina_icerik_profili", _encoder(_identity, _PROFIL_KOD)),
+}
+_SAYISAL = ("si_pd", "yillik_brut_kar", "rg", "azami_tazminat_suresi", "bitmis_urun_stogu", "bi_gun_muafiyeti")
+
+
+def encode_columns(columns: Mapping[str, Sequence]) -> np.ndarray:
+    # ScenarioInputs alan adlarıyla kolon bazlı girdi (örn: DataFrame kolonları); etiket → kod dönüşümleri önbelleklidir
+    n = len(columns["si_pd"])
+    out = np.empty(n, dtype=SCENARIO_DTYPE)
+    for name in _SAYISAL:
+        out[name] = columns[name]
+    for col, (field, encode) in _KATEGORIK.items():
+        out[col] = np.fromiter(map(encode, columns[field]), dtype=np.uint8, count=n)
+    return out
+
+
+def encode_scenarios(scenarios: Iterable[ScenarioInputs]) -> np.ndarray:
+    scenarios = list(scenarios)
+    fields = set(_SAYISAL) | {field for field, _ in _KATEGORIK.values()}
+    return encode_columns({name: [getattr(s, name) for s in scenarios] for name in fields})
+
+
+def evaluate_encoded(enc: np.ndarray) -> Dict[str, np.ndarray]:
+    # calculate_pd_damage + calculate_bi_loss'un vektörel karşılığı (aynı işlem sırası)
+    rg = enc["rg"]
+    bina_factor = np.ones(len(enc))
+    bina_factor = bina_factor * YONETMELIK_CARPANI[enc["yonetmelik"]]
+    bina_factor = bina_factor * KAT_CARPANI[enc["kat"]]
+    bina_factor = bina_factor * ZEMIN_CARPANI[enc["zemin"]]
+    bina_factor = bina_factor * YUMUSAK_KAT_CARPANI[enc["yumusak_kat"]]
+    bina_factor = bina_factor * YAPI_YONETMELIK_CARPANI[enc["yapi"], enc["eski_yonetmelik"].astype(np.intp)]
+    bina_factor = bina_factor * SIVILASMA_CARPANI[enc["zemin"], enc["ana_kara"].astype(np.intp)]
+    deprem_orani = DEPREM_ORANI[np.where((rg >= 1) & (rg <= 7), rg, 0)]
+    bina_pd_ratio = np.minimum(0.60, np.maximum(0.01, deprem_orani * bina_factor))
+
+    si = enc["si_pd"]
+    pd_damage = (si * BINA_ORANI[enc["profil"]]) * bina_pd_ratio + (si * ICERIK_ORANI[enc["profil"]]) * (bina_pd_ratio * ICERIK_CARPANI[enc["icerik"]])
+    pml = np.divide(pd_damage, si, out=np.zeros(len(enc)), where=si > 0)
+
+    operational_factor = np.ones(len(enc))
+    operational_factor = operational_factor * ISP_CARPANI[enc["isp"]]
+    operational_factor = operational_factor * MAKINE_CARPANI[enc["makine"]]
+    operational_factor = operational_factor * ALTERNATIF_CARPANI[enc["alternatif"]]
+    gross = np.trunc((30 + pml * 300) * operational_factor) + np.where((rg == 1) | (rg == 2), 30, 0)
+    final = np.maximum(0, np.minimum(enc["azami_tazminat_suresi"], gross - enc["bitmis_urun_stogu"]))
+    net_days = np.maximum(0, final - enc["bi_gun_muafiyeti"])
+    ybk = enc["yillik_brut_kar"]
+    bi_damage = np.where(ybk > 0, (ybk / 365.0) * net_days, 0.0)
+    return {
+        "bina_pd_ratio": bina_pd_ratio,
+        "pd_hasar": pd_damage,
+        "pml_orani": pml,
+        "brut_kesinti_gun": np.maximum(0, gross).astype(np.int64),
+        "net_kesinti_gun": net_days.astype(np.int64),
+        "bi_hasar": bi_damage,
+    }
+
+
+def tariff_rates(enc: np.ndarray) -> np.ndarray:
+    return TARIFE_ORANI[(enc["yapi"] == 1).astype(np.intp), enc["rg"]]
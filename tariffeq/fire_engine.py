@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Vektörel Yangın/Deprem Grup Primi Motoru
+# =======================================================================
+# premium.calculate_fire_premium'un dizi karşılığı: tüm lokasyon grupları (ve
+# aynı çerçevede birden fazla portföy) tek çağrıda fiyatlanır. Grup başına
+# bileşen primleri (PD, BI, EC, MK), uygulanan oran ve limit aşım bayrakları
+# sütun olarak döner; hesap sırasında hiçbir uyarı yazılmaz. Arayüz ve servis
+# uyarıları sonradan warning_keys ile bayraklardan üretir.
+#
+# Limit oranlaması (bedel limiti aşarsa oran × limit / bedel, 6 haneye
+# yuvarlanarak) dört bileşen için tek bir yardımcıda yapılır ve işlem sırası
+# skaler fonksiyonla aynıdır. Koasürans, muafiyet, kur ve enflasyon skaler ya
+# da satır başına dizi olabilir; böylece farklı koşullardaki portföyler de aynı
+# çağrıda fiyatlanır.
+#
+# Kullanım:
+#   groups = aggregate_location_groups(locations)   # veya determine_group_params(...)
+#   result = price_fire_groups(groups, koas="80/20", deduct=2, fx_rate=1.0)
+#   for key in warning_keys(result):
+#       st.warning(tr(key))
+
+from typing import Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .premium import LOCATION_FIELDS
+from .tariff import TIP_KODLARI, TarifeSurumu, current_tariff
+
+YAPI_KODLARI = {t: TIP_KODLARI[t] for t in ("Betonarme", "Diğer")}  # tariff.oranlar satırları
+SEYYAR_ORAN = 2.00  # EC / MK seyyar bedeller için sabit oran (‰)
+
+# Bayrak sütunu → premium.py'deki uyarı anahtarı (sıra skaler fonksiyondaki uyarı sırasıdır)
+LIMIT_BAYRAKLARI = {
+    "limit_fire_pd": "limit_warning_fire_pd",
+    "limit_fire_bi": "limit_warning_fire_bi",
+    "limit_ec": "limit_warning_ec",
+    "limit_mk": "limit_warning_mk",
+}
+
+Terms = Union[str, float, Sequence, np.ndarray]
+
+
+def fire_group_frame(groups: Union[pd.DataFrame, Mapping[str, dict]]) -> pd.DataFrame:
+    # aggregate_location_groups çıktısı olduğu gibi, determine_group_params sözlüğü grup adı indeksli çerçeveye çevrilir
+    if isinstance(groups, pd.DataFrame):
+        return groups
+    return pd.DataFrame.from_dict(dict(groups), orient="index", columns=["building_type", "risk_group", *LOCATION_FIELDS])
+
+
+def _prorate(rate: np.ndarray, sum_insured: np.ndarray, limit: float, active: np.ndarray):
+    # Bedel limiti aşan satırlarda oran limit/bedel oranında düşürülür (6 haneye yuvarlanarak)
+    breach = active & (sum_insured > limit)
+    if breach.any():
+        scaled = np.round(rate * (limit / np.where(breach, sum_insured, limit)), 6)
+        rate = np.where(breach, scaled, rate)
+    return rate, breach
+
+
+def fire_premium_arrays(building_code: np.ndarray, risk_group: np.ndarray, sums: Mapping[str, np.ndarray],
+                        koas_discount, deduct_discount, fx_rate=1.0, inflation_rate=0.0,
+                        tariff: Optional[TarifeSurumu] = None) -> Dict[str, np.ndarray]:
+    # Tüm girdiler yayınlanabilir (broadcast) dizilerdir; sonuçlar ortak biçimdedir
+    tariff = tariff or current_tariff()
+    si = {f: np.asarray(sums[f], dtype=np.float64) * fx_rate for f in LOCATION_FIELDS}
+    pd_sum_insured = (si["building"] + si["fixture"] + si["decoration"] + si["commodity"] + si["safe"]
+                      + si["ec_fixed"] + si["ec_mobile"] + si["mk_fixed"] + si["mk_mobile"])
+
+    inflation_multiplier = 1 + (np.asarray(inflation_rate, dtype=np.float64) / 100) / 2
+    rate = tariff.oranlar[building_code, np.asarray(risk_group) - 1] * inflation_multiplier
+    discounted = rate * (1 - koas_discount) * (1 - deduct_discount)
+    everywhere = np.ones(np.broadcast(discounted, pd_sum_insured).shape, dtype=bool)
+
+    # PD: limit kontrolünde EC/MK dahil, primde hariç
+    pd_sum_for_premium = si["building"] + si["fixture"] + si["decoration"] + si["commodity"] + si["safe"]
+    rate_pd, limit_pd = _prorate(discounted, pd_sum_insured, tariff.limit_fire, everywhere)
+    pd_premium = (pd_sum_for_premium * rate_pd) / 1000
+
+    # BI: koasürans/muafiyet indirimi uygulanmaz
+    rate_bi, limit_bi = _prorate(rate, si["bi"], tariff.limit_fire, everywhere)
+    bi_premium = (si["bi"] * rate_bi) / 1000
+
+    mobile_rate = SEYYAR_ORAN * inflation_multiplier
+    component = {}
+    for name in ("ec", "mk"):
+        fixed, mobile = si[f"{name}_fixed"], si[f"{name}_mobile"]
+        has_fixed, has_mobile = np.asarray(sums[f"{name}_fixed"]) > 0, np.asarray(sums[f"{name}_mobile"]) > 0
+        rate_fixed, limit_fixed = _prorate(discounted, fixed, tariff.limit_ec_mk, has_fixed)
+        rate_mobile, limit_mobile = _prorate(mobile_rate, mobile, tariff.limit_ec_mk, has_mobile)
+        component[name] = (np.where(has_fixed, (fixed * rate_fixed) / 1000, 0.0)
+                           + np.where(has_mobile, (mobile * rate_mobile) / 1000, 0.0))
+        component[f"limit_{name}"] = limit_fixed | limit_mobile
+
+    total_premium = pd_premium + bi_premium + component["ec"] + component["mk"]
+    return {
+        "pd_premium": pd_premium, "bi_premium": bi_premium, "ec_premium": component["ec"], "mk_premium": component["mk"],
+        "total_premium": total_premium, "rate": np.broadcast_to(rate, total_premium.shape),
+        "limit_fire_pd": limit_pd, "limit_fire_bi": limit_bi, "limit_ec": component["limit_ec"], "limit_mk": component["limit_mk"],
+    }
+
+
+def price_fire_groups(groups: Union[pd.DataFrame, Mapping[str, dict]], koas: Terms, deduct: Terms,
+                      fx_rate=1.0, inflation_rate=0.0, tariff: Optional[TarifeSurumu] = None) -> pd.DataFrame:
+    # Sonuç indeksi girdi çerçevesinin indeksidir (grup adı veya örn. (portföy, grup)); primler TRY cinsindendir
+    tariff = tariff or current_tariff()
+    frame = fire_group_frame(groups)
+    building_type = frame["building_type"].to_numpy(dtype=object)
+    diger = building_type == "Diğer"
+    invalid = ~(diger | (building_type == "Betonarme"))
+    if invalid.any():
+        raise ValueError(f"Geçersiz yapı tarzı: {', '.join(sorted(map(str, set(building_type[invalid]))))}")
+    out = fire_premium_arrays(
+        np.where(diger, YAPI_KODLARI["Diğer"], YAPI_KODLARI["Betonarme"]), frame["risk_group"].to_numpy(dtype=np.intp),
+        {f: frame[f].to_numpy(dtype=np.float64) for f in LOCATION_FIELDS},
+        tariff.koas_discount(koas), tariff.deduct_discount(deduct),
+        np.asarray(fx_rate, dtype=np.float64), inflation_rate, tariff,
+    )
+    return pd.DataFrame({name: np.broadcast_to(values, len(frame)) for name, values in out.items()}, index=frame.index)
+
+
+def warning_keys(result: pd.DataFrame) -> List[str]:
+    # Herhangi bir satırda aşılan limitlerin uyarı anahtarları; her anahtar bir kez
+    return [key for flag, key in LIMIT_BAYRAKLARI.items() if result[flag].any()]
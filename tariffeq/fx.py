@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – TCMB Döviz Kuru Tablosu
+# =======================================================================
+# TCMB'nin günlük XML dosyası tek istekle indirilir ve tüm dövizler için
+# kod → TL kuru tablosuna çevrilir (BanknoteSelling, yoksa ForexSelling; Unit
+# ile bölünerek 1 birim döviz karşılığı). İstekler süreç genelinde paylaşılan,
+# bağlantı havuzlu bir requests.Session üzerinden yapılır. today.xml ile
+# birlikte son günlerin arşiv dosyaları (hafta sonları atlanarak) eşzamanlı
+# istenir; öncelik sırasına göre ilk geçerli yanıt alınır. Böylece today.xml
+# yanıt vermese bile bekleme süresi tek bir istek turu kadardır.
+#
+# FxPrefetcher süreç başına bir arka plan iş parçacığıyla tabloyu sıcak tutar:
+# düzenli aralıklarla ve TCMB'nin yayın saatinden (iş günleri 15:30 TSİ) hemen
+# sonra yeniler. Okumalar bellekteki değişmez bir anlık görüntüden yapılır;
+# yenileme başarısız olursa son geçerli tablo tarihiyle birlikte sunulmaya
+# devam eder ve görüntünün ne kadar taze olduğu bildirilir.
+#
+# Ortam değişkenleri:
+#   TARIFFEQ_TCMB_URL   Kur dosyalarının kök adresi (test için yerel bir sunucu verilebilir)
+
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+VARSAYILAN_TCMB_URL = os.environ.get("TARIFFEQ_TCMB_URL", "https://www.tcmb.gov.tr/kurlar")
+ZAMAN_ASIMI = 4.0  # saniye, istek başına
+GERI_GUN = 7  # today.xml alınamazsa bakılan takvim günü sayısı
+HAVUZ_BOYUTU = 8
+YENILEME_ARALIGI = 15 * 60  # saniye
+HATA_BEKLEMESI = 30.0  # başarısız yenilemeden sonra ilk tekrar (her denemede iki katı, en fazla YENILEME_ARALIGI)
+BAYAT_ESIGI = 2 * 3600  # son başarılı yenilemeden bu kadar saniye sonra görüntü bayat sayılır
+TCMB_SAAT_DILIMI = timezone(timedelta(hours=3))
+YAYIN_SAATI = dtime(15, 30)
+YAYIN_GECIKMESI = 120  # saniye; dosyanın yayına girmesi için pay
+
+_session = None
+_session_lock = threading.Lock()
+
+
+@dataclass
+class FxTable:
+    date: str  # YYYY-MM-DD (TCMB yayın tarihi)
+    rates: Dict[str, float] = field(default_factory=dict)
+    source: str = ""
+
+    def rate(self, ccy: str) -> Optional[float]:
+        return 1.0 if ccy == "TRY" else self.rates.get(ccy)
+
+
+def get_session():
+    # requests yalnızca ilk kur isteğinde yüklenir; oturum ve bağlantı havuzu süreç boyunca yeniden kullanılır
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=HAVUZ_BOYUTU)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def parse_tcmb_xml(content: bytes, fallback_date: Optional[date] = None) -> Optional[FxTable]:
+    root = ET.fromstring(content)
+    rates: Dict[str, float] = {}
+    for cur in root.findall("Currency"):
+        code = cur.attrib.get("CurrencyCode") or cur.attrib.get("Kod")
+        txt = cur.findtext("BanknoteSelling") or cur.findtext("ForexSelling")
+        if not code or not txt or not txt.strip():
+            continue
+        try:
+            unit = float(cur.findtext("Unit") or 1) or 1.0
+            rates[code] = float(txt.replace(",", ".")) / unit
+        except ValueError:
+            continue
+    if not rates:
+        return None
+    if "Date" in root.attrib:
+        day = datetime.strptime(root.attrib["Date"], "%m/%d/%Y" if "/" in root.attrib["Date"] else "%d.%m.%Y").date()
+    elif fallback_date is not None:
+        day = fallback_date
+    else:
+        return None
+    return FxTable(day.strftime("%Y-%m-%d"), rates)
+
+
+def candidate_urls(base_url: str = VARSAYILAN_TCMB_URL, today: Optional[date] = None, days_back: int = GERI_GUN) -> List[tuple]:
+    # (url, tarih) çiftleri öncelik sırasıyla; TCMB hafta sonu dosya yayımlamaz
+    today = today or date.today()
+    urls = [(f"{base_url}/today.xml", None)]
+    for i in range(1, days_back + 1):
+        d = today - timedelta(days=i)
+        if d.weekday() < 5:
+            urls.append((f"{base_url}/{d:%Y%m}/{d:%d%m%Y}.xml", d))
+    return urls
+
+
+def _fetch(url: str, day: Optional[date], timeout: float) -> Optional[FxTable]:
+    try:
+        r = get_session().get(url, timeout=timeout)
+        if not r.ok:
+            return None
+        table = parse_tcmb_xml(r.content, day)
+    except Exception:
+        return None
+    if table is not None:
+        table.source = url
+    return table
+
+
+def fetch_fx_table(base_url: str = VARSAYILAN_TCMB_URL, timeout: float = ZAMAN_ASIMI, today: Optional[date] = None,
+                   days_back: int = GERI_GUN) -> Optional[FxTable]:
+    # Tüm adaylar aynı anda istenir; sonuçlar öncelik sırasıyla okunur ve ilk geçerli tablo döner
+    urls = candidate_urls(base_url, today, days_back)
+    pool = ThreadPoolExecutor(max_workers=min(len(urls), HAVUZ_BOYUTU), thread_name_prefix="tariffeq-fx")
+    try:
+        futures = [pool.submit(_fetch, url, day, timeout) for url, day in urls]
+        for future in futures:
+            table = future.result()
+            if table is not None:
+                return table
+        return None
+    finally:
+        # Kalan istekler arka planda tamamlanır; çağıran onları beklemez
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# --- ARKA PLAN ÖN YÜKLEYİCİ ---
+@dataclass(frozen=True)
+class FxSnapshot:
+    table: Optional[FxTable] = None
+    fetched_at: Optional[float] = None  # son başarılı yenileme (epoch)
+    attempted_at: Optional[float] = None
+    error: Optional[str] = None  # son denemenin hatası; başarılıysa None
+
+    @property
+    def age_seconds(self) -> Optional[float]:
+        return None if self.fetched_at is None else time.time() - self.fetched_at
+
+    @property
+    def stale(self) -> bool:
+        age = self.age_seconds
+        return age is None or age > BAYAT_ESIGI
+
+
+def next_publication(now: datetime) -> datetime:
+    # now sonrasındaki ilk iş günü yayın anı (+ gecikme payı); resmi tatiller dikkate alınmaz
+    now = now.astimezone(TCMB_SAAT_DILIMI)
+    candidate = datetime.combine(now.date(), YAYIN_SAATI, TCMB_SAAT_DILIMI) + timedelta(seconds=YAYIN_GECIKMESI)
+    while candidate <= now or candidate.weekday() >= 5:
+        candidate = datetime.combine(candidate.date() + timedelta(days=1), YAYIN_SAATI, TCMB_SAAT_DILIMI) + timedelta(seconds=YAYIN_GECIKMESI)
+    return candidate
+
+
+class FxPrefetcher:
+    def __init__(self, fetch: Callable[[], Optional[FxTable]] = fetch_fx_table, interval: float = YENILEME_ARALIGI):
+        self._fetch = fetch
+        self.interval = interval
+        self._snapshot = FxSnapshot()  # tek referans ataması; okuyucular kilit almaz
+        self._ready = threading.Event()  # ilk deneme (başarılı veya değil) tamamlandı
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> "FxPrefetcher":
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="tariffeq-fx-prefetch", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def refresh_now(self) -> None:
+        self._wake.set()
+
+    def snapshot(self) -> FxSnapshot:
+        return self._snapshot
+
+    def wait_ready(self, timeout: Optional[float] = None) -> FxSnapshot:
+        # Yalnızca süreç açılışındaki ilk istekte bekler; sonrasında anında döner
+        self._ready.wait(timeout)
+        return self._snapshot
+
+    def refresh(self) -> bool:
+        attempted = time.time()
+        try:
+            table = self._fetch()
+            error = None if table is not None else "TCMB kur tablosu alınamadı"
+        except Exception as e:
+            table, error = None, f"{type(e).__name__}: {e}"
+        prev = self._snapshot
+        if table is not None:
+            self._snapshot = FxSnapshot(table, attempted, attempted, None)
+        else:
+            self._snapshot = FxSnapshot(prev.table, prev.fetched_at, attempted, error)
+        self._ready.set()
+        return table is not None
+
+    def _run(self) -> None:
+        backoff = HATA_BEKLEMESI
+        while not self._stop.is_set():
+            if self.refresh():
+                backoff = HATA_BEKLEMESI
+                delay = min(self.interval, (next_publication(datetime.now(timezone.utc)) - datetime.now(timezone.utc)).total_seconds())
+            else:
+                delay = min(backoff, self.interval)
+                backoff = min(backoff * 2, self.interval)
+            self._wake.wait(max(delay, 1.0))
+            self._wake.clear()
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Yerel Tarihsel TCMB Kur Deposu
+# =======================================================================
+# TCMB'nin günlük XML arşivleri (tek dosya, klasör veya zip) toplu olarak
+# içe aktarılır ve SQLite'ta (ccy, gün) birincil anahtarlı WITHOUT ROWID
+# tablosunda saklanır. Sorgular için her döviz ilk kullanımda bellekte sıralı
+# gün/kur listelerine yüklenir; "X dövizinin D tarihindeki, yoksa D'den önceki
+# son iş günündeki kuru" tek bir ikili arama ile mikrosaniyeler içinde
+# yanıtlanır. Böylece teklifler başlangıç tarihindeki kurla, çevrimdışı olarak
+# fiyatlanabilir veya yeniden fiyatlanabilir. Bellekteki seriler başka bir
+# süreçten yapılan içe aktarımları görmek için belirli aralıklarla yenilenir.
+#
+# Kullanım:
+#   python -m tariffeq.fx_history import arsiv/ kurlar_2023.zip 15032024.xml
+#   python -m tariffeq.fx_history download --start 2020-01-01 --end 2024-12-31
+#   python -m tariffeq.fx_history rate USD 2024-03-16
+#   python -m tariffeq.fx_history info
+#
+# Ortam değişkenleri:
+#   TARIFFEQ_FX_DB   Depo dosyası (varsayılan .cache/fx_history.sqlite3)
+
+import argparse
+import os
+import re
+import sys
+import threading
+import time
+import zipfile
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .ai_cache import connect
+from .fx import VARSAYILAN_TCMB_URL, ZAMAN_ASIMI, FxTable, get_session, parse_tcmb_xml
+
+VARSAYILAN_FX_YOLU = os.environ.get(
+    "TARIFFEQ_FX_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "fx_history.sqlite3"),
+)
+AZAMI_BOSLUK_GUN = 7  # istenen tarihten bu kadar gün daha eski kur "o tarihteki kur" sayılmaz
+YENIDEN_YUKLEME = 60.0  # saniye; bellekteki seriler en fazla bu kadar eski kalır
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fx_rates (
+    ccy TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    rate REAL NOT NULL,
+    PRIMARY KEY (ccy, day)
+) WITHOUT ROWID;
+"""
+_DOSYA_TARIHI = re.compile(r"(\d{2})(\d{2})(\d{4})\.xml$", re.IGNORECASE)
+
+
+class FxHistory:
+    def __init__(self, path: str = VARSAYILAN_FX_YOLU):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._series: Dict[str, Tuple[float, List[int], List[float]]] = {}  # ccy → (yükleme anı, sıralı günler, kurlar)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def import_tables(self, tables: Iterable[FxTable]) -> int:
+        rows = [
+            (ccy, datetime.strptime(table.date, "%Y-%m-%d").date().toordinal(), rate)
+            for table in tables for ccy, rate in table.rates.items()
+        ]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO fx_rates (ccy, day, rate) VALUES (?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self._series.clear()
+        return len(rows)
+
+    def _load(self, ccy: str) -> Tuple[List[int], List[float]]:
+        series = self._series.get(ccy)
+        now = time.monotonic()
+        if series is None or now - series[0] > YENIDEN_YUKLEME:
+            rows = self._conn().execute("SELECT day, rate FROM fx_rates WHERE ccy = ? ORDER BY day", (ccy,)).fetchall()
+            series = (now, [d for d, _ in rows], [r for _, r in rows])
+            with self._lock:
+                self._series[ccy] = series
+        return series[1], series[2]
+
+    def rate_on(self, ccy: str, day: date, max_gap_days: Optional[int] = AZAMI_BOSLUK_GUN) -> Optional[Tuple[float, date]]:
+        # day tarihindeki ya da ondan önceki son yayın günündeki kur ve o günün tarihi
+        days, rates = self._load(ccy)
+        i = bisect_right(days, day.toordinal()) - 1
+        if i < 0 or (max_gap_days is not None and day.toordinal() - days[i] > max_gap_days):
+            return None
+        return rates[i], date.fromordinal(days[i])
+
+    def coverage(self) -> List[Dict[str, object]]:
+        rows = self._conn().execute("SELECT ccy, MIN(day), MAX(day), COUNT(*) FROM fx_rates GROUP BY ccy ORDER BY ccy").fetchall()
+        return [{"ccy": ccy, "first": date.fromordinal(lo), "last": date.fromordinal(hi), "days": n} for ccy, lo, hi, n in rows]
+
+
+# --- ARŞİV OKUMA ---
+def _date_from_name(name: str) -> Optional[date]:
+    m = _DOSYA_TARIHI.search(name)
+    if m is None:
+        return None
+    try:
+        return date(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+    except ValueError:
+        return None
+
+
+def iter_archive_tables(paths: Iterable[str]) -> Iterator[FxTable]:
+    # .xml dosyaları, .zip arşivlerindeki .xml üyeleri ve klasörlerin altındaki tümü
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                yield from iter_archive_tables(os.path.join(root, f) for f in sorted(files) if f.lower().endswith((".xml", ".zip")))
+        elif path.lower().endswith(".zip"):
+            with zipfile.ZipFile(path) as zf:
+                for name in sorted(zf.namelist()):
+                    if name.lower().endswith(".xml"):
+                        table = _parse_quiet(zf.read(name), _date_from_name(name))
+                        if table is not None:
+                            yield table
+        else:
+            with open(path, "rb") as f:
+                table = _parse_quiet(f.read(), _date_from_name(path))
+            if table is not None:
+                yield table
+
+
+def _parse_quiet(content: bytes, day: Optional[date]) -> Optional[FxTable]:
+    try:
+        return parse_tcmb_xml(content, day)
+    except Exception:
+        return None
+
+
+def download_tables(start: date, end: date, base_url: str = VARSAYILAN_TCMB_URL, workers: int = 8) -> Iterator[FxTable]:
+    # Hafta içi her gün için arşiv dosyası eşzamanlı istenir; tatil günleri (404) atlanır
+    def fetch(d: date) -> Optional[FxTable]:
+        try:
+            r = get_session().get(f"{base_url}/{d:%Y%m}/{d:%d%m%Y}.xml", timeout=ZAMAN_ASIMI)
+            return parse_tcmb_xml(r.content, d) if r.ok else None
+        except Exception:
+            return None
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tariffeq-fx-history") as pool:
+        for table in pool.map(fetch, [d for d in days if d.weekday() < 5]):
+            if table is not None:
+                yield table
+
+
+# --- KOMUT SATIRI ---
+def _iso_date(text: str) -> date:
+    return datetime.strptime(text, "%Y-%m-%d").date()
+
+
+def _batched(tables: Iterable[FxTable], size: int = 250) -> Iterator[List[FxTable]]:
+    batch: List[FxTable] = []
+    for table in tables:
+        batch.append(table)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="TariffEQ tarihsel TCMB kur deposu")
+    parser.add_argument("--db", default=VARSAYILAN_FX_YOLU, help="Depo dosyası")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import", help="TCMB XML dosyalarını, klasörlerini veya zip arşivlerini içe aktar")
+    p_import.add_argument("paths", nargs="+")
+    p_download = sub.add_parser("download", help="Bir tarih aralığındaki günlük dosyaları TCMB'den indirip içe aktar")
+    p_download.add_argument("--start", type=_iso_date, required=True)
+    p_download.add_argument("--end", type=_iso_date, default=date.today())
+    p_download.add_argument("--base-url", default=VARSAYILAN_TCMB_URL)
+    p_download.add_argument("--workers", type=int, default=8)
+    p_rate = sub.add_parser("rate", help="Bir dövizin verilen tarihteki (veya önceki son iş günündeki) kuru")
+    p_rate.add_argument("ccy")
+    p_rate.add_argument("day", type=_iso_date)
+    sub.add_parser("info", help="Döviz bazında kapsanan tarih aralığı")
+    args = parser.parse_args(argv)
+
+    history = FxHistory(args.db)
+    if args.command in ("import", "download"):
+        tables = iter_archive_tables(args.paths) if args.command == "import" else download_tables(args.start, args.end, args.base_url, args.workers)
+        n_days = n_rows = 0
+        for batch in _batched(tables):
+            n_days += len(batch)
+            n_rows += history.import_tables(batch)
+            print(f"\r{n_days} gün, {n_rows} kur", end="", file=sys.stderr)
+        print(file=sys.stderr)
+    elif args.command == "rate":
+        hit = history.rate_on(args.ccy.upper(), args.day, max_gap_days=None)
+        if hit is None:
+            sys.exit(f"{args.ccy.upper()} için {args.day} veya öncesine ait kur yok")
+        print(f"{args.ccy.upper()} {hit[1]:%Y-%m-%d} {hit[0]:.4f}")
+    else:
+        for row in history.coverage():
+            print(f"{row['ccy']:<4} {row['first']:%Y-%m-%d} – {row['last']:%Y-%m-%d}  {row['days']} gün")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Toplu Lokasyon Listesi İçe Aktarımı ve Grup Toplamları
+# =======================================================================
+# Yüzlerce / on binlerce lokasyonluk sanayi listeleri CSV veya Excel
+# dosyasından tek seferde DataFrame'e okunur; lokasyon başına arayüz bileşeni
+# oluşturulmaz. Grup parametreleri tek bir sütunsal groupby ile hesaplanır:
+# gruptaki herhangi bir lokasyon "Diğer" ise grup "Diğer" (en kötü yapı tarzı),
+# risk grubu gruptaki en küçük değer, bedeller ise toplamdır
+# (premium.determine_group_params ile aynı kurallar).
+#
+# Sütun adları Türkçe veya İngilizce olabilir (bkz. SUTUN_ESLEMELERI); bedel
+# sütunları eksikse veya hücre boşsa 0 kabul edilir, sayıya çevrilemeyen dolu
+# hücreler ise satır numarasıyla hata verir (sessizce 0 primlenmez). Excel
+# okumak için openpyxl kurulu olmalıdır.
+
+import io
+from typing import Dict, Union
+
+import numpy as np
+import pandas as pd
+
+from .premium import LOCATION_FIELDS
+
+YAPI_TURLERI = ("Betonarme", "Diğer")
+RISK_GRUPLARI = tuple(range(1, 8))
+
+# Kanonik alan → kabul edilen başlıklar (küçük harfe çevrilip boşluklar "_" yapılarak karşılaştırılır)
+SUTUN_ESLEMELERI: Dict[str, tuple] = {
+    "group": ("group", "grup", "lokasyon_grubu", "location_group"),
+    "building_type": ("building_type", "yapi_tarzi", "yapı_tarzı", "yapi_turu", "yapı_türü"),
+    "risk_group": ("risk_group", "risk_grubu", "deprem_risk_grubu"),
+    "building": ("building", "bina"),
+    "fixture": ("fixture", "demirbas", "demirbaş"),
+    "decoration": ("decoration", "dekorasyon"),
+    "commodity": ("commodity", "emtia"),
+    "safe": ("safe", "kasa"),
+    "bi": ("bi", "kar_kaybi", "kâr_kaybı", "business_interruption"),
+    "ec_fixed": ("ec_fixed", "ec_sabit", "elektronik_cihaz_sabit"),
+    "ec_mobile": ("ec_mobile", "ec_seyyar", "elektronik_cihaz_seyyar"),
+    "mk_fixed": ("mk_fixed", "mk_sabit", "makine_kirilmasi_sabit"),
+    "mk_mobile": ("mk_mobile", "mk_seyyar", "makine_kirilmasi_seyyar"),
+}
+ZORUNLU_SUTUNLAR = ("group", "building_type", "risk_group")
+
+
+def _normalize_header(name: str) -> str:
+    return "_".join(str(name).strip().lower().split())
+
+
+def normalize_locations(df: pd.DataFrame) -> pd.DataFrame:
+    # Başlıkları kanonik adlara çevirir, tipleri ve değer kümelerini doğrular
+    aliases = {alias: field for field, names in SUTUN_ESLEMELERI.items() for alias in names}
+    renamed = {}
+    for col in df.columns:
+        field = aliases.get(_normalize_header(col))
+        if field is not None and field not in renamed.values():
+            renamed[col] = field
+    df = df.rename(columns=renamed)
+    missing = [c for c in ZORUNLU_SUTUNLAR if c not in df.columns]
+    if missing:
+        raise ValueError(f"Eksik sütun(lar): {', '.join(missing)}")
+
+    out = pd.DataFrame({
+        "group": df["group"].astype(str).str.strip(),
+        "building_type": df["building_type"].astype(str).str.strip(),
+        "risk_group": pd.to_numeric(df["risk_group"], errors="coerce"),
+    })
+    bad_number = pd.Series(False, index=df.index)
+    for field in LOCATION_FIELDS:
+        if field not in df.columns:
+            out[field] = 0.0
+            continue
+        values = pd.to_numeric(df[field], errors="coerce")
+        # Yalnızca boş hücreler 0 sayılır; "abc" veya okunamayan sayı biçimleri hatadır
+        blank = df[field].isna() | (df[field].astype(str).str.strip() == "")
+        bad_number |= values.isna() & ~blank
+        out[field] = values.fillna(0.0).astype(np.float64)
+
+    bad_type = ~out["building_type"].isin(YAPI_TURLERI)
+    bad_risk = ~out["risk_group"].isin(RISK_GRUPLARI)
+    bad_sum = (out[list(LOCATION_FIELDS)] < 0).any(axis=1)
+    for mask, message in ((bad_type, f"yapı tarzı {'/'.join(YAPI_TURLERI)} olmalı"), (bad_risk, "risk grubu 1-7 olmalı"),
+                          (bad_number, "bedeller sayı olmalı"), (bad_sum, "bedeller negatif olamaz")):
+        if mask.any():
+            rows = ", ".join(str(i + 2) for i in np.flatnonzero(mask.to_numpy())[:10])  # başlık satırı = 1
+            raise ValueError(f"{message} (satır: {rows}{' …' if mask.sum() > 10 else ''})")
+    out["risk_group"] = out["risk_group"].astype(np.int64)
+    return out.reset_index(drop=True)
+
+
+def read_location_schedule(source: Union[str, bytes, io.IOBase], filename: str = "") -> pd.DataFrame:
+    # source: dosya yolu, bayt dizisi veya dosya nesnesi; biçim uzantıdan anlaşılır
+    name = (filename or (source if isinstance(source, str) else "")).lower()
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            source = f.read()
+    elif not isinstance(source, bytes):
+        source = source.read()
+    if name.endswith((".xlsx", ".xlsm", ".xls")):
+        try:
+            raw = pd.read_excel(io.BytesIO(source))
+        except ImportError as e:
+            raise ValueError("Excel dosyaları için openpyxl kurulu olmalıdır; dosyayı CSV olarak kaydedebilirsiniz.") from e
+    else:
+        # Türkçe Excel'den dışa aktarılan CSV'ler genellikle ";" ile (ondalıklar "," ve binlikler "." ile) ayrılır
+        header = source[:source.find(b"\n")] if b"\n" in source else source
+        sep = ";" if header.count(b";") > header.count(b",") else ","
+        numbers = {"decimal": ",", "thousands": "."} if sep == ";" else {"decimal": "."}
+        raw = pd.read_csv(io.BytesIO(source), sep=sep, encoding="utf-8-sig", **numbers)
+    return normalize_locations(raw)
+
+
+def aggregate_location_groups(locations: pd.DataFrame) -> pd.DataFrame:
+    # Tek geçişte grup toplamları; indeks grup adı, sütunlar determine_group_params çıktısıyla aynı
+    work = locations[["group", "risk_group", *LOCATION_FIELDS]].copy()
+    work["_diger"] = locations["building_type"].to_numpy() == "Diğer"
+    agg = work.groupby("group", sort=True).agg({"_diger": "max", "risk_group": "min", **{f: "sum" for f in LOCATION_FIELDS}})
+    agg.insert(0, "building_type", np.where(agg.pop("_diger").to_numpy(), "Diğer", "Betonarme"))
+    agg.insert(2, "locations", work.groupby("group", sort=True).size())
+    return agg
+
+
+def group_params_from_frame(groups: pd.DataFrame) -> Dict[str, dict]:
+    # aggregate_location_groups çıktısını determine_group_params sözlük biçimine çevirir
+    cols = ["building_type", "risk_group", *LOCATION_FIELDS]
+    return {
+        str(group): {"building_type": row[0], "risk_group": int(row[1]), **{f: float(v) for f, v in zip(LOCATION_FIELDS, row[2:])}}
+        for group, row in zip(groups.index, groups[cols].itertuples(index=False, name=None))
+    }
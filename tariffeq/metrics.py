@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Aşama Süresi Ölçümü ve Metrik Dışa Aktarımı
+# =======================================================================
+# Sayfaların her rerun'ı bir "çalışma izi" (RunTrace) olarak kaydedilir; izin
+# içindeki her aşama span() bağlam yöneticisiyle ölçülür (Gemini parametre
+# çağrısı, rapor, PD/BI hesabı, tablo/biçimlendirme, Plotly çizimi vb.).
+# st.cache_data fonksiyonları instrument_cache ile sarılarak isabet/ıskalama
+# sayıları tutulur. Süreç genelindeki toplamlar iş parçacığı güvenli bir kayıt
+# defterinde birikir. Dışa aktarım isteğe bağlıdır: yalnızca bir yol verildiğinde
+# (veya geliştirici modunda) her rerun sonunda JSON-lines dosyasına bir satır
+# eklenir ve Prometheus textfile formatındaki dosya (node_exporter textfile
+# collector ile toplanabilir) atomik olarak yenilenir. Varsayılan kurulumda
+# diske hiçbir şey yazılmaz.
+#
+# Ortam değişkenleri:
+#   TARIFFEQ_METRICS_JSONL   JSON-lines çıktısı (tanımsız veya "" ise yazılmaz)
+#   TARIFFEQ_METRICS_PROM    Prometheus textfile çıktısı (tanımsız veya "" ise yazılmaz)
+#   TARIFFEQ_DEV=1           Geliştirici kenar çubuğu panelini her zaman göster; yol
+#                            verilmemişse çıktıları .cache/metrics/ altına yazar
+
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+_METRIK_DIZINI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "metrics")
+DEV_MODU = os.environ.get("TARIFFEQ_DEV") == "1"
+
+
+def _cikti_yolu(degisken: str, dosya: str) -> Optional[str]:
+    # Açıkça verilen yol her zaman geçerlidir ("" kapatır); aksi halde yalnızca geliştirici modunda yazılır
+    yol = os.environ.get(degisken)
+    if yol is None:
+        return os.path.join(_METRIK_DIZINI, dosya) if DEV_MODU else None
+    return yol or None
+
+
+VARSAYILAN_JSONL_YOLU = _cikti_yolu("TARIFFEQ_METRICS_JSONL", "runs.jsonl")
+VARSAYILAN_PROM_YOLU = _cikti_yolu("TARIFFEQ_METRICS_PROM", "tariffeq.prom")
+PENCERE = 1_000  # aşama başına yüzdelik hesabında tutulan son ölçüm sayısı
+
+
+class _StageStats:
+    __slots__ = ("count", "total", "window")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.window: Deque[float] = deque(maxlen=PENCERE)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.window.append(seconds)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, _StageStats] = {}
+        self._caches: Dict[str, List[int]] = {}  # ad → [isabet, ıskalama]
+        self.runs = 0
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._stages.setdefault(stage, _StageStats()).add(seconds)
+
+    def count_cache(self, name: str, hit: bool) -> None:
+        with self._lock:
+            self._caches.setdefault(name, [0, 0])[0 if hit else 1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {}
+            for name, stats in self._stages.items():
+                window = sorted(stats.window)
+                stages[name] = {
+                    "count": stats.count, "sum_s": stats.total,
+                    "p50_s": _percentile(window, 0.50), "p95_s": _percentile(window, 0.95),
+                }
+            caches = {name: {"hits": h, "misses": m} for name, (h, m) in self._caches.items()}
+            return {"runs": self.runs, "stages": stages, "caches": caches}
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+REGISTRY = MetricsRegistry()
+_local = threading.local()
+
+
+# --- ÇALIŞMA İZİ VE SPAN'LER ---
+class RunTrace:
+    def __init__(self, page: str):
+        self.page = page
+        self.started = time.perf_counter()
+        self.timestamp = time.time()
+        self.spans: List[Tuple[str, float]] = []
+        self.caches: Dict[str, List[int]] = {}
+        self.total_s: Optional[float] = None
+
+    def rows(self) -> List[Dict[str, Any]]:
+        # Kenar çubuğu tablosu için: aşama, süre (ms) ve toplam içindeki payı
+        total = self.total_s if self.total_s is not None else time.perf_counter() - self.started
+        return [{"Aşama": name, "ms": round(s * 1000, 2), "Pay": f"{s / total:.0%}" if total > 0 else "-"} for name, s in self.spans]
+
+    def record(self) -> Dict[str, Any]:
+        return {
+            "ts": round(self.timestamp, 3), "page": self.page,
+            "total_ms": round((self.total_s or 0.0) * 1000, 3),
+            "spans": [{"stage": name, "ms": round(s * 1000, 3)} for name, s in self.spans],
+            "caches": {name: {"hits": h, "misses": m} for name, (h, m) in self.caches.items()},
+        }
+
+
+def begin_run(page: str) -> RunTrace:
+    trace = RunTrace(page)
+    _local.trace = trace
+    return trace
+
+
+def current_trace() -> Optional[RunTrace]:
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        REGISTRY.observe(stage, elapsed)
+        trace = current_trace()
+        if trace is not None:
+            trace.spans.append((stage, elapsed))
+
+
+def end_run(trace: RunTrace, jsonl_path: Optional[str] = VARSAYILAN_JSONL_YOLU,
+            prom_path: Optional[str] = VARSAYILAN_PROM_YOLU) -> Dict[str, Any]:
+    trace.total_s = time.perf_counter() - trace.started
+    REGISTRY.observe(f"{trace.page}.total", trace.total_s)
+    with REGISTRY._lock:
+        REGISTRY.runs += 1
+    if current_trace() is trace:
+        _local.trace = None
+    record = trace.record()
+    # Metrik yazımı sayfayı asla bozmamalı (salt okunur disk, izin hatası vb.)
+    try:
+        if jsonl_path:
+            append_jsonl(jsonl_path, record)
+        if prom_path:
+            write_prometheus(prom_path, REGISTRY.snapshot())
+    except OSError:
+        pass
+    return record
+
+
+# --- ÖNBELLEK SAYAÇLARI ---
+def instrument_cache(cache_decorator: Callable[[Callable], Callable], name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    # Kullanım: @instrument_cache(st.cache_data(ttl=3600)). Fonksiyon gövdesi yalnızca ıskalamada
+    # çalışır; gövde aynı iş parçacığında bir bayrak kaldırır, dış sarmalayıcı da çağrıyı buna göre sayar.
+    def decorate(fn: Callable) -> Callable:
+        key = name or fn.__name__
+
+        @functools.wraps(fn)
+        def body(*args, **kwargs):
+            _local.cache_miss = True
+            return fn(*args, **kwargs)
+
+        cached = cache_decorator(body)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            _local.cache_miss = False
+            result = cached(*args, **kwargs)
+            record_cache(key, hit=not _local.cache_miss)
+            return result
+
+        wrapper.clear = getattr(cached, "clear", None)
+        return wrapper
+    return decorate
+
+
+def record_cache(name: str, hit: bool) -> None:
+    REGISTRY.count_cache(name, hit)
+    trace = current_trace()
+    if trace is not None:
+        trace.caches.setdefault(name, [0, 0])[0 if hit else 1] += 1
+
+
+def cache_rows(snapshot: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    caches = (snapshot or REGISTRY.snapshot())["caches"]
+    return [
+        {"Önbellek": name, "İsabet": c["hits"], "Iskalama": c["misses"],
+         "İsabet Oranı": f"{c['hits'] / (c['hits'] + c['misses']):.0%}" if c["hits"] + c["misses"] else "-"}
+        for name, c in caches.items()
+    ]
+
+
+# --- DIŞA AKTARIM ---
+def append_jsonl(path: str, record: Dict[str, Any]) -> None:
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(snapshot: Dict[str, Any]) -> str:
+    lines = [
+        "# HELP tariffeq_stage_seconds Duration of instrumented page stages.",
+        "# TYPE tariffeq_stage_seconds summary",
+    ]
+    for name, stats in sorted(snapshot["stages"].items()):
+        stage = _label(name)
+        lines.append(f'tariffeq_stage_seconds{{stage="{stage}",quantile="0.5"}} {stats["p50_s"]:.6f}')
+        lines.append(f'tariffeq_stage_seconds{{stage="{stage}",quantile="0.95"}} {stats["p95_s"]:.6f}')
+        lines.append(f'tariffeq_stage_seconds_sum{{stage="{stage}"}} {stats["sum_s"]:.6f}')
+        lines.append(f'tariffeq_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+    lines += [
+        "# HELP tariffeq_cache_requests_total Calls of instrumented cached functions by result.",
+        "# TYPE tariffeq_cache_requests_total counter",
+    ]
+    for name, c in sorted(snapshot["caches"].items()):
+        lines.append(f'tariffeq_cache_requests_total{{cache="{_label(name)}",result="hit"}} {c["hits"]}')
+        lines.append(f'tariffeq_cache_requests_total{{cache="{_label(name)}",result="miss"}} {c["misses"]}')
+    lines += [
+        "# HELP tariffeq_page_runs_total Completed page reruns.",
+        "# TYPE tariffeq_page_runs_total counter",
+        f"tariffeq_page_runs_total {snapshot['runs']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str, snapshot: Dict[str, Any]) -> None:
+    # Toplayıcı yarım yazılmış dosya görmesin diye geçici dosyaya yazılıp yer değiştirilir
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text(snapshot))
+    os.replace(tmp, path)
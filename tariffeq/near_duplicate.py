@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Benzer Faaliyet Tanımları için MinHash / LSH Dizini
+# =======================================================================
+# Portföydeki tanımların çoğu birbirinin küçük varyasyonudur (boşluk, noktalama,
+# büyük/küçük harf, bir kelime eklenmesi). Tanım önce kanonik biçime getirilir,
+# ardından karakter 5'lilerinden 128 permütasyonlu bir MinHash imzası çıkarılır.
+# İmza 32 banda (her biri 4 satır) bölünür; bant özetleri SQLite'ta kova olarak
+# tutulur ve aday bulmak tek bir indeksli sorgudur. Adayların tahmini Jaccard
+# benzerliği eşiğin üzerindeyse önceki Gemini yanıtının önbellek anahtarı
+# yeniden kullanılır ve eşleşme denetim tablosuna (nd_reuse_audit) yazılır.
+#
+# Dizin AI önbelleğiyle aynı SQLite dosyasında durur. "context" alanı tanım
+# dışındaki girdilerin özetidir (örn: rapor için yapı bilgileri ve kurallar);
+# yalnızca bağlamı birebir aynı kayıtlar eşleşebilir.
+#
+# Ortam değişkenleri:
+#   TARIFFEQ_NEAR_DUP_THRESHOLD   Yeniden kullanım için asgari benzerlik (varsayılan 0.85, "1" ile kapatılır)
+
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .ai_cache import VARSAYILAN_CACHE_YOLU, connect
+
+VARSAYILAN_BENZERLIK_ESIGI = float(os.environ.get("TARIFFEQ_NEAR_DUP_THRESHOLD", "0.85"))
+SHINGLE_UZUNLUGU = 5
+PERMUTASYON_SAYISI = 128
+BANT_SAYISI = 32  # bant başına 4 satır; ~0.42 benzerlikten itibaren aday olma olasılığı hızla artar
+_ASAL = (1 << 31) - 1
+
+_rng = np.random.RandomState(20240601)  # imzalar süreçler arasında kalıcı olduğundan tohum sabittir
+_PERM_A = _rng.randint(1, _ASAL, size=PERMUTASYON_SAYISI).astype(np.uint64)
+_PERM_B = _rng.randint(0, _ASAL, size=PERMUTASYON_SAYISI).astype(np.uint64)
+
+_KATLAMA = str.maketrans({"ç": "c", "ğ": "g", "ı": "i", "ö": "o", "ş": "s", "ü": "u", "â": "a", "î": "i", "û": "u"})
+_NOKTALAMA = re.compile(r"[^\w]+|_")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nd_descriptions (
+    id INTEGER PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    context TEXT NOT NULL,
+    canonical TEXT NOT NULL,
+    cache_key TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    created REAL NOT NULL,
+    UNIQUE (namespace, context, canonical)
+);
+CREATE TABLE IF NOT EXISTS nd_buckets (bucket TEXT NOT NULL, desc_id INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS nd_buckets_bucket ON nd_buckets(bucket);
+CREATE TABLE IF NOT EXISTS nd_reuse_audit (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    namespace TEXT NOT NULL,
+    query TEXT NOT NULL,
+    matched TEXT NOT NULL,
+    similarity REAL NOT NULL,
+    threshold REAL NOT NULL,
+    cache_key TEXT NOT NULL
+);
+"""
+
+
+# --- KANONİKLEŞTİRME VE İMZA ---
+def canonicalize(text: str) -> str:
+    # Unicode NFKC, Türkçe küçük harf (I → ı, İ → i), ASCII katlama, noktalama yerine boşluk, tek boşluk
+    text = unicodedata.normalize("NFKC", text).replace("I", "ı").replace("İ", "i").lower().translate(_KATLAMA)
+    return " ".join(_NOKTALAMA.sub(" ", text).split())
+
+
+def shingles(canonical: str, k: int = SHINGLE_UZUNLUGU) -> List[str]:
+    if len(canonical) <= k:
+        return [canonical]
+    return sorted({canonical[i:i + k] for i in range(len(canonical) - k + 1)})
+
+
+def minhash(canonical: str) -> np.ndarray:
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(sh.encode("utf-8"), digest_size=4).digest(), "little") % _ASAL for sh in shingles(canonical)),
+        dtype=np.uint64,
+    )
+    # (a·h + b) mod p; a, h < 2^31 olduğundan çarpım uint64'e sığar
+    return ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _ASAL).min(axis=1).astype(np.uint32)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    # Eşit permütasyon minimumlarının oranı, Jaccard benzerliğinin yansız tahminidir
+    return float(np.mean(sig_a == sig_b))
+
+
+def band_buckets(namespace: str, context: str, signature: np.ndarray) -> List[str]:
+    rows = PERMUTASYON_SAYISI // BANT_SAYISI
+    prefix = f"{namespace}\x1f{context}\x1f".encode("utf-8")
+    return [
+        hashlib.blake2b(prefix + bytes([band]) + signature[band * rows:(band + 1) * rows].tobytes(), digest_size=12).hexdigest()
+        for band in range(BANT_SAYISI)
+    ]
+
+
+# --- KALICI DİZİN ---
+@dataclass
+class NearDuplicateMatch:
+    cache_key: str
+    canonical: str
+    similarity: float
+
+
+class NearDuplicateIndex:
+    def __init__(self, path: str = VARSAYILAN_CACHE_YOLU, threshold: float = VARSAYILAN_BENZERLIK_ESIGI):
+        self.path = path
+        self.threshold = threshold
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def add(self, namespace: str, text: str, cache_key: str, context: str = "") -> None:
+        # Gemini'den yeni alınan (ve önbelleğe yazılan) bir yanıtın tanımını dizine ekler
+        canonical = canonicalize(text)
+        signature = minhash(canonical)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT id FROM nd_descriptions WHERE namespace = ? AND context = ? AND canonical = ?",
+                               (namespace, context, canonical)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE nd_descriptions SET cache_key = ?, created = ? WHERE id = ?", (cache_key, time.time(), row[0]))
+            else:
+                desc_id = conn.execute(
+                    "INSERT INTO nd_descriptions (namespace, context, canonical, cache_key, signature, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, context, canonical, cache_key, signature.tobytes(), time.time()),
+                ).lastrowid
+                conn.executemany("INSERT INTO nd_buckets (bucket, desc_id) VALUES (?, ?)",
+                                 [(b, desc_id) for b in band_buckets(namespace, context, signature)])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def lookup(self, namespace: str, text: str, context: str = "") -> Optional[NearDuplicateMatch]:
+        # Eşiği geçen en benzer kayıt; birebir aynı kanonik metin benzerlik 1.0 ile döner
+        if self.threshold >= 1.0:
+            return None
+        canonical = canonicalize(text)
+        signature = minhash(canonical)
+        buckets = band_buckets(namespace, context, signature)
+        rows = self._conn().execute(
+            f"SELECT canonical, cache_key, signature FROM nd_descriptions WHERE id IN "
+            f"(SELECT desc_id FROM nd_buckets WHERE bucket IN ({','.join('?' * len(buckets))}))",
+            buckets,
+        ).fetchall()
+        best: Optional[NearDuplicateMatch] = None
+        for cand_canonical, cand_key, cand_sig in rows:
+            sim = 1.0 if cand_canonical == canonical else similarity(signature, np.frombuffer(cand_sig, dtype=np.uint32))
+            if sim >= self.threshold and (best is None or sim > best.similarity):
+                best = NearDuplicateMatch(cand_key, cand_canonical, sim)
+        return best
+
+    def record_reuse(self, namespace: str, text: str, match: NearDuplicateMatch) -> None:
+        self._conn().execute(
+            "INSERT INTO nd_reuse_audit (ts, namespace, query, matched, similarity, threshold, cache_key) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (time.time(), namespace, text, match.canonical, match.similarity, self.threshold, match.cache_key),
+        )
+
+    def audit_rows(self, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT ts, namespace, query, matched, similarity, threshold FROM nd_reuse_audit ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [
+            {"Zaman": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)), "Tür": ns, "Girilen Tanım": query,
+             "Eşleşen Tanım": matched, "Benzerlik": round(sim, 3), "Eşik": thr}
+            for ts, ns, query, matched, sim, thr in rows
+        ]
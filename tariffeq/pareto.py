@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Prim / Kalan Risk Pareto Sınırı
+# =======================================================================
+# Poliçe yapısı dört boyutlu bir uzayda aranır: koasürans payı, PD muafiyeti,
+# BI bekleme süresi (bi_gun_muafiyeti) ve azami tazminat süresi. Toplam prim ve
+# sigortalıda kalan risk PD ve BI bileşenlerinin toplamıdır; PD bileşeni
+# yalnızca (koasürans, muafiyet), BI bileşeni yalnızca (bekleme, azami süre)
+# seçimine bağlıdır. İki toplamın Pareto sınırı, bileşen sınırlarının
+# Minkowski toplamının içinde kalır. Bu nedenle önce her alt uzayın sınırı
+# vektörel olarak çıkarılır, ardından yalnızca sınır noktaları birleştirilip
+# tekrar budanır. Böylece tüm kartezyen çarpımı (K × M × W × A) dolaşmaya
+# gerek kalmaz.
+#
+# UYARI: Bu sınır GÖSTERGE niteliğindedir, tarife primi değildir. BI bekleme
+# kademe katsayıları (BI_BEKLEME_CARPANLARI), azami süre oranı (azami_sure/365)
+# ve tarifede yer almayan ara koasürans/muafiyet değerleri (ör. 85/15, %2,3)
+# varsayımsal olarak enterpole edilir. Tarife primleri policy_grid ızgarasından
+# okunmalıdır; bu modülün prim sütunu bu yüzden ayrı bir adla (PRIM_SUTUNU)
+# raporlanır.
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .core import MUAFIYET_FACTORS, ScenarioInputs, calculate_bi_downtime, calculate_pd_damage
+from .policy_grid import KoasInput, evaluate_policy_grid, koas_labels
+
+# BI primi tarifede 12 aylık tazminat süresi ve 30 günlük bekleme süresi için
+# tanımlıdır. Diğer yapılar için öngörülen yükleme/indirim katsayıları: tazminat süresi
+# orantılı, bekleme süresi aşağıdaki kademeler arasında enterpole edilir.
+# (30 gün, 365 gün) yapısında katsayı 1.0'dır; ızgara primiyle aynı sonucu verir.
+BI_BEKLEME_CARPANLARI = {7: 1.10, 14: 1.05, 30: 1.00, 60: 0.90, 90: 0.85}
+_BEKLEME_GUNLERI = np.array(sorted(BI_BEKLEME_CARPANLARI), dtype=float)
+_BEKLEME_CARPANLARI = np.array([BI_BEKLEME_CARPANLARI[g] for g in sorted(BI_BEKLEME_CARPANLARI)])
+
+# Tarife ızgarasındaki "Yıllık Toplam Prim" ile karıştırılmaması için ayrı ad
+PRIM_SUTUNU = "Gösterge Yıllık Prim (tarife dışı)"
+
+VARSAYILAN_BEKLEME_GUNLERI = (7, 14, 21, 30, 45, 60, 90)
+VARSAYILAN_AZAMI_SURELER = (90, 120, 180, 270, 365, 450, 540, 730)
+
+
+@dataclass
+class StructureSpace:
+    koas: Sequence[KoasInput]
+    muaf: Sequence[float]
+    bi_bekleme: Sequence[int] = VARSAYILAN_BEKLEME_GUNLERI
+    azami_sure: Sequence[int] = VARSAYILAN_AZAMI_SURELER
+
+    @property
+    def size(self) -> int:
+        return len(self.koas) * len(self.muaf) * len(self.bi_bekleme) * len(self.azami_sure)
+
+
+def default_structure_space(si_pd: int, muaf_step: float = 0.1) -> StructureSpace:
+    # get_allowed_options ile aynı sınırlar; koasürans 1 puan, muafiyet muaf_step adımlarıyla
+    if si_pd > 3_500_000_000:
+        koas = np.arange(40, 101, 1.0)
+        muaf = np.arange(min(MUAFIYET_FACTORS), 10.0 + 1e-9, muaf_step)
+    else:
+        koas = np.arange(40, 81, 1.0)
+        muaf = np.arange(2.0, 10.0 + 1e-9, muaf_step)
+    return StructureSpace(koas=koas.tolist(), muaf=np.round(muaf, 4).tolist())
+
+
+def bi_structure_factor(bekleme: np.ndarray, azami_sure: np.ndarray) -> np.ndarray:
+    return np.interp(bekleme, _BEKLEME_GUNLERI, _BEKLEME_CARPANLARI) * (azami_sure / 365.0)
+
+
+def pareto_mask(cost: np.ndarray, risk: np.ndarray) -> np.ndarray:
+    # İki amaç da küçültülür. Prime göre sıralanmış dizide, kendisinden ucuz tüm noktalardan
+    # kesin olarak daha az risk bırakan nokta baskılanmamıştır. Eşit noktalardan ilki tutulur.
+    order = np.lexsort((risk, cost))
+    r = risk[order]
+    prev_min = np.concatenate(([np.inf], np.minimum.accumulate(r)[:-1]))
+    mask = np.zeros(len(cost), dtype=bool)
+    mask[order[r < prev_min]] = True
+    return mask
+
+
+@dataclass
+class ParetoResult:
+    frontier: pd.DataFrame  # prime göre artan
+    n_candidates: int
+    # Örnekleme için alt uzay bileşenleri (PD: K×M, BI: W×A düzleştirilmiş)
+    pd_premium: np.ndarray
+    pd_retained: np.ndarray
+    bi_premium: np.ndarray
+    bi_retained: np.ndarray
+    labels: Dict[str, np.ndarray]
+
+    def sample_candidates(self, n: int = 20_000, seed: Optional[int] = 0) -> pd.DataFrame:
+        # Grafik için aday yapılardan rastgele örnek (sınır bu örnekten bağımsız hesaplanır)
+        rng = np.random.default_rng(seed)
+        n_pd, n_bi = len(self.pd_premium), len(self.bi_premium)
+        flat = rng.choice(n_pd * n_bi, size=min(n, n_pd * n_bi), replace=False)
+        i, j = np.divmod(flat, n_bi)
+        return self._frame(i, j)
+
+    def _frame(self, i: np.ndarray, j: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame({
+            "Koasürans": self.labels["koas"][i],
+            "Muafiyet (%)": self.labels["muaf"][i],
+            "BI Bekleme (gün)": self.labels["bekleme"][j],
+            "Azami Tazminat (gün)": self.labels["azami"][j],
+            PRIM_SUTUNU: self.pd_premium[i] + self.bi_premium[j],
+            "Sigortalıda Kalan Risk": self.pd_retained[i] + self.bi_retained[j],
+        })
+
+
+def pareto_frontier(s: ScenarioInputs, space: Optional[StructureSpace] = None) -> ParetoResult:
+    space = space or default_structure_space(s.si_pd)
+
+    # PD alt uzayı: prim ve kalan PD riski (koasürans, muafiyet) ızgarasında
+    grid = evaluate_policy_grid(s, space.koas, space.muaf)
+    pd_damage = calculate_pd_damage(s)
+    pd_premium = grid["prim_pd"][0].ravel()
+    pd_retained = pd_damage["damage_amount"] - grid["net_tazminat"][0].ravel()
+    prim_bi_base = float(grid["prim_bi"][0, 0, 0])
+
+    # BI alt uzayı: calculate_bi_downtime / calculate_bi_loss kurallarıyla (bekleme, azami süre) ızgarası
+    gross_days, _ = calculate_bi_downtime(pd_damage["pml_ratio"], s)
+    kesinti = max(0, gross_days - s.bitmis_urun_stogu)
+    gunluk = s.yillik_brut_kar / 365.0 if s.yillik_brut_kar > 0 else 0.0
+    bekleme = np.asarray(space.bi_bekleme, dtype=float)[:, None]
+    azami = np.asarray(space.azami_sure, dtype=float)[None, :]
+    odenen_gun = np.maximum(0.0, np.minimum(azami, kesinti) - bekleme)
+    bi_premium = (prim_bi_base * bi_structure_factor(bekleme, azami)).ravel()
+    bi_retained = (gunluk * (kesinti - odenen_gun)).ravel()
+
+    pd_idx = np.flatnonzero(pareto_mask(pd_premium, pd_retained))
+    bi_idx = np.flatnonzero(pareto_mask(bi_premium, bi_retained))
+    i = np.repeat(pd_idx, len(bi_idx))
+    j = np.tile(bi_idx, len(pd_idx))
+    keep = pareto_mask(pd_premium[i] + bi_premium[j], pd_retained[i] + bi_retained[j])
+
+    n_bi_azami = len(space.azami_sure)
+    result = ParetoResult(
+        frontier=pd.DataFrame(),
+        n_candidates=space.size,
+        pd_premium=pd_premium, pd_retained=pd_retained,
+        bi_premium=bi_premium, bi_retained=bi_retained,
+        labels={
+            "koas": np.repeat(koas_labels(space.koas), len(space.muaf)),
+            "muaf": np.tile(np.asarray(space.muaf, dtype=float), len(space.koas)),
+            "bekleme": np.repeat(np.asarray(space.bi_bekleme), n_bi_azami),
+            "azami": np.tile(np.asarray(space.azami_sure), len(space.bi_bekleme)),
+        },
+    )
+    result.frontier = result._frame(i[keep], j[keep]).sort_values(PRIM_SUTUNU).reset_index(drop=True)
+    return result
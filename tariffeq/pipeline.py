@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Bağımlılık Farkındalıklı Artımlı Analiz Hattı
+# =======================================================================
+# Ana sayfadaki analiz küçük bir bağımlılık grafı olarak modellenir. Her düğüm
+# ScenarioInputs'un yalnızca okuduğu alanları ve üst düğümlerini bildirir;
+# düğüm anahtarı bu alanların değerleri, üst düğümlerin anahtarları ve varsa
+# ek parametrelerden (örn: simülasyon sayısı) oluşan bir demettir. Çıktılar bu
+# anahtarla küçük bir LRU bellekte tutulur. Böylece bir Streamlit rerun'ında
+# yalnızca girdisi değişen düğümler ve onların alt düğümleri yeniden hesaplanır;
+# örneğin bi_gun_muafiyeti değişikliği PD, AI parametreleri, kurallar ve Pareto
+# sınırını yeniden kullanır, sadece BI ve ızgara yenilenir.
+#
+#   ai_params ← faaliyet_tanimi
+#   pd        ← yapısal alanlar + AI profil alanları
+#   bi        ← pd + BI alanları
+#   grid      ← pd + bi + tarife alanları
+#   pareto    ← pd + BI kesinti alanları (bekleme ve azami süre taranır)
+#   rules, report, sensitivity, monte_carlo (bkz. analysis_nodes)
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .core import ScenarioInputs
+from .metrics import record_cache
+
+PD_ALANLARI = (
+    "si_pd", "rg", "yapi_turu", "yonetmelik_donemi", "kat_sayisi", "zemin_sinifi", "yakin_cevre",
+    "yumusak_kat_riski", "icerik_hassasiyeti", "bina_icerik_profili",
+)
+BI_KESINTI_ALANLARI = ("rg", "isp_varligi", "kritik_makine_bagimliligi", "alternatif_tesis", "bitmis_urun_stogu")
+BI_ALANLARI = BI_KESINTI_ALANLARI + ("yillik_brut_kar", "azami_tazminat_suresi", "bi_gun_muafiyeti")
+KURAL_ALANLARI = (
+    "yapi_turu", "yonetmelik_donemi", "zemin_sinifi", "yakin_cevre", "yumusak_kat_riski",
+    "icerik_hassasiyeti", "kritik_makine_bagimliligi", "rg",
+)
+# tariffeq.ai.assessment_cache_key ile aynı alanlar
+RAPOR_ALANLARI = (
+    "faaliyet_tanimi", "yapi_turu", "yonetmelik_donemi", "kat_sayisi", "zemin_sinifi", "yakin_cevre", "yumusak_kat_riski",
+)
+VARSAYILAN_BELLEK = 8  # düğüm başına saklanan sonuç sayısı
+
+
+@dataclass(frozen=True)
+class Node:
+    name: str
+    fields: Tuple[str, ...] = ()
+    deps: Tuple[str, ...] = ()
+    # fn(s, *üst düğüm çıktıları, **parametreler); None ise değer dışarıdan put() ile yazılır
+    fn: Optional[Callable[..., Any]] = None
+
+
+class AnalysisPipeline:
+    def __init__(self, nodes: Iterable[Node], maxsize: int = VARSAYILAN_BELLEK):
+        self.nodes: Dict[str, Node] = {}
+        self.maxsize = maxsize
+        self._memo: Dict[str, "OrderedDict[Hashable, Any]"] = {}
+        self.last_computed: List[str] = []  # son rerun'da yeniden hesaplanan düğümler
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: Node) -> None:
+        missing = [d for d in node.deps if d not in self.nodes]
+        if missing:
+            raise ValueError(f"{node.name}: bilinmeyen üst düğüm(ler) {missing}")
+        self.nodes[node.name] = node
+        self._memo[node.name] = OrderedDict()
+
+    def key(self, name: str, s: ScenarioInputs, **params) -> Hashable:
+        node = self.nodes[name]
+        return (
+            tuple(getattr(s, f) for f in node.fields),
+            tuple(self.key(d, s) for d in node.deps),
+            tuple(sorted(params.items())),
+        )
+
+    def peek(self, name: str, s: ScenarioInputs, **params) -> Any:
+        memo = self._memo[name]
+        k = self.key(name, s, **params)
+        if k in memo:
+            memo.move_to_end(k)
+            return memo[k]
+        return None
+
+    def put(self, name: str, s: ScenarioInputs, value: Any, **params) -> None:
+        self._store(name, self.key(name, s, **params), value)
+
+    def get(self, name: str, s: ScenarioInputs, **params) -> Any:
+        node = self.nodes[name]
+        memo = self._memo[name]
+        k = self.key(name, s, **params)
+        if k in memo:
+            memo.move_to_end(k)
+            record_cache(f"pipeline.{name}", hit=True)
+            return memo[k]
+        if node.fn is None:
+            raise KeyError(f"{name}: dış düğümün değeri henüz yazılmadı")
+        record_cache(f"pipeline.{name}", hit=False)
+        value = node.fn(s, *(self.get(d, s) for d in node.deps), **params)
+        self.last_computed.append(name)
+        self._store(name, k, value)
+        return value
+
+    def begin_rerun(self) -> None:
+        self.last_computed = []
+
+    def clear(self) -> None:
+        for memo in self._memo.values():
+            memo.clear()
+
+    def _store(self, name: str, k: Hashable, value: Any) -> None:
+        memo = self._memo[name]
+        memo[k] = value
+        memo.move_to_end(k)
+        while len(memo) > self.maxsize:
+            memo.popitem(last=False)
+
+
+# --- ANA SAYFA ANALİZ DÜĞÜMLERİ ---
+def _pd(s: ScenarioInputs) -> Dict[str, float]:
+    from .core import calculate_pd_damage
+    return calculate_pd_damage(s)
+
+
+def _bi(s: ScenarioInputs, pd_results: Dict[str, float]) -> Tuple[int, int, float]:
+    from .core import calculate_bi_loss
+    return calculate_bi_loss(pd_results["pml_ratio"], s)
+
+
+def _rules(s: ScenarioInputs) -> List[str]:
+    from .ai import compute_triggered_rules
+    return compute_triggered_rules(s)
+
+
+def _grid(s: ScenarioInputs, pd_results, bi_results) -> Dict[str, Any]:
+    from .core import get_allowed_options
+    from .policy_grid import evaluate_policy_grid, policy_grid_frame
+    koas_opts, muaf_opts = get_allowed_options(s.si_pd)
+    grid = evaluate_policy_grid(s, koas_opts, muaf_opts)
+    return {"grid": grid, "frame": policy_grid_frame(grid)}
+
+
+def _pareto(s: ScenarioInputs, pd_results, n_sample: int = 20_000) -> Dict[str, Any]:
+    from .pareto import pareto_frontier
+    result = pareto_frontier(s)
+    return {"result": result, "candidates": result.sample_candidates(n_sample)}
+
+
+def _sensitivity(s: ScenarioInputs, pd_results, bi_results) -> Dict[str, Any]:
+    from .sensitivity import sensitivity_table, tornado_frame
+    table = sensitivity_table(s)
+    return {"table": table, "tornado": tornado_frame(table)}
+
+
+def _monte_carlo(s: ScenarioInputs, pd_results, bi_results, n_draws: int, seed: int = 42):
+    from .simulation import simulate_loss_distribution
+    return simulate_loss_distribution(s, n_draws=n_draws, seed=seed)
+
+
+def analysis_nodes(fetch_ai_params: Callable[[str], Dict[str, str]]) -> List[Node]:
+    # fetch_ai_params: faaliyet tanımı → AI parametreleri (sayfada st.cache_data ile önbellekli fonksiyon)
+    return [
+        Node("ai_params", ("faaliyet_tanimi",), fn=lambda s: fetch_ai_params(s.faaliyet_tanimi)),
+        Node("pd", PD_ALANLARI, fn=_pd),
+        Node("bi", BI_ALANLARI, ("pd",), fn=_bi),
+        Node("rules", KURAL_ALANLARI, fn=_rules),
+        Node("report", RAPOR_ALANLARI, ("rules",)),
+        Node("grid", ("si_pd", "yapi_turu", "rg", "yillik_brut_kar"), ("pd", "bi"), fn=_grid),
+        Node("pareto", ("si_pd", "yapi_turu", "rg", "yillik_brut_kar") + BI_KESINTI_ALANLARI, ("pd",), fn=_pareto),
+        Node("sensitivity", (), ("pd", "bi"), fn=_sensitivity),
+        Node("monte_carlo", (), ("pd", "bi"), fn=_monte_carlo),
+    ]
+
+
+def build_analysis_pipeline(fetch_ai_params: Callable[[str], Dict[str, str]], extra_nodes: Iterable[Node] = (),
+                            maxsize: int = VARSAYILAN_BELLEK) -> AnalysisPipeline:
+    pipeline = AnalysisPipeline(analysis_nodes(fetch_ai_params), maxsize)
+    for node in extra_nodes:
+        pipeline.add(node)
+    return pipeline
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Vektörel Poliçe Alternatifleri Motoru
+# =======================================================================
+# Koasürans × muafiyet ızgarasını tek geçişte NumPy dizileri üzerinde hesaplar.
+# Sonuç dizileri (senaryo, koasürans, muafiyet) boyutundadır; böylece yüzlerce
+# senaryo ve sürekli muafiyet adımları Python döngüsü olmadan değerlendirilir.
+
+from typing import Dict, Iterable, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .core import KOAS_FACTORS, MUAFIYET_FACTORS, ScenarioInputs
+from .encoding import encode_scenarios, evaluate_encoded, tariff_rates
+
+PD_PRIM_LIMITI = 3_500_000_000
+BI_PRIM_CARPANI = 0.75
+
+# Tarife tablolarının sıralı destek noktaları. Tabloda bulunan değerler birebir
+# aynı çarpanı verir; tablo dışı ara değerler (örn: %2.5 muafiyet) komşu
+# kademeler arasında doğrusal olarak enterpole edilir, uçlarda sabitlenir.
+_KOAS_PAYLARI = np.array(sorted(float(k.split('/')[0]) for k in KOAS_FACTORS))
+_KOAS_CARPANLARI = np.array([
+    next(v for k, v in KOAS_FACTORS.items() if float(k.split('/')[0]) == pay) for pay in _KOAS_PAYLARI
+])
+_MUAF_ORANLARI = np.array(sorted(MUAFIYET_FACTORS))
+_MUAF_CARPANLARI = np.array([MUAFIYET_FACTORS[m] for m in _MUAF_ORANLARI])
+
+KoasInput = Union[str, float]
+
+
+def koas_shares(koas: Sequence[KoasInput]) -> np.ndarray:
+    # "80/20" etiketleri veya doğrudan sigortacı payı (%) kabul edilir
+    return np.array([float(k.split('/')[0]) if isinstance(k, str) else float(k) for k in koas])
+
+
+def koas_labels(koas: Sequence[KoasInput]) -> List[str]:
+    return [k if isinstance(k, str) else f"{float(k):g}/{100 - float(k):g}" for k in koas]
+
+
+def koas_factor_array(koas: Sequence[KoasInput]) -> np.ndarray:
+    return np.interp(koas_shares(koas), _KOAS_PAYLARI, _KOAS_CARPANLARI)
+
+
+def muafiyet_factor_array(muaf: Iterable[float]) -> np.ndarray:
+    return np.interp(np.asarray(list(muaf), dtype=float), _MUAF_ORANLARI, _MUAF_CARPANLARI)
+
+
+def scenario_arrays(scenarios: Union[np.ndarray, Iterable[ScenarioInputs]]) -> Dict[str, np.ndarray]:
+    # Her senaryo için ızgaradan bağımsız büyüklükler (bedel, tarife oranı, PD/BI hasarı);
+    # ScenarioInputs listesi veya encode_scenarios/encode_columns çıktısı kabul edilir
+    enc = scenarios if isinstance(scenarios, np.ndarray) else encode_scenarios(scenarios)
+    out = evaluate_encoded(enc)
+    return {"si_pd": enc["si_pd"], "yillik_brut_kar": enc["yillik_brut_kar"], "base_rate": tariff_rates(enc), "pd_damage": out["pd_hasar"], "bi_damage": out["bi_hasar"]}
+
+
+def evaluate_policy_grid(scenarios: Union[ScenarioInputs, np.ndarray, Iterable[ScenarioInputs]], koas: Sequence[KoasInput], muaf: Iterable[float]) -> Dict[str, np.ndarray]:
+    if isinstance(scenarios, ScenarioInputs):
+        scenarios = [scenarios]
+    sc = scenario_arrays(scenarios)
+    muaf_arr = np.asarray(list(muaf), dtype=float)
+
+    si = sc["si_pd"][:, None, None]
+    base_rate = sc["base_rate"][:, None, None]
+    pd_damage = sc["pd_damage"][:, None, None]
+    bi_damage = sc["bi_damage"][:, None, None]
+    pay = (koas_shares(koas) / 100.0)[None, :, None]
+    factor = koas_factor_array(koas)[None, :, None] * muafiyet_factor_array(muaf_arr)[None, None, :]
+
+    prim_pd = np.minimum(si, PD_PRIM_LIMITI) * base_rate * factor / 1000.0
+    prim_bi = sc["yillik_brut_kar"][:, None, None] * base_rate * BI_PRIM_CARPANI / 1000.0
+    toplam_prim = prim_pd + prim_bi
+
+    muafiyet_tutari = si * (muaf_arr[None, None, :] / 100.0)
+    net_tazminat = np.maximum(0.0, pd_damage - muafiyet_tutari) * pay
+    toplam_tazminat = net_tazminat + bi_damage
+    kalan_risk = (pd_damage + bi_damage) - toplam_tazminat
+
+    shape = toplam_prim.shape
+    verimlilik = (
+        np.divide(toplam_tazminat, toplam_prim, out=np.zeros(shape), where=toplam_prim > 0)
+        - np.divide(kalan_risk, np.broadcast_to(si, shape), out=np.zeros(shape), where=np.broadcast_to(si, shape) > 0)
+    )
+    return {
+        "koas": np.array(koas_labels(koas)),
+        "muaf": muaf_arr,
+        "prim_pd": prim_pd,
+        "prim_bi": np.broadcast_to(prim_bi, shape),
+        "toplam_prim": toplam_prim,
+        "net_tazminat": np.broadcast_to(net_tazminat, shape),
+        "toplam_tazminat": np.broadcast_to(toplam_tazminat, shape),
+        "kalan_risk": np.broadcast_to(kalan_risk, shape),
+        "verimlilik": verimlilik,
+    }
+
+
+def policy_grid_frame(grid: Dict[str, np.ndarray], scenario_index: int = 0) -> pd.DataFrame:
+    # Tek bir senaryonun ızgarasını arayüzdeki tablo formatına dönüştürür
+    koas, muaf = grid["koas"], grid["muaf"]
+    df = pd.DataFrame({
+        "Poliçe Yapısı": [f"{k} / {m}%" for k in koas for m in muaf.tolist()],
+        "Yıllık Toplam Prim": grid["toplam_prim"][scenario_index].ravel(),
+        "Toplam Net Tazminat": grid["toplam_tazminat"][scenario_index].ravel(),
+        "Sigortalıda Kalan Risk": grid["kalan_risk"][scenario_index].ravel(),
+        "Verimlilik Skoru": grid["verimlilik"][scenario_index].ravel(),
+    })
+    return df.sort_values("Verimlilik Skoru", ascending=False).reset_index(drop=True)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Deprem (PD & BI) ve İnşaat/Montaj (CAR & EAR) Tarife Motorları
+# =======================================================================
+# pages/Hesaplama.py içindeki prim hesaplama fonksiyonları Streamlit'ten
+# bağımsız olarak bu modülde tutulur; tarife tabloları tariffeq.tariff'teki
+# yürürlük tarihli sürümlerden gelir (buradaki sözlükler yalnızca görünümdür). Limit aşım uyarıları
+# doğrudan ekrana yazılmak yerine `warn` geri çağrısına mesaj anahtarı olarak
+# iletilir; sayfa bunları st.warning ile, fiyatlama servisi ise yanıt içinde
+# gösterir. Böylece arayüz ve servis aynı rakamları üretir.
+
+from typing import Callable, Optional
+
+from .tariff import TarifeSurumu, current_tariff, tariff_for
+
+WarnFn = Optional[Callable[[str], None]]
+
+# ------------------------------------------------------------
+# CONSTANT TABLES
+# ------------------------------------------------------------
+# Views of the tariff in force when the process starts (tariffeq.tariff is the single source);
+# pricing functions take an explicit `tariff` to price against another effective-dated version.
+VARSAYILAN_TARIFE = current_tariff()
+tarife_oranlari = VARSAYILAN_TARIFE.tarife_oranlari
+koasurans_indirimi = VARSAYILAN_TARIFE.koasurans_indirimi
+koasurans_indirimi_car = VARSAYILAN_TARIFE.koasurans_indirimi_car
+muafiyet_indirimi = VARSAYILAN_TARIFE.muafiyet_indirimi
+muafiyet_indirimi_car = VARSAYILAN_TARIFE.muafiyet_indirimi_car
+sure_carpani_tablosu = VARSAYILAN_TARIFE.sure_carpanlari
+
+LIMIT_FIRE = VARSAYILAN_TARIFE.limit_fire
+LIMIT_EC_MK = VARSAYILAN_TARIFE.limit_ec_mk
+LIMIT_CAR = VARSAYILAN_TARIFE.limit_car
+
+# Tarife tablolarının ve limitlerin özeti; tablolardan biri değişince teklif defterindeki eski kayıtlar eşleşmez
+TARIFE_SURUMU = VARSAYILAN_TARIFE.ozet
+
+LOCATION_FIELDS = ("building", "fixture", "decoration", "commodity", "safe", "bi", "ec_fixed", "ec_mobile", "mk_fixed", "mk_mobile")
+
+
+def _warn(warn: WarnFn, key: str) -> None:
+    if warn is not None:
+        warn(key)
+
+# ------------------------------------------------------------
+# CALCULATION LOGIC
+# ------------------------------------------------------------
+def calculate_duration_multiplier(months: int, tariff: Optional[TarifeSurumu] = None) -> float:
+    # Table value up to the last tabulated month, then +uzun_sure_adimi per extra month
+    return (tariff or VARSAYILAN_TARIFE).duration_multiplier(months)
+
+def calculate_months_difference(start_date, end_date):
+    months = (end_date.year - start_date.year) * 12 + (end_date.month - start_date.month)
+    total_days = (end_date - start_date).days
+    year_diff = end_date.year - start_date.year
+    month_diff = end_date.month - start_date.month
+    estimated_days = (year_diff * 365) + (month_diff * 30)
+    remaining_days = total_days - estimated_days
+    if remaining_days >= 15:
+        months += 1
+    return months
+
+def determine_group_params(locations_data):
+    # Single pass per location: worst building type ("Diğer" wins), lowest risk group and summed insured values.
+    # tariffeq.locations.aggregate_location_groups is the columnar equivalent for large schedules.
+    result = {}
+    for loc in locations_data:
+        params = result.get(loc["group"])
+        if params is None:
+            params = result[loc["group"]] = {"building_type": loc["building_type"], "risk_group": loc["risk_group"], **{f: 0 for f in LOCATION_FIELDS}}
+        elif loc["building_type"] == "Diğer":
+            params["building_type"] = "Diğer"
+        if loc["risk_group"] < params["risk_group"]:
+            params["risk_group"] = loc["risk_group"]
+        for field in LOCATION_FIELDS:
+            params[field] += loc[field]
+    for params in result.values():
+        if params["building_type"] != "Diğer":
+            params["building_type"] = "Betonarme"
+    return result
+
+def calculate_fire_premium(building_type, risk_group, currency, building, fixture, decoration, commodity, safe, bi, ec_fixed, ec_mobile, mk_fixed, mk_mobile, koas, deduct, fx_rate, inflation_rate, warn: WarnFn = None, tariff: Optional[TarifeSurumu] = None):
+    # Priced against the tariff in force today unless a version is given
+    tariff = tariff or current_tariff()
+
+    # Calculate individual sums insured in TRY
+    building_sum_insured = building * fx_rate
+    fixture_sum_insured = fixture * fx_rate
+    decoration_sum_insured = decoration * fx_rate
+    commodity_sum_insured = commodity * fx_rate
+    safe_sum_insured = safe * fx_rate
+    bi_sum_insured = bi * fx_rate
+    ec_fixed_sum_insured = ec_fixed * fx_rate
+    ec_mobile_sum_insured = ec_mobile * fx_rate
+    mk_fixed_sum_insured = mk_fixed * fx_rate
+    mk_mobile_sum_insured = mk_mobile * fx_rate
+
+    # Calculate total sum insured for PD (including EC and MK for limit check)
+    pd_sum_insured = (building_sum_insured + fixture_sum_insured + decoration_sum_insured + commodity_sum_insured + safe_sum_insured + ec_fixed_sum_insured + ec_mobile_sum_insured + mk_fixed_sum_insured + mk_mobile_sum_insured)
+
+    # Base rate from tariff table
+    rate = tariff.tarife_oranlari[building_type][risk_group - 1]
+
+    # Adjust rate for inflation (increase by half of the inflation rate)
+    inflation_multiplier = 1 + (inflation_rate / 100) / 2
+    rate *= inflation_multiplier
+
+    # Check total sum insured against the 3.5 billion TRY limit
+    if pd_sum_insured > tariff.limit_fire:
+        _warn(warn, "limit_warning_fire_pd")
+
+    # PD Premium (excluding EC and MK for actual premium calculation, but included in limit check)
+    pd_sum_for_premium = (building_sum_insured + fixture_sum_insured + decoration_sum_insured + commodity_sum_insured + safe_sum_insured)
+    koas_discount = tariff.koasurans_indirimi[koas]
+    deduct_discount = tariff.muafiyet_indirimi[deduct]
+    adjusted_rate_pd = rate * (1 - koas_discount) * (1 - deduct_discount)
+    if pd_sum_insured > tariff.limit_fire:
+        adjusted_rate_pd = round(adjusted_rate_pd * (tariff.limit_fire / pd_sum_insured), 6)
+    pd_premium = (pd_sum_for_premium * adjusted_rate_pd) / 1000
+
+    # BI Premium (no koas/deduct discount as per tariff)
+    adjusted_rate_bi = rate
+    if bi_sum_insured > tariff.limit_fire:
+        _warn(warn, "limit_warning_fire_bi")
+        adjusted_rate_bi = round(adjusted_rate_bi * (tariff.limit_fire / bi_sum_insured), 6)
+    bi_premium = (bi_sum_insured * adjusted_rate_bi) / 1000
+
+    # EC Premium
+    ec_premium = 0.0
+    ec_fixed_premium = 0.0
+    ec_mobile_premium = 0.0
+    if ec_fixed > 0:
+        ec_fixed_rate = rate * (1 - koas_discount) * (1 - deduct_discount)
+        if ec_fixed_sum_insured > tariff.limit_ec_mk:
+            _warn(warn, "limit_warning_ec")
+            ec_fixed_rate = round(ec_fixed_rate * (tariff.limit_ec_mk / ec_fixed_sum_insured), 6)
+        ec_fixed_premium = (ec_fixed_sum_insured * ec_fixed_rate) / 1000
+    if ec_mobile > 0:
+        ec_mobile_rate = 2.00 * inflation_multiplier  # Apply inflation to mobile rate as well
+        if ec_mobile_sum_insured > tariff.limit_ec_mk:
+            _warn(warn, "limit_warning_ec")
+            ec_mobile_rate = round(ec_mobile_rate * (tariff.limit_ec_mk / ec_mobile_sum_insured), 6)
+        ec_mobile_premium = (ec_mobile_sum_insured * ec_mobile_rate) / 1000
+    ec_premium = ec_fixed_premium + ec_mobile_premium
+
+    # MK Premium
+    mk_premium = 0.0
+    mk_fixed_premium = 0.0
+    mk_mobile_premium = 0.0
+    if mk_fixed > 0:
+        mk_fixed_rate = rate * (1 - koas_discount) * (1 - deduct_discount)
+        if mk_fixed_sum_insured > tariff.limit_ec_mk:
+            _warn(warn, "limit_warning_mk")
+            mk_fixed_rate = round(mk_fixed_rate * (tariff.limit_ec_mk / mk_fixed_sum_insured), 6)
+        mk_fixed_premium = (mk_fixed_sum_insured * mk_fixed_rate) / 1000
+    if mk_mobile > 0:
+        mk_mobile_rate = 2.00 * inflation_multiplier  # Apply inflation to mobile rate as well
+        if mk_mobile_sum_insured > tariff.limit_ec_mk:
+            _warn(warn, "limit_warning_mk")
+            mk_mobile_rate = round(mk_mobile_rate * (tariff.limit_ec_mk / mk_mobile_sum_insured), 6)
+        mk_mobile_premium = (mk_mobile_sum_insured * mk_mobile_rate) / 1000
+    mk_premium = mk_fixed_premium + mk_mobile_premium
+
+    total_premium = pd_premium + bi_premium + ec_premium + mk_premium
+
+    return pd_premium, bi_premium, ec_premium, mk_premium, total_premium, rate
+
+def calculate_car_ear_premium(risk_group_type, risk_class, start_date, end_date, project, cpm, cpe, currency, koas, deduct, fx_rate, inflation_rate, warn: WarnFn = None, tariff: Optional[TarifeSurumu] = None):
+    # Priced against the tariff in force on the start date unless a version is given
+    tariff = tariff or tariff_for(start_date)
+    duration_months = calculate_months_difference(start_date, end_date)
+
+    base_rate = tariff.tarife_oranlari[risk_group_type][risk_class - 1]
+
+    # Adjust base rate for inflation (increase by half of the inflation rate)
+    inflation_multiplier = 1 + (inflation_rate / 100) / 2
+    base_rate *= inflation_multiplier
+
+    duration_multiplier = calculate_duration_multiplier(duration_months, tariff)
+    koas_discount = tariff.koasurans_indirimi_car[koas]
+    deduct_discount = tariff.muafiyet_indirimi_car[deduct]
+
+    project_sum_insured = project * fx_rate
+    car_rate = base_rate * duration_multiplier * (1 - koas_discount) * (1 - deduct_discount)
+    if project_sum_insured > tariff.limit_car:
+        _warn(warn, "limit_warning_car")
+        car_rate *= (tariff.limit_car / project_sum_insured)
+    car_premium = (project_sum_insured * car_rate) / 1000
+
+    cpm_sum_insured = cpm * fx_rate
+    cpm_rate = 1.25 * inflation_multiplier  # Apply inflation to CPM rate
+    if cpm_sum_insured > tariff.limit_car:
+        _warn(warn, "limit_warning_car")
+        cpm_rate *= (tariff.limit_car / cpm_sum_insured)
+    cpm_premium = (cpm_sum_insured * cpm_rate / 1000) * duration_multiplier
+
+    cpe_sum_insured = cpe * fx_rate
+    cpe_rate = base_rate * duration_multiplier
+    if cpe_sum_insured > tariff.limit_car:
+        _warn(warn, "limit_warning_car")
+        cpe_rate *= (tariff.limit_car / cpe_sum_insured)
+    cpe_premium = (cpe_sum_insured * cpe_rate) / 1000
+
+    total_premium = car_premium + cpm_premium + cpe_premium
+
+    return car_premium, cpm_premium, cpe_premium, total_premium, car_rate
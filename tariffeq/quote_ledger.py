@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Teklif Defteri (Kanonik Girdi Özeti ile Tekilleştirilmiş)
+# =======================================================================
+# Hesaplama sayfasında verilen her teklif yalnızca eklenen (append-only) bir
+# SQLite defterine (WAL modu) yazılır: girdiler, kullanılan kur ve kaynağı,
+# fiyatlandığı tarife sürümünün özeti (TarifeSurumu.ozet; varsayılan
+# premium.TARIFE_SURUMU) ve tüm prim bileşenleri. Anahtar;
+# teklif türü, tarife sürümü ve girdilerin kanonik JSON özetidir. Aynı girdiyle
+# gelen tekrar teklifler yeniden hesaplanmaz, tekil indeks üzerinden tek bir
+# sorguyla defterden döner (oturumlar ve kullanıcılar arasında); her teklif
+# verilişi ayrıca quote_events tablosuna eklenir.
+#
+# Geçmiş sorguları için grup/proje satırları quote_lines tablosunda
+# (risk grubu, zaman) birincil anahtarlı WITHOUT ROWID düzende tutulur;
+# "bu ay risk grubu 1 olan tüm teklifler" gibi sorgular defter milyonlarca
+# satıra büyüse de tek bir aralık taramasıdır.
+#
+# Kullanım:
+#   python -m tariffeq.quote_ledger history --kind fire --risk-group 1 --since 2024-03-01
+#   python -m tariffeq.quote_ledger info
+#
+# Ortam değişkenleri:
+#   TARIFFEQ_QUOTE_DB   Defter dosyası (varsayılan .cache/quotes.sqlite3)
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .ai_cache import connect
+from .premium import TARIFE_SURUMU
+
+VARSAYILAN_DEFTER_YOLU = os.environ.get(
+    "TARIFFEQ_QUOTE_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "quotes.sqlite3"),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    input_hash TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    created REAL NOT NULL,
+    tariff_version TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    fx_rate REAL NOT NULL,
+    fx_source TEXT NOT NULL,
+    total_premium REAL NOT NULL,
+    inputs TEXT NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quotes_kind_created ON quotes(kind, created);
+CREATE TABLE IF NOT EXISTS quote_lines (
+    risk_group INTEGER NOT NULL,
+    created REAL NOT NULL,
+    quote_id INTEGER NOT NULL,
+    line TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    risk_type TEXT NOT NULL,
+    total_premium REAL NOT NULL,
+    PRIMARY KEY (risk_group, created, quote_id, line)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS quote_events (
+    id INTEGER PRIMARY KEY,
+    quote_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    reused INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quote_events_ts ON quote_events(ts);
+"""
+
+
+def _json_default(value: Any) -> Any:
+    # NumPy skalerleri ve dizileri (numpy içe aktarılmadan, tolist ile), tarih nesneleri
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} JSON'a çevrilemez")
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+def quote_hash(kind: str, inputs: Dict[str, Any], tariff_version: str = TARIFE_SURUMU) -> str:
+    # Kur kaynağı özete girmez: aynı kurla verilen teklif, kur elle de girilmiş olsa aynı primi verir
+    return hashlib.sha256(_dumps({"kind": kind, "tariff_version": tariff_version, "inputs": inputs}).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class StoredQuote:
+    quote_id: int
+    created: float
+    fx_source: str
+    result: Dict[str, Any]
+
+
+class QuoteLedger:
+    def __init__(self, path: str = VARSAYILAN_DEFTER_YOLU):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def lookup(self, input_hash: str) -> Optional[StoredQuote]:
+        # Tekrar teklif: tekil indeksten tek satır; yeniden kullanım olay olarak eklenir
+        conn = self._conn()
+        row = conn.execute("SELECT id, created, fx_source, result FROM quotes WHERE input_hash = ?", (input_hash,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("INSERT INTO quote_events (quote_id, ts, reused) VALUES (?, ?, 1)", (row[0], time.time()))
+        return StoredQuote(row[0], row[1], row[2], json.loads(row[3]))
+
+    def record(self, input_hash: str, kind: str, inputs: Dict[str, Any], result: Dict[str, Any], *,
+               tariff_version: str = TARIFE_SURUMU, currency: str, fx_rate: float, fx_source: str, total_premium: float,
+               lines: Iterable[Tuple[str, str, int, float]]) -> int:
+        # lines: (grup/proje, risk tipi, risk grubu/sınıfı, satır primi)
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT id FROM quotes WHERE input_hash = ?", (input_hash,)).fetchone()
+            if row is not None:
+                # Başka bir oturum aynı teklifi az önce yazmış
+                quote_id, reused = row[0], 1
+            else:
+                quote_id, reused = conn.execute(
+                    "INSERT INTO quotes (input_hash, kind, created, tariff_version, currency, fx_rate, fx_source, total_premium, inputs, result) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (input_hash, kind, now, tariff_version, currency, float(fx_rate), fx_source, float(total_premium),
+                     _dumps(inputs), _dumps(result)),
+                ).lastrowid, 0
+                conn.executemany(
+                    "INSERT OR IGNORE INTO quote_lines (risk_group, created, quote_id, line, kind, risk_type, total_premium) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(int(rg), now, quote_id, str(line), kind, str(risk_type), float(premium)) for line, risk_type, rg, premium in lines],
+                )
+            conn.execute("INSERT INTO quote_events (quote_id, ts, reused) VALUES (?, ?, ?)", (quote_id, now, reused))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return quote_id
+
+    def history(self, risk_group: Optional[int] = None, since: Optional[float] = None, until: Optional[float] = None,
+                kind: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        # Risk grubu verilirse quote_lines (risk_group, created) anahtarında aralık taraması, yoksa quotes(kind, created)
+        since = 0.0 if since is None else since
+        until = float("inf") if until is None else until
+        conn = self._conn()
+        if risk_group is not None:
+            sql = ("SELECT l.created, l.quote_id, l.kind, l.line, l.risk_type, l.risk_group, l.total_premium, q.currency, q.fx_rate "
+                   "FROM quote_lines l JOIN quotes q ON q.id = l.quote_id "
+                   "WHERE l.risk_group = ? AND l.created >= ? AND l.created < ?" + (" AND l.kind = ?" if kind else "") +
+                   " ORDER BY l.created DESC LIMIT ?")
+            params = [int(risk_group), since, until] + ([kind] if kind else []) + [limit]
+            columns = ("created", "quote_id", "kind", "line", "risk_type", "risk_group", "total_premium", "currency", "fx_rate")
+        else:
+            where = "kind = ? AND " if kind else ""
+            sql = (f"SELECT created, id, kind, currency, fx_rate, fx_source, total_premium FROM quotes "
+                   f"WHERE {where}created >= ? AND created < ? ORDER BY created DESC LIMIT ?")
+            params = ([kind] if kind else []) + [since, until, limit]
+            columns = ("created", "quote_id", "kind", "currency", "fx_rate", "fx_source", "total_premium")
+        return [dict(zip(columns, row)) for row in conn.execute(sql, params)]
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._conn()
+        quotes, = conn.execute("SELECT COUNT(*) FROM quotes").fetchone()
+        events, reused = conn.execute("SELECT COUNT(*), COALESCE(SUM(reused), 0) FROM quote_events").fetchone()
+        return {"quotes": quotes, "events": events, "reused": reused}
+
+
+# --- KOMUT SATIRI ---
+def _epoch(text: str) -> float:
+    return datetime.strptime(text, "%Y-%m-%d").timestamp()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="TariffEQ teklif defteri")
+    parser.add_argument("--db", default=VARSAYILAN_DEFTER_YOLU, help="Defter dosyası")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_history = sub.add_parser("history", help="Verilen aralıktaki teklifler (en yeni önce)")
+    p_history.add_argument("--kind", choices=("fire", "car"))
+    p_history.add_argument("--risk-group", type=int)
+    p_history.add_argument("--since", type=_epoch, help="YYYY-MM-DD (dahil)")
+    p_history.add_argument("--until", type=_epoch, help="YYYY-MM-DD (hariç)")
+    p_history.add_argument("--limit", type=int, default=50)
+    sub.add_parser("info", help="Kayıt ve yeniden kullanım sayıları")
+    args = parser.parse_args(argv)
+
+    ledger = QuoteLedger(args.db)
+    if args.command == "history":
+        for row in ledger.history(args.risk_group, args.since, args.until, args.kind, args.limit):
+            stamp = datetime.fromtimestamp(row.pop("created")).strftime("%Y-%m-%d %H:%M:%S")
+            print(stamp, " ".join(f"{k}={v}" for k, v in row.items()))
+    else:
+        print(" ".join(f"{k}={v}" for k, v in ledger.stats().items()), f"tariff_version={TARIFE_SURUMU}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Çevrimdışı Risk Parametresi Sınıflandırıcısı
+# =======================================================================
+# get_ai_driven_parameters promptundaki açık anahtar kelime kurallarını
+# (AVM/mücevher → içerik hassasiyeti Yüksek, solvent/un/şeker → FFE Yüksek vb.)
+# tek bir derlenmiş düzenli ifadeye dönüştürür ve faaliyet tanımını tek geçişte
+# puanlar. Her parametre için en yüksek puanlı seviye seçilir; güven skoru
+# kazanan seviyenin toplam kanıta oranıdır (parametreler arasında en düşüğü). Güven eşiğin altındaysa çağıran
+# taraf Gemini'ye başvurur.
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+VARSAYILAN_GUVEN_ESIGI = 0.5
+
+_VARSAYILAN_SEVIYE = {
+    "icerik_hassasiyeti": "Orta",
+    "ffe_riski": "Orta",
+    "kritik_makine_bagimliligi": "Orta",
+    "bina_icerik_profili": "Diğer / Varsayılan",
+}
+# Hiç anahtar kelime bulunmayan parametre varsayılan seviyeyi alır ama kanıtsız sayılır: güveni
+# her eşiğin altındadır, böylece Gemini yalnızca her parametre kanıta dayandığında atlanır.
+_KANITSIZ_GUVEN = 0.0
+
+# (parametre, seviye, ağırlık, kalıplar). Kalıplar ASCII'ye katlanmış küçük harfli
+# metinde kelime başından eşleşir; Türkçe ekler (mücevherat, depoları) bu sayede yakalanır.
+_KURALLAR: List[Tuple[str, str, float, List[str]]] = [
+    ("icerik_hassasiyeti", "Yüksek", 3.0, [r"ilac", r"kimya", r"yari ?iletken", r"laboratuvar", r"mucevher", r"kuyum", r"elektronik",
+                                          r"porselen", r"cam (?:esya|urun)", r"seramik", r"yuksek raf", r"raf sistem"]),
+    ("icerik_hassasiyeti", "Orta", 1.0, [r"imalat", r"tekstil", r"metal isleme", r"mobilya", r"giyim", r"konfeksiyon"]),
+    ("icerik_hassasiyeti", "Düşük", 3.0, [r"insaat malzeme", r"hurda", r"mermer", r"tugla", r"cimento", r"agrega", r"kum ocag"]),
+
+    ("ffe_riski", "Yüksek", 2.0, [r"solvent", r"yanici", r"kimyasal", r"gaz hat", r"dogalgaz", r"lpg", r"plastik", r"toz patlama",
+                                 r"un(?:lu)?\b", r"seker", r"restoran", r"mutfak", r"boya", r"akaryakit", r"tiner"]),
+    ("ffe_riski", "Orta", 1.0, [r"ahsap", r"kagit", r"karton", r"elektrik", r"makine park"]),
+    ("ffe_riski", "Düşük", 2.0, [r"metal depo", r"tas\b", r"mermer", r"hurda metal"]),
+
+    ("kritik_makine_bagimliligi", "Yüksek", 2.0, [r"ozel siparis", r"uretim hatt", r"otomotiv", r"pres\b", r"presler", r"firin", r"reaktor",
+                                                 r"sinema", r"projeksiyon", r"yuruyen merdiven", r"iklimlendirme", r"robot"]),
+    ("kritik_makine_bagimliligi", "Orta", 1.0, [r"cnc", r"tekstil makine", r"dokuma", r"paketleme"]),
+    ("kritik_makine_bagimliligi", "Düşük", 2.0, [r"depolama", r"montaj", r"jenerik", r"ofis"]),
+
+    ("bina_icerik_profili", "AVM / Otel / Ofis", 3.0, [r"avm", r"alisveris merkez", r"otel", r"ofis", r"plaza"]),
+    ("bina_icerik_profili", "AVM / Otel / Ofis", 1.0, [r"magaza", r"sinema", r"restoran"]),
+    ("bina_icerik_profili", "Üretim Tesisi", 3.0, [r"uretim", r"imalat", r"fabrika"]),
+    ("bina_icerik_profili", "Üretim Tesisi", 1.0, [r"cnc", r"pres\b", r"presler", r"kaynak hatt"]),
+    ("bina_icerik_profili", "Lojistik Depo", 3.0, [r"lojistik", r"antrepo", r"dagitim merkez", r"depo\b", r"depos", r"depolar"]),
+]
+
+_KATLAMA = str.maketrans({"ç": "c", "ğ": "g", "ı": "i", "ö": "o", "ş": "s", "ü": "u", "â": "a", "î": "i", "û": "u"})
+
+
+def normalize_text(text: str) -> str:
+    # Türkçe büyük/küçük harf dönüşümü (İ→i, I→ı) sonrası ASCII katlama
+    return text.replace("İ", "i").replace("I", "ı").lower().translate(_KATLAMA)
+
+
+# Tüm kalıplar tek bir desende birleştirilir, metin tek geçişte taranır. Alternatifler uzundan
+# kısaya sıralanır: düzenli ifade ilk eşleşen dalı aldığından "kimya" önde olsaydı "kimyasal"
+# hiç eşleşmezdi. Eşleşen metin, başında eşleşen her kurala kanıttır ("kimyasal" → içerik
+# "kimya" ve FFE "kimyasal"; "restoran" → FFE ve sektör profili); eşleşme → kural eşlemesi
+# ilk görüldüğünde çözülüp önbelleğe alınır.
+_KALIPLAR = sorted({p for _, _, _, patterns in _KURALLAR for p in patterns}, key=lambda p: (-len(p), p))
+_DESEN = re.compile(r"\b(?=[a-z])(?:" + "|".join(_KALIPLAR) + ")")
+_KURAL_DESENLERI = [(param, level, weight, re.compile("|".join(patterns))) for param, level, weight, patterns in _KURALLAR]
+
+
+@lru_cache(maxsize=4096)
+def _rules_for(token: str) -> Tuple[Tuple[str, str, float], ...]:
+    return tuple((param, level, weight) for param, level, weight, pattern in _KURAL_DESENLERI if pattern.match(token))
+
+
+def _sample(pattern: str) -> str:
+    # Kalıbın eşleşmesi gereken örnek metin: isteğe bağlı boşluk/gruplar ilk seçenekleriyle açılır
+    sample = re.sub(r"\(\?:([^|)]*)[^)]*\)\??", r"\1", pattern)
+    return sample.replace(r"\b", "").replace(" ?", " ")
+
+
+def _check_rules() -> None:
+    # Her kural kalıbı birleşik desende kendi örneğiyle eşleşebilmeli (başka bir kalıp tarafından gölgelenmemeli)
+    unreachable = []
+    for param, level, weight, patterns in _KURALLAR:
+        for pattern in patterns:
+            found = _DESEN.match(_sample(pattern))
+            if found is None or (param, level, weight) not in _rules_for(found.group(0)):
+                unreachable.append(f"{param}/{level}: {pattern}")
+    if unreachable:
+        raise ValueError("Eşleşemeyen sınıflandırıcı kalıpları: " + ", ".join(unreachable))
+
+
+_check_rules()
+
+
+@dataclass
+class ClassificationResult:
+    params: Dict[str, str]
+    confidence: float
+    param_confidence: Dict[str, float] = field(default_factory=dict)
+    matches: List[Tuple[str, str, str]] = field(default_factory=list)  # (parametre, seviye, eşleşen metin)
+
+
+def classify_description(faaliyet_tanimi: str) -> ClassificationResult:
+    scores: Dict[str, Dict[str, float]] = {param: {} for param in _VARSAYILAN_SEVIYE}
+    matches = []
+    for token in _DESEN.findall(normalize_text(faaliyet_tanimi)):
+        for param, level, weight in _rules_for(token):
+            scores[param][level] = scores[param].get(level, 0.0) + weight
+            matches.append((param, level, token))
+
+    params, param_confidence = {}, {}
+    for param, level_scores in scores.items():
+        if not level_scores:
+            params[param], param_confidence[param] = _VARSAYILAN_SEVIYE[param], _KANITSIZ_GUVEN
+            continue
+        ranked = sorted(level_scores.items(), key=lambda kv: kv[1], reverse=True)
+        best_level, best = ranked[0]
+        rest = sum(v for _, v in ranked[1:])
+        params[param] = best_level
+        param_confidence[param] = best / (best + rest + 1.0)
+    return ClassificationResult(params=params, confidence=min(param_confidence.values()), param_confidence=param_confidence, matches=matches)
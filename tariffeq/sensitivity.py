@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – PD / BI Faktör Duyarlılığı (Tornado ve İki Yönlü Izgara)
+# =======================================================================
+# Senaryodaki her yapısal ve operasyonel faktör, arayüzdeki tüm seçeneklerine
+# tek tek (veya iki faktör birlikte) değiştirilir. Varyantlar kodlanmış diziye
+# çevrilir; PD hasarı, BI kesintisi ve BI kaybı tüm varyantlar için tek bir
+# NumPy geçişinde (encoding.evaluate_encoded) hesaplanır. Böylece tam bir
+# duyarlılık taraması yaklaşık tek bir senaryo değerlendirmesi kadar sürer ve
+# AI çağrısı gerektirmez.
+
+from dataclasses import replace
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .core import ScenarioInputs
+from .encoding import encode_scenarios, evaluate_encoded
+
+# Arayüzdeki seçenek etiketleri (Home.py) – faktör tablolarıyla aynı eşleme kurallarından geçer
+FAKTOR_SECENEKLERI: Dict[str, List[str]] = {
+    "yonetmelik_donemi": ["1998 öncesi (Eski Yönetmelik)", "1998-2018 arası (Varsayılan)", "2018 sonrası (Yeni Yönetmelik)"],
+    "kat_sayisi": ["1-3 kat", "4-7 kat", "8+ kat"],
+    "zemin_sinifi": ["ZE", "ZD", "ZC (Varsayılan)", "ZA/ZB (Kaya/Sıkı Zemin)"],
+    "yumusak_kat_riski": ["Hayır", "Evet"],
+    "yakin_cevre": ["Nehir Yatağı / Göl Kenarı / Kıyı Şeridi", "Ana Karada / Düz Ova", "Dolgu Zemin Üzerinde"],
+    "isp_varligi": ["Yok (Varsayılan)", "Var (Test Edilmemiş)", "Var (Test Edilmiş)"],
+    "kritik_makine_bagimliligi": ["Düşük", "Orta", "Yüksek"],
+    "alternatif_tesis": ["Yok", "Var (kısmi kapasite)", "Var (tam kapasite)"],
+}
+FAKTOR_ETIKETLERI = {
+    "yonetmelik_donemi": "Yönetmelik Dönemi",
+    "kat_sayisi": "Kat Sayısı",
+    "zemin_sinifi": "Zemin Sınıfı",
+    "yumusak_kat_riski": "Yumuşak Kat",
+    "yakin_cevre": "Yakın Çevre (Sıvılaşma)",
+    "isp_varligi": "İş Sürekliliği Planı",
+    "kritik_makine_bagimliligi": "Makine Bağımlılığı",
+    "alternatif_tesis": "Alternatif Tesis",
+}
+
+
+def evaluate_variants(variants: Sequence[ScenarioInputs]) -> Dict[str, np.ndarray]:
+    out = evaluate_encoded(encode_scenarios(variants))
+    return {key: out[key] for key in ("pd_hasar", "pml_orani", "brut_kesinti_gun", "net_kesinti_gun", "bi_hasar")}
+
+
+def sensitivity_table(s: ScenarioInputs, factors: Sequence[str] = tuple(FAKTOR_SECENEKLERI)) -> pd.DataFrame:
+    # Tek yönlü tarama: her faktörün her seviyesi, diğerleri sabitken (ilk satır mevcut senaryo)
+    rows = [("Mevcut Senaryo", "-")]
+    variants = [s]
+    for name in factors:
+        for level in FAKTOR_SECENEKLERI[name]:
+            rows.append((FAKTOR_ETIKETLERI[name], level))
+            variants.append(replace(s, **{name: level}))
+    out = evaluate_variants(variants)
+    current = [True] + [getattr(s, name) == level for name in factors for level in FAKTOR_SECENEKLERI[name]]
+    faktor, seviye = zip(*rows)
+    return pd.DataFrame({
+        "Faktör": faktor, "Seviye": seviye, **out, "Mevcut": current,
+        "Δ PD Hasar": out["pd_hasar"] - out["pd_hasar"][0],
+        "Δ BI Hasar": out["bi_hasar"] - out["bi_hasar"][0],
+    })
+
+
+def tornado_frame(table: pd.DataFrame) -> pd.DataFrame:
+    # Faktör başına en olumlu / en olumsuz seviyenin toplam (PD + BI) etkisi, etki aralığına göre sıralı
+    t = table.iloc[1:]
+    faktor, seviye = t["Faktör"].to_numpy(), t["Seviye"].to_numpy()
+    d_pd, d_bi = t["Δ PD Hasar"].to_numpy(), t["Δ BI Hasar"].to_numpy()
+    total = d_pd + d_bi
+    rows = []
+    for name in dict.fromkeys(faktor):
+        idx = np.flatnonzero(faktor == name)
+        lo, hi = idx[total[idx].argmin()], idx[total[idx].argmax()]
+        rows.append({
+            "Faktör": name,
+            "En Düşük Seviye": seviye[lo], "Δ PD (Düşük)": d_pd[lo], "Δ BI (Düşük)": d_bi[lo], "Δ Toplam (Düşük)": total[lo],
+            "En Yüksek Seviye": seviye[hi], "Δ PD (Yüksek)": d_pd[hi], "Δ BI (Yüksek)": d_bi[hi], "Δ Toplam (Yüksek)": total[hi],
+            "Etki Aralığı": total[hi] - total[lo],
+        })
+    return pd.DataFrame(rows).sort_values("Etki Aralığı", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def two_way_grid(s: ScenarioInputs, row_factor: str, col_factor: str, metric: str = "pd_hasar") -> pd.DataFrame:
+    # İki faktörün tüm seviye kombinasyonları; metric: pd_hasar, pml_orani, net_kesinti_gun veya bi_hasar
+    row_levels, col_levels = FAKTOR_SECENEKLERI[row_factor], FAKTOR_SECENEKLERI[col_factor]
+    variants = [replace(s, **{row_factor: r, col_factor: c}) for r in row_levels for c in col_levels]
+    values = evaluate_variants(variants)[metric].reshape(len(row_levels), len(col_levels))
+    return pd.DataFrame(values, index=pd.Index(row_levels, name=FAKTOR_ETIKETLERI[row_factor]), columns=pd.Index(col_levels, name=FAKTOR_ETIKETLERI[col_factor]))
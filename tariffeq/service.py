@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Yerel Fiyatlama HTTP Servisi
+# =======================================================================
+# Streamlit sayfalarının kullandığı tarife motorlarını (tariffeq.premium,
+# tariffeq.core, tariffeq.policy_grid) JSON üzerinden diğer teklif sistemlerine
+# açar. Gelen istekler doğrulanır, hesaplamalar bir işlem (veya iş parçacığı)
+# havuzunda yürütülür; toplu uç noktalar tek çağrıda çok sayıda teklif kabul
+# eder. Sunucu HTTP/1.1 keep-alive bağlantılarını destekler ve uç nokta başına
+# p50/p99 gecikmeyi /v1/stats altında raporlar.
+#
+# Kullanım:
+#   python -m tariffeq.service --port 8765 --workers 4 --pool process
+#
+# Uç noktalar (POST, JSON gövde):
+#   /v1/fire, /v1/fire/batch     Deprem PD & BI primi (lokasyon grupları dahil, teklif başına
+#                                en fazla MAKS_LOKASYON lokasyon)
+#   /v1/car, /v1/car/batch       İnşaat & Montaj (CAR & EAR) primi
+#   /v1/pd, /v1/pd/batch         PD hasarı ve BI kaybı (ScenarioInputs alanları)
+#   /v1/policy-grid              Koasürans/muafiyet alternatifleri ızgarası
+# GET /v1/health, GET /v1/stats
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .core import ScenarioInputs, calculate_bi_loss, calculate_pd_damage, get_allowed_options
+from .fire_engine import fire_group_frame, price_fire_groups, warning_keys
+from .premium import (
+    LOCATION_FIELDS,
+    calculate_car_ear_premium,
+    calculate_months_difference,
+    determine_group_params,
+    koasurans_indirimi,
+    koasurans_indirimi_car,
+    muafiyet_indirimi,
+    muafiyet_indirimi_car,
+)
+from .risk_classifier import classify_description
+from .tariff import current_tariff, tariff_for
+
+MAKS_GOVDE = 32 * 1024 * 1024  # byte
+MAKS_TOPLU = 10_000  # toplu istek başına teklif
+MAKS_LOKASYON = 100_000  # yangın teklifi başına lokasyon; gruplar price_fire_groups ile tek çağrıda fiyatlanır
+GECIKME_PENCERESI = 10_000  # uç nokta başına saklanan son ölçüm sayısı
+
+_AI_ALANLARI = ("icerik_hassasiyeti", "ffe_riski", "kritik_makine_bagimliligi", "bina_icerik_profili")
+_ZORUNLU = object()
+
+
+class ValidationError(ValueError):
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+# --- İSTEK DOĞRULAMA ---
+@dataclass(frozen=True)
+class _Field:
+    kind: type
+    default: Any = _ZORUNLU
+    choices: Optional[Tuple[Any, ...]] = None
+    minimum: Optional[float] = None
+
+
+def _coerce(payload: Any, spec: Dict[str, _Field], path: str = "") -> Dict[str, Any]:
+    if not isinstance(payload, dict):
+        raise ValidationError([f"{path or 'gövde'}: JSON nesnesi bekleniyor"])
+    errors = [f"{path}{name}: bilinmeyen alan" for name in payload if name not in spec]
+    out = {}
+    for name, f in spec.items():
+        value = payload.get(name, f.default)
+        if value is _ZORUNLU:
+            errors.append(f"{path}{name}: zorunlu alan")
+            continue
+        if value is None and f.default is None:
+            out[name] = None
+            continue
+        try:
+            if f.kind is date:
+                value = value if isinstance(value, date) else date.fromisoformat(value)
+            elif f.kind in (int, float):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise TypeError
+                if f.kind is int and value != int(value):
+                    raise TypeError
+                value = f.kind(value)
+            elif not isinstance(value, f.kind):
+                raise TypeError
+        except (TypeError, ValueError):
+            errors.append(f"{path}{name}: {f.kind.__name__} bekleniyor")
+            continue
+        if f.choices is not None and value not in f.choices:
+            errors.append(f"{path}{name}: {value!r} geçersiz, izin verilenler: {list(f.choices)}")
+        elif f.minimum is not None and value < f.minimum:
+            errors.append(f"{path}{name}: en az {f.minimum} olmalı")
+        out[name] = value
+    if errors:
+        raise ValidationError(errors)
+    return out
+
+
+_RISK_GRUPLARI = tuple(range(1, 8))
+PARA_BIRIMLERI = ("TRY", "USD", "EUR")  # Hesaplama sayfasındaki seçimle aynı
+_FIRE_LOCATION = {
+    "group": _Field(str, "A"),
+    "building_type": _Field(str, choices=("Betonarme", "Diğer")),
+    "risk_group": _Field(int, choices=_RISK_GRUPLARI),
+    **{name: _Field(float, 0.0, minimum=0.0) for name in LOCATION_FIELDS},
+}
+_FIRE_QUOTE = {
+    "locations": _Field(list),
+    "currency": _Field(str, "TRY", choices=PARA_BIRIMLERI),
+    "fx_rate": _Field(float, 1.0),
+    "koas": _Field(str, choices=tuple(koasurans_indirimi)),
+    "deduct": _Field(float, choices=tuple(muafiyet_indirimi)),
+    "inflation_rate": _Field(float, 0.0, minimum=0.0),
+}
+_CAR_QUOTE = {
+    "risk_group_type": _Field(str, choices=("RiskGrubuA", "RiskGrubuB")),
+    "risk_class": _Field(int, choices=_RISK_GRUPLARI),
+    "start_date": _Field(date),
+    "end_date": _Field(date),
+    "project": _Field(float, 0.0, minimum=0.0),
+    "cpm": _Field(float, 0.0, minimum=0.0),
+    "cpe": _Field(float, 0.0, minimum=0.0),
+    "currency": _Field(str, "TRY", choices=PARA_BIRIMLERI),
+    "fx_rate": _Field(float, 1.0),
+    "koas": _Field(str, choices=tuple(koasurans_indirimi_car)),
+    "deduct": _Field(float, choices=tuple(muafiyet_indirimi_car)),
+    "inflation_rate": _Field(float, 0.0, minimum=0.0),
+}
+# AI parametreleri verilmezse toplu hatta olduğu gibi çevrimdışı sınıflandırıcıdan atanır
+_SCENARIO = {
+    f.name: _Field(f.type, None if f.name in _AI_ALANLARI else f.default, minimum=0 if f.type is int else None)
+    for f in fields(ScenarioInputs)
+}
+_SCENARIO["rg"] = _Field(int, _SCENARIO["rg"].default, choices=_RISK_GRUPLARI)
+
+
+def _check_fx(quote: Dict[str, Any]) -> None:
+    # Kur sıfır/negatif olamaz (tüm primleri 0'a çeker); TRY bedeller çevrilmez
+    if quote["fx_rate"] <= 0:
+        raise ValidationError(["fx_rate: 0'dan büyük olmalı"])
+    if quote["currency"] == "TRY" and quote["fx_rate"] != 1:
+        raise ValidationError(["fx_rate: currency TRY iken 1 olmalı"])
+
+
+def validate_fire_quote(payload: Any) -> Dict[str, Any]:
+    quote = _coerce(payload, _FIRE_QUOTE)
+    _check_fx(quote)
+    if not quote["locations"] or len(quote["locations"]) > MAKS_LOKASYON:
+        raise ValidationError([f"locations: 1-{MAKS_LOKASYON} lokasyon bekleniyor"])
+    errors, locations = [], []
+    for i, loc in enumerate(quote["locations"]):
+        try:
+            locations.append(_coerce(loc, _FIRE_LOCATION, f"locations[{i}]."))
+        except ValidationError as e:
+            errors.extend(e.errors)
+    if errors:
+        raise ValidationError(errors)
+    quote["locations"] = locations
+    return quote
+
+
+def validate_car_quote(payload: Any) -> Dict[str, Any]:
+    quote = _coerce(payload, _CAR_QUOTE)
+    _check_fx(quote)
+    if quote["end_date"] < quote["start_date"]:
+        raise ValidationError(["end_date: start_date'ten önce olamaz"])
+    try:
+        tariff_for(quote["start_date"])
+    except LookupError as e:
+        raise ValidationError([f"start_date: {e}"])
+    return quote
+
+
+def validate_scenario(payload: Any) -> ScenarioInputs:
+    values = _coerce(payload, _SCENARIO)
+    missing = [name for name in _AI_ALANLARI if values[name] is None]
+    if missing:
+        params = classify_description(values["faaliyet_tanimi"]).params
+        values.update({name: params[name] for name in missing})
+    return ScenarioInputs(**values)
+
+
+def validate_policy_grid(payload: Any) -> Dict[str, Any]:
+    req = _coerce(payload, {"scenario": _Field(dict), "koas": _Field(list, None), "muaf": _Field(list, None)})
+    req["scenario"] = validate_scenario(req["scenario"])
+    koas_opts, muaf_opts = get_allowed_options(req["scenario"].si_pd)
+    req["koas"] = req["koas"] or koas_opts
+    req["muaf"] = req["muaf"] or muaf_opts
+    errors = [f"koas: {k!r} geçersiz" for k in req["koas"] if k not in koas_opts]
+    errors += [f"muaf: {m!r} geçersiz" for m in req["muaf"] if m not in muaf_opts]
+    if errors:
+        raise ValidationError(errors)
+    return req
+
+
+# --- HESAPLAMA (havuz işçilerinde çalışır) ---
+def price_fire(quote: Dict[str, Any]) -> Dict[str, Any]:
+    tariff = current_tariff()
+    result = price_fire_groups(fire_group_frame(determine_group_params(quote["locations"])),
+                               quote["koas"], quote["deduct"], quote["fx_rate"], quote["inflation_rate"], tariff)
+    columns = ["pd_premium", "bi_premium", "ec_premium", "mk_premium", "total_premium", "rate"]
+    groups = {
+        str(group): {"pd_premium": pd_p, "bi_premium": bi_p, "ec_premium": ec_p, "mk_premium": mk_p, "total_premium": total, "applied_rate": rate}
+        for group, (pd_p, bi_p, ec_p, mk_p, total, rate) in zip(result.index, result[columns].itertuples(index=False, name=None))
+    }
+    return {"groups": groups, "total_premium": float(result["total_premium"].sum()), "currency": "TRY",
+            "tariff_version": tariff.ozet, "warnings": warning_keys(result)}
+
+
+def price_car(quote: Dict[str, Any]) -> Dict[str, Any]:
+    warnings: List[str] = []
+    tariff = tariff_for(quote["start_date"])
+    car_premium, cpm_premium, cpe_premium, total_premium, car_rate = calculate_car_ear_premium(
+        quote["risk_group_type"], quote["risk_class"], quote["start_date"], quote["end_date"],
+        quote["project"], quote["cpm"], quote["cpe"], quote["currency"], quote["koas"], quote["deduct"],
+        quote["fx_rate"], quote["inflation_rate"], warn=warnings.append, tariff=tariff,
+    )
+    return {
+        "duration_months": calculate_months_difference(quote["start_date"], quote["end_date"]),
+        "car_premium": car_premium, "cpm_premium": cpm_premium, "cpe_premium": cpe_premium,
+        "total_premium": total_premium, "applied_rate": car_rate, "currency": "TRY",
+        "tariff_version": tariff.ozet, "warnings": warnings,
+    }
+
+
+def price_pd(s: ScenarioInputs) -> Dict[str, Any]:
+    pd_results = calculate_pd_damage(s)
+    gross_days, net_days, bi_damage = calculate_bi_loss(pd_results["pml_ratio"], s)
+    return {
+        "pd_hasar": pd_results["damage_amount"], "pml_orani": pd_results["pml_ratio"],
+        "brut_kesinti_gun": gross_days, "net_kesinti_gun": net_days, "bi_hasar": bi_damage,
+        "ai_parametreleri": {name: getattr(s, name) for name in _AI_ALANLARI},
+    }
+
+
+def price_policy_grid(req: Dict[str, Any]) -> Dict[str, Any]:
+    from .policy_grid import evaluate_policy_grid
+    grid = evaluate_policy_grid(req["scenario"], req["koas"], req["muaf"])
+    rows = [
+        {"koas": k, "muafiyet": float(m), **{key: float(grid[key][0, i, j]) for key in ("toplam_prim", "toplam_tazminat", "kalan_risk", "verimlilik")}}
+        for i, k in enumerate(grid["koas"]) for j, m in enumerate(grid["muaf"].tolist())
+    ]
+    rows.sort(key=lambda r: r["verimlilik"], reverse=True)
+    return {"rows": rows}
+
+
+# (doğrulayıcı, hesaplayıcı) çiftleri; toplu uç noktalar "/batch" ekiyle aynı çifti kullanır
+ENDPOINTS: Dict[str, Tuple[Callable[[Any], Any], Callable[[Any], Dict[str, Any]]]] = {
+    "/v1/fire": (validate_fire_quote, price_fire),
+    "/v1/car": (validate_car_quote, price_car),
+    "/v1/pd": (validate_scenario, price_pd),
+    "/v1/policy-grid": (validate_policy_grid, price_policy_grid),
+}
+BATCH_ENDPOINTS = ("/v1/fire", "/v1/car", "/v1/pd")
+
+
+# --- GECİKME İSTATİSTİKLERİ ---
+class LatencyStats:
+    def __init__(self, window: int = GECIKME_PENCERESI):
+        self._lock = threading.Lock()
+        self._window = window
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(endpoint, deque(maxlen=self._window)).append(seconds)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = {k: sorted(v) for k, v in self._samples.items()}
+            counts = dict(self._counts)
+        return {
+            endpoint: {"count": counts[endpoint], "p50_ms": _percentile(values, 50) * 1000, "p99_ms": _percentile(values, 99) * 1000}
+            for endpoint, values in samples.items()
+        }
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    # En yakın sıra yöntemi
+    idx = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[idx]
+
+
+# --- HTTP SUNUCUSU ---
+class PricingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], executor: Executor, workers: int):
+        super().__init__(address, _Handler)
+        self.executor = executor
+        self.workers = workers
+        self.stats = LatencyStats()
+
+    def run_batch(self, calculate: Callable, items: List[Any]) -> List[Dict[str, Any]]:
+        chunksize = max(1, len(items) // (self.workers * 4))
+        return list(self.executor.map(calculate, items, chunksize=chunksize))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive; her yanıtta Content-Length gönderilir
+    server: PricingServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path == "/v1/health":
+            self._send(200, {"status": "ok", "workers": self.server.workers})
+        elif self.path == "/v1/stats":
+            self._send(200, self.server.stats.snapshot())
+        else:
+            self._send(404, {"errors": [f"{self.path}: bulunamadı"]})
+
+    def do_POST(self) -> None:
+        started = time.perf_counter()
+        endpoint = self.path
+        status, body = self._handle_post(endpoint)
+        self._send(status, body)
+        if status != 404:
+            self.server.stats.record(endpoint, time.perf_counter() - started)
+
+    def _handle_post(self, endpoint: str) -> Tuple[int, Dict[str, Any]]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAKS_GOVDE:
+            self.close_connection = True
+            return 413, {"errors": [f"gövde {MAKS_GOVDE} byte sınırını aşıyor"]}
+        raw = self.rfile.read(length)
+        is_batch = endpoint.endswith("/batch")
+        base = endpoint.removesuffix("/batch")
+        if base not in ENDPOINTS or (is_batch and base not in BATCH_ENDPOINTS):
+            return 404, {"errors": [f"{endpoint}: bulunamadı"]}
+        try:
+            payload = json.loads(raw or b"null")
+        except ValueError as e:
+            return 400, {"errors": [f"geçersiz JSON: {e}"]}
+        validate, calculate = ENDPOINTS[base]
+        try:
+            if not is_batch:
+                return 200, self.server.executor.submit(calculate, validate(payload)).result()
+            return 200, self._handle_batch(payload, validate, calculate)
+        except ValidationError as e:
+            return 400, {"errors": e.errors}
+        except Exception as e:
+            return 500, {"errors": [f"{type(e).__name__}: {e}"]}
+
+    def _handle_batch(self, payload: Any, validate: Callable, calculate: Callable) -> Dict[str, Any]:
+        if not isinstance(payload, dict) or not isinstance(payload.get("quotes"), list):
+            raise ValidationError(["quotes: teklif listesi bekleniyor"])
+        quotes = payload["quotes"]
+        if len(quotes) > MAKS_TOPLU:
+            raise ValidationError([f"quotes: en fazla {MAKS_TOPLU} teklif gönderilebilir"])
+        # Geçersiz teklifler tüm isteği düşürmez; sonuç listesinde kendi hatalarıyla yer alır
+        results: List[Optional[Dict[str, Any]]] = [None] * len(quotes)
+        valid_idx, valid = [], []
+        for i, quote in enumerate(quotes):
+            try:
+                valid.append(validate(quote))
+                valid_idx.append(i)
+            except ValidationError as e:
+                results[i] = {"errors": e.errors}
+        for i, result in zip(valid_idx, self.server.run_batch(calculate, valid)):
+            results[i] = result
+        return {"results": results, "failed": len(quotes) - len(valid)}
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, workers: Optional[int] = None, pool: str = "process") -> PricingServer:
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if pool == "process" else ThreadPoolExecutor(max_workers=workers)
+    return PricingServer((host, port), executor, workers)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="TariffEQ yerel fiyatlama servisi")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="Havuz boyutu (varsayılan: CPU sayısı)")
+    parser.add_argument("--pool", choices=("process", "thread"), default="process")
+    args = parser.parse_args(argv)
+    server = serve(args.host, args.port, args.workers, args.pool)
+    print(f"TariffEQ fiyatlama servisi http://{args.host}:{server.server_address[1]} ({server.workers} {args.pool} işçisi)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.executor.shutdown()
+        for endpoint, s in server.stats.snapshot().items():
+            print(f"{endpoint:<20} n={s['count']:<8} p50={s['p50_ms']:.2f} ms  p99={s['p99_ms']:.2f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+#
+# TariffEQ – Yürürlük Tarihli Ortak Tarife Tabloları
+# =======================================================================
+# Deprem (PD & BI) ve İnşaat/Montaj (CAR & EAR) tarifelerinin tek kaynağı.
+# Her tarife sürümü bir yürürlük aralığı [baslangic, bitis) ile tanımlanır;
+# oranlar, koasürans ve muafiyet indirimleri, süre çarpanları ve limitler
+# sürümle birlikte tutulur. Sürümler modül yüklenirken bir kez doğrulanır ve
+# sözlük görünümleri kurulur; vektörel motorların kullandığı yoğun NumPy
+# dizileri ise ilk erişimde derlenir, böylece yalnızca sözlükleri okuyan
+# sayfalar (core.py üzerinden Home.py) açılışta NumPy yüklemez. Poliçe
+# tarihinde geçerli sürüm sıralı başlangıç tarihleri üzerinde tek bir ikili
+# arama ile bulunur.
+#
+# Home.py'nin çarpanları (core.KOAS_FACTORS, core.MUAFIYET_FACTORS) ve
+# Hesaplama.py'nin indirimleri (premium.koasurans_indirimi, ...) aynı sürümün
+# görünümleridir: çarpan = 1 - indirim. Muafiyet anahtarları içeride float'tır;
+# görünümler mevcut ekranların gösterdiği biçimi (2.0 veya 2) korur.
+#
+# Yeni tarife: son sürümün bitis'i yeni sürümün başlangıcı yapılır ve yeni
+# TarifeSurumu SURUMLER'e eklenir. Eski tarihli poliçeler (ör. geçmiş
+# başlangıçlı CAR projeleri) kendi dönemlerinin tarifesiyle fiyatlanır.
+#
+# Kullanım:
+#   tariff = tariff_for(start_date)          # veya current_tariff()
+#   tariff.koasurans_indirimi["80/20"], tariff.oranlar[TIP_KODLARI["Diğer"], rg - 1]
+
+import hashlib
+import json
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import cached_property
+from typing import TYPE_CHECKING, Dict, Iterable, Mapping, Optional, Sequence, Tuple, Union
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Oran tablosundaki satır sırası tüm sürümlerde aynıdır; dizi indeksleri buna göre sabittir
+TARIFE_TIPLERI = ("Betonarme", "Diğer", "RiskGrubuA", "RiskGrubuB")
+TIP_KODLARI = {name: i for i, name in enumerate(TARIFE_TIPLERI)}
+KADEME_SAYISI = 7  # risk grubu / risk sınıfı 1..7
+
+Anahtarlar = Union[str, float, Sequence, "np.ndarray"]
+
+
+def _muafiyet_gorunumu(value: float) -> Union[int, float]:
+    # Hesaplama sayfası tam sayı muafiyetleri 2, 3, ... olarak gösterir
+    return int(value) if float(value).is_integer() else value
+
+
+@dataclass(frozen=True)
+class TarifeSurumu:
+    kod: str
+    baslangic: date
+    bitis: Optional[date]  # hariç; None = açık uçlu
+    oranlar_tablosu: Mapping[str, Sequence[float]]  # tip → 7 kademe (‰)
+    koasurans_tablosu: Mapping[str, float]  # koasürans → indirim
+    muafiyet_tablosu: Mapping[float, float]  # muafiyet (%) → indirim
+    standart_koasurans: Tuple[str, ...]  # her bedelde (ve CAR'da) seçilebilir
+    standart_muafiyet: Tuple[float, ...]
+    yuksek_bedel_koasurans: Tuple[str, ...]  # PD & BI senaryosunda yalnız prim limiti üstü bedellerde
+    yuksek_bedel_muafiyet: Tuple[float, ...]
+    sure_carpanlari: Mapping[int, float]  # CAR süresi (ay) → çarpan; tablo öncesi 1.0
+    uzun_sure_adimi: float  # tablo sonrası her ay için eklenen çarpan
+    limit_fire: float
+    limit_ec_mk: float
+    limit_car: float
+
+    # Sözlük görünümleri (__post_init__'te bir kez kurulur); NumPy dizileri aşağıda ilk erişimde derlenir
+    koasurans_kodlari: Dict[str, int] = field(init=False, repr=False, compare=False)
+    muafiyet_kodlari: Dict[float, int] = field(init=False, repr=False, compare=False)
+    tarife_oranlari: Dict[str, list] = field(init=False, repr=False, compare=False)
+    koasurans_indirimi: Dict[str, float] = field(init=False, repr=False, compare=False)
+    koasurans_indirimi_car: Dict[str, float] = field(init=False, repr=False, compare=False)
+    muafiyet_indirimi: Dict[Union[int, float], float] = field(init=False, repr=False, compare=False)
+    muafiyet_indirimi_car: Dict[Union[int, float], float] = field(init=False, repr=False, compare=False)
+    koasurans_carpanlari: Dict[str, float] = field(init=False, repr=False, compare=False)  # Home: 1 - indirim
+    muafiyet_carpanlari: Dict[float, float] = field(init=False, repr=False, compare=False)
+    ozet: str = field(init=False, compare=False)
+
+    def __post_init__(self):
+        self._validate()
+        muafiyet = {float(k): float(v) for k, v in self.muafiyet_tablosu.items()}
+        compiled = {
+            "koasurans_kodlari": {k: i for i, k in enumerate(self.koasurans_tablosu)},
+            "muafiyet_kodlari": {k: i for i, k in enumerate(muafiyet)},
+            "tarife_oranlari": {t: list(self.oranlar_tablosu[t]) for t in TARIFE_TIPLERI},
+            "koasurans_indirimi": dict(self.koasurans_tablosu),
+            "koasurans_indirimi_car": {k: self.koasurans_tablosu[k] for k in self.standart_koasurans},
+            "muafiyet_indirimi": {_muafiyet_gorunumu(m): d for m, d in muafiyet.items()},
+            "muafiyet_indirimi_car": {_muafiyet_gorunumu(m): muafiyet[m] for m in map(float, self.standart_muafiyet)},
+            "koasurans_carpanlari": {k: 1 - self.koasurans_tablosu[k] for k in self.standart_koasurans + self.yuksek_bedel_koasurans},
+            "muafiyet_carpanlari": {m: 1 - muafiyet[m] for m in map(float, self.standart_muafiyet + self.yuksek_bedel_muafiyet)},
+        }
+        for name, value in compiled.items():
+            object.__setattr__(self, name, value)
+        # Teklif defterindeki tarife sürümü: tabloların ve limitlerin özeti
+        object.__setattr__(self, "ozet", hashlib.sha256(json.dumps(
+            [self.tarife_oranlari, self.koasurans_indirimi, self.koasurans_indirimi_car,
+             {str(k): v for k, v in self.muafiyet_indirimi.items()},
+             {str(k): v for k, v in self.muafiyet_indirimi_car.items()},
+             {str(k): v for k, v in self.sure_carpanlari.items()},
+             [self.limit_fire, self.limit_ec_mk, self.limit_car]],
+            sort_keys=True, ensure_ascii=False,
+        ).encode("utf-8")).hexdigest()[:12])
+
+    def _validate(self) -> None:
+        errors = []
+        if self.bitis is not None and self.bitis <= self.baslangic:
+            errors.append("bitis başlangıçtan sonra olmalı")
+        if set(self.oranlar_tablosu) != set(TARIFE_TIPLERI):
+            errors.append(f"oran tabloları tam olarak {', '.join(TARIFE_TIPLERI)} olmalı")
+        for tip, rates in self.oranlar_tablosu.items():
+            if len(rates) != KADEME_SAYISI or any(r <= 0 for r in rates):
+                errors.append(f"{tip}: {KADEME_SAYISI} pozitif oran bekleniyor")
+        for koas, discount in self.koasurans_tablosu.items():
+            shares = koas.split("/")
+            if len(shares) != 2 or not all(s.isdigit() for s in shares) or int(shares[0]) + int(shares[1]) != 100:
+                errors.append(f"koasürans {koas!r}: 'sigortacı/sigortalı' biçiminde, toplamı 100 olmalı")
+            if discount >= 1:
+                errors.append(f"koasürans {koas!r}: indirim 1'den küçük olmalı")
+        muafiyet = {float(k) for k in self.muafiyet_tablosu}
+        if len(muafiyet) != len(self.muafiyet_tablosu):
+            errors.append("muafiyet anahtarları tekrar ediyor (ör. 2 ve 2.0)")
+        errors += [f"muafiyet {m!r}: oran ve indirim geçersiz" for m, d in self.muafiyet_tablosu.items() if m <= 0 or d >= 1]
+        for name, keys, table in (("standart_koasurans", self.standart_koasurans, self.koasurans_tablosu),
+                                  ("yuksek_bedel_koasurans", self.yuksek_bedel_koasurans, self.koasurans_tablosu),
+                                  ("standart_muafiyet", map(float, self.standart_muafiyet), muafiyet),
+                                  ("yuksek_bedel_muafiyet", map(float, self.yuksek_bedel_muafiyet), muafiyet)):
+            errors += [f"{name}: {k!r} tabloda yok" for k in keys if k not in table]
+        months = sorted(self.sure_carpanlari)
+        if not months or months != list(range(months[0], months[-1] + 1)) or months[0] < 1:
+            errors.append("süre çarpanları 1'den büyük, ardışık aylar için tanımlanmalı")
+        elif any(self.sure_carpanlari[a] > self.sure_carpanlari[b] for a, b in zip(months, months[1:])):
+            errors.append("süre çarpanları süreyle azalmamalı")
+        if min(self.limit_fire, self.limit_ec_mk, self.limit_car) <= 0:
+            errors.append("limitler pozitif olmalı")
+        if errors:
+            raise ValueError(f"Tarife {self.kod}: " + "; ".join(errors))
+
+    # --- YOĞUN DİZİLER (ilk erişimde derlenir, salt okunur) ---
+    @staticmethod
+    def _dizi(values) -> "np.ndarray":
+        import numpy as np
+        array = np.array(values, dtype=np.float64)
+        array.flags.writeable = False
+        return array
+
+    @cached_property
+    def oranlar(self) -> "np.ndarray":  # (tip, kademe)
+        return self._dizi([self.oranlar_tablosu[t] for t in TARIFE_TIPLERI])
+
+    @cached_property
+    def koasurans_dizisi(self) -> "np.ndarray":
+        return self._dizi(list(self.koasurans_tablosu.values()))
+
+    @cached_property
+    def muafiyet_dizisi(self) -> "np.ndarray":
+        return self._dizi([float(v) for v in self.muafiyet_tablosu.values()])
+
+    @cached_property
+    def sure_carpani_dizisi(self) -> "np.ndarray":  # ay → çarpan, 0..tablo sonu
+        return self._dizi([self.sure_carpanlari.get(m, 1.0) for m in range(max(self.sure_carpanlari) + 1)])
+
+    def covers(self, day: date) -> bool:
+        return self.baslangic <= day and (self.bitis is None or day < self.bitis)
+
+    def koas_discount(self, keys: Anahtarlar) -> "np.ndarray":
+        # Tek anahtar → skaler, dizi → satır başına indirim (yoğun dizi üzerinden)
+        import numpy as np
+        if isinstance(keys, str) or np.ndim(keys) == 0:
+            return self.koasurans_dizisi[self.koasurans_kodlari[keys]]
+        return self.koasurans_dizisi[[self.koasurans_kodlari[k] for k in keys]]
+
+    def deduct_discount(self, keys: Anahtarlar) -> "np.ndarray":
+        import numpy as np
+        if np.ndim(keys) == 0:
+            return self.muafiyet_dizisi[self.muafiyet_kodlari[float(keys)]]
+        return self.muafiyet_dizisi[[self.muafiyet_kodlari[float(k)] for k in keys]]
+
+    def duration_multiplier(self, months: int) -> float:
+        son = max(self.sure_carpanlari)
+        if months <= son:
+            return self.sure_carpanlari.get(months, 1.0)
+        return self.sure_carpanlari[son] + (self.uzun_sure_adimi * (months - son))
+
+
+# --- SÜRÜMLER ---
+SURUMLER: Tuple[TarifeSurumu, ...] = (
+    TarifeSurumu(
+        kod="1",
+        baslangic=date.min,
+        bitis=None,
+        oranlar_tablosu={
+            "Betonarme": (3.13, 2.63, 2.38, 1.94, 1.38, 1.06, 0.75),
+            "Diğer": (6.13, 5.56, 3.75, 2.00, 1.56, 1.24, 1.06),
+            "RiskGrubuA": (1.56, 1.31, 1.19, 0.98, 0.69, 0.54, 0.38),
+            "RiskGrubuB": (3.06, 2.79, 1.88, 1.00, 0.79, 0.63, 0.54),
+        },
+        koasurans_tablosu={
+            "80/20": 0.0, "75/25": 0.0625, "70/30": 0.125, "65/35": 0.1875,
+            "60/40": 0.25, "55/45": 0.3125, "50/50": 0.375, "45/55": 0.4375,
+            "40/60": 0.50,
+            "30/70": 0.125, "25/75": 0.0625,
+            "90/10": -0.125, "100/0": -0.25,
+        },
+        muafiyet_tablosu={
+            2.0: 0.0, 3.0: 0.06, 4.0: 0.13, 5.0: 0.19, 10.0: 0.35,
+            0.1: -0.12, 0.5: -0.09, 1.0: -0.06, 1.5: -0.03,
+        },
+        standart_koasurans=("80/20", "75/25", "70/30", "65/35", "60/40", "55/45", "50/50", "45/55", "40/60"),
+        standart_muafiyet=(2.0, 3.0, 4.0, 5.0, 10.0),
+        yuksek_bedel_koasurans=("90/10", "100/0"),
+        yuksek_bedel_muafiyet=(1.5, 1.0, 0.5, 0.1),
+        sure_carpanlari={
+            6: 0.70, 7: 0.75, 8: 0.80, 9: 0.85, 10: 0.90, 11: 0.95, 12: 1.00,
+            13: 1.05, 14: 1.10, 15: 1.15, 16: 1.20, 17: 1.25, 18: 1.30,
+            19: 1.35, 20: 1.40, 21: 1.45, 22: 1.50, 23: 1.55, 24: 1.60,
+            25: 1.65, 26: 1.70, 27: 1.74, 28: 1.78, 29: 1.82, 30: 1.86,
+            31: 1.90, 32: 1.94, 33: 1.98, 34: 2.02, 35: 2.06, 36: 2.10,
+        },
+        uzun_sure_adimi=0.03,
+        limit_fire=3_500_000_000,
+        limit_ec_mk=840_000_000,
+        limit_car=840_000_000,
+    ),
+)
+
+
+def _interval_index(versions: Iterable[TarifeSurumu]) -> Tuple[Tuple[TarifeSurumu, ...], list]:
+    # Sürümler başlangıca göre sıralanır; aralıklar çakışmamalı
+    ordered = tuple(sorted(versions, key=lambda v: v.baslangic))
+    for prev, nxt in zip(ordered, ordered[1:]):
+        if prev.bitis is None or prev.bitis > nxt.baslangic:
+            raise ValueError(f"Tarife {prev.kod} ile {nxt.kod} yürürlük aralıkları çakışıyor")
+    return ordered, [v.baslangic.toordinal() for v in ordered]
+
+
+_SIRALI, _BASLANGICLAR = _interval_index(SURUMLER)
+
+
+def tariff_for(day: date) -> TarifeSurumu:
+    # day tarihinde yürürlükte olan sürüm; aralıklar arasındaki boşluklar hata verir
+    if isinstance(day, datetime):
+        day = day.date()
+    i = bisect_right(_BASLANGICLAR, day.toordinal()) - 1
+    if i < 0 or not _SIRALI[i].covers(day):
+        raise LookupError(f"{day.isoformat()} tarihinde yürürlükte tarife yok")
+    return _SIRALI[i]
+
+
+def current_tariff() -> TarifeSurumu:
+    return tariff_for(date.today())